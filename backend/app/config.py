@@ -8,9 +8,42 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:////app/data/app.db"
     scrape_timeout: int = 30
     scrape_max_retries: int = 3
+    scrape_backoff_base: float = 0.5
+    scrape_backoff_max: float = 10.0
+    scrape_retry_after_max: float = 60.0
+    scrape_per_host_limit: int = 2
+    scrape_max_connections: int = 10
+    scrape_http2: bool = True
+    scrape_parse_executor: str = "process"
+    scrape_parse_workers: int = 2
+    scrape_html_backend: str = "auto"
+    scrape_max_bytes: int = 2_000_000
+    http_cache_enabled: bool = True
+    http_cache_dir: str = "/app/data/http_cache"
     llm_model: str = "gemini-2.5-flash-lite"
     llm_temperature: float = 0.3
     llm_max_tokens: int = 8192
+    llm_prompt_token_budget: int = 24000
+    llm_incremental_analysis: bool = True
+    llm_chunk_size: int = 4
+    llm_max_concurrency: int = 4
+    llm_rpm_limit: int = 15
+    llm_tpm_limit: int = 250000
+    llm_request_timeout: float = 120.0
+    llm_executor_workers: int = 4
+    llm_streaming: bool = True
+    llm_polish_summary: bool = False
+    llm_cache_enabled: bool = True
+    llm_cache_dir: str = "/app/data/llm_cache"
+    llm_cache_max_bytes: int = 50_000_000
+    llm_cache_ttl: int = 604800
+    recommend_cache_size: int = 4096
+    recommend_cache_ttl: int = 3600
+    history_queue_size: int = 10000
+    history_batch_size: int = 200
+    history_flush_interval: float = 0.5
+    history_count_ttl: int = 10
+    update_history_checkpoint_interval: int = 10
     organization_name: str = "Internal Use"
     enable_usage_analytics: bool = False
 
@@ -1,8 +1,13 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import chart, models, data_refresh, history, gemini
 from app.models.database import init_db
+from app.services.history_writer import history_writer
+from app.services.recommendation_table import rebuild_table
+from app.services.scraper import shutdown_parse_executor
 
 app = FastAPI(
     title="Copilot Model Navigator API",
@@ -22,6 +27,15 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    await history_writer.start()
+    await asyncio.to_thread(rebuild_table)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 書き込み待ちの診断履歴を全て保存してから終了する
+    await history_writer.stop()
+    shutdown_parse_executor()
 
 
 app.include_router(chart.router, prefix="/api/v1")
@@ -5,12 +5,16 @@ from datetime import datetime
 from sqlalchemy import (
     Column,
     DateTime,
+    Index,
     Integer,
     JSON,
     String,
     Text,
     create_engine,
+    inspect,
+    text,
 )
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import get_settings
@@ -25,6 +29,24 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _async_database_url(url: str) -> str:
+    """同期ドライバの URL を非同期ドライバ (aiosqlite) の URL に変換する"""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# async def のルートからはイベントループを止めないよう非同期エンジンを使う
+async_engine = create_async_engine(_async_database_url(settings.database_url))
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -38,6 +60,22 @@ class DiagnosisHistory(Base):
     result = Column(JSON, nullable=False)
     feedback = Column(Integer, nullable=True)
 
+    # 新しい順の一覧・キーセットページングで使う
+    __table_args__ = (
+        Index("ix_diagnosis_history_created_at_id", "created_at", "id"),
+    )
+
+
+class ModelSnapshot(Base):
+    """診断履歴が参照するデータバージョンごとのモデル情報（1 バージョン 1 行）"""
+
+    __tablename__ = "model_snapshots"
+
+    version = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    models = Column(JSON, nullable=False)
+    templates = Column(JSON, nullable=False)
+
 
 class UpdateHistory(Base):
     __tablename__ = "update_history"
@@ -49,6 +87,14 @@ class UpdateHistory(Base):
     old_data = Column(JSON, nullable=True)
     new_data = Column(JSON, nullable=True)
     gemini_model = Column(String, nullable=True)
+    # 差分保存 (app.services.update_history)。NULL は全体保存の旧形式
+    data_format = Column(String, nullable=True)
+    base_id = Column(String, nullable=True)
+    chain_depth = Column(Integer, nullable=True)
+    old_delta = Column(JSON, nullable=True)
+    new_delta = Column(JSON, nullable=True)
+    # 情報源ごとの内容のフィンガープリント（変更がなければ LLM 解析を省略する）
+    source_fingerprints = Column(JSON, nullable=True)
 
 
 class ModelData(Base):
@@ -92,5 +138,32 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _add_missing_columns():
+    """既存テーブルに後から追加したカラム（NULL 許容）を ALTER TABLE で追加する"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                ))
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    # 既存テーブルには create_all でインデックスが追加されないため個別に作成する
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -25,6 +25,11 @@ class RecommendRequest(BaseModel):
     selections: Dict[str, Any]
 
 
+class BatchRecommendRequest(BaseModel):
+    selections: List[Dict[str, Any]]
+    save_history: bool = True
+
+
 # --- Model ---
 
 class ModelPerformance(BaseModel):
@@ -70,6 +75,10 @@ class RecommendResponse(BaseModel):
 class RefreshRequest(BaseModel):
     model_id: Optional[str] = None
     api_key: Optional[str] = None
+    # 情報源に変更がなくても LLM 解析を実行する
+    force: bool = False
+    # LLM 応答キャッシュを使わずに LLM を呼び直す
+    bypass_llm_cache: bool = False
 
 
 class RefreshStatusResponse(BaseModel):
@@ -77,6 +86,9 @@ class RefreshStatusResponse(BaseModel):
     progress: int
     message: str
     started_at: Optional[datetime] = None
+    # ストリーミング解析で受信したモデル数 / 解析対象のモデル数
+    models_parsed: Optional[int] = None
+    models_total: Optional[int] = None
 
 
 class RefreshResponse(BaseModel):
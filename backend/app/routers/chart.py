@@ -1,15 +1,31 @@
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.database import get_db, DiagnosisHistory
-from app.models.schemas import RecommendRequest, RecommendResponse
-from app.services.recommendation import load_chart, compute_recommendation
+from app.models.database import get_async_db, DiagnosisHistory
+from app.models.schemas import (
+    BatchRecommendRequest,
+    RecommendRequest,
+    RecommendResponse,
+)
+from app.services.recommendation import (
+    compute_recommendations_batch,
+    get_recommendations,
+    load_chart,
+)
+from app.services.catalog import get_catalog
+from app.services.history_store import add_missing_snapshots, compact_result, mark_persisted
+from app.services.history_writer import history_writer
+from app.services.recommendation_table import table_stats
+from app.services.result_cache import get_recommendation_cache
 
 router = APIRouter(prefix="/chart", tags=["chart"])
 
+# バッチ推薦 1 回あたりの最大件数
+MAX_BATCH_SIZE = 1000
+
 
 @router.get("/questions")
 async def get_questions() -> Dict[str, Any]:
@@ -19,33 +35,94 @@ async def get_questions() -> Dict[str, Any]:
 
 
 @router.post("/recommend")
-async def recommend(
-    request: RecommendRequest,
-    db: Session = Depends(get_db),
-) -> Dict[str, Any]:
+async def recommend(request: RecommendRequest) -> Dict[str, Any]:
     """選択結果を送信し推薦モデルを取得"""
+    catalog = get_catalog()
     try:
-        results = compute_recommendation(request.selections)
+        results = get_recommendations(request.selections, catalog)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"推薦計算に失敗しました: {str(e)}")
 
     diagnosis_id = str(uuid.uuid4())
 
-    # 診断履歴を保存
-    try:
-        history_entry = DiagnosisHistory(
-            id=diagnosis_id,
-            selections=request.selections,
-            result={"recommendations": results},
-        )
-        db.add(history_entry)
-        db.commit()
-    except Exception as e:
-        # 履歴保存失敗は推薦結果に影響しない
-        db.rollback()
+    # 診断履歴は書き込みキューに積むだけで応答する
+    # （キューが溢れても推薦結果には影響しない）
+    await history_writer.submit({
+        "id": diagnosis_id,
+        "selections": request.selections,
+        "result": compact_result(results, catalog),
+    })
 
     return {
         "diagnosis_id": diagnosis_id,
         "recommendations": results,
         "selections": request.selections,
     }
+
+
+@router.post("/recommend/batch")
+async def recommend_batch(
+    request: BatchRecommendRequest,
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    """複数の選択結果をまとめて送信し、入力順に推薦モデルを取得"""
+    if len(request.selections) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に送信できる選択結果は {MAX_BATCH_SIZE} 件までです",
+        )
+
+    catalog = get_catalog()
+    try:
+        batch_results = compute_recommendations_batch(request.selections, catalog)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"推薦計算に失敗しました: {str(e)}")
+
+    diagnosis_ids: List[Any] = [None] * len(batch_results)
+
+    # 診断履歴を 1 トランザクションでまとめて保存
+    if request.save_history and batch_results:
+        diagnosis_ids = [str(uuid.uuid4()) for _ in batch_results]
+        try:
+            # compact_result() がスナップショット保存用にカタログを登録するため先に変換する
+            rows = [
+                DiagnosisHistory(
+                    id=diagnosis_id,
+                    selections=selections,
+                    result=compact_result(results, catalog),
+                )
+                for diagnosis_id, selections, results in zip(
+                    diagnosis_ids, request.selections, batch_results
+                )
+            ]
+            added = await db.run_sync(add_missing_snapshots, [catalog.version])
+            db.add_all(rows)
+            await db.commit()
+            mark_persisted(added)
+        except Exception:
+            # 履歴保存失敗は推薦結果に影響しない
+            await db.rollback()
+            diagnosis_ids = [None] * len(batch_results)
+
+    return {
+        "count": len(batch_results),
+        "results": [
+            {
+                "diagnosis_id": diagnosis_id,
+                "recommendations": results,
+                "selections": selections,
+            }
+            for diagnosis_id, selections, results in zip(
+                diagnosis_ids, request.selections, batch_results
+            )
+        ],
+    }
+
+
+@router.get("/recommend/stats")
+async def get_recommend_stats() -> Dict[str, Any]:
+    """推薦の事前計算テーブルと結果キャッシュの状態を取得"""
+    return {
+        "table": table_stats(),
+        "cache": get_recommendation_cache().stats(),
+    }
@@ -1,16 +1,19 @@
-import asyncio
 from datetime import datetime
 from typing import Any, Dict
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.models.database import UpdateHistory, get_async_db
 from app.models.schemas import RefreshRequest
 from app.services.data_updater import (
+    cancel_data_refresh,
     execute_data_refresh,
     get_refresh_status,
-    _refresh_state,
 )
+from app.services.update_history import load_update_data
 
 router = APIRouter(prefix="/data", tags=["data-refresh"])
 settings = get_settings()
@@ -37,8 +40,6 @@ async def refresh_data(
     background_tasks: BackgroundTasks,
 ) -> Dict[str, Any]:
     """最新データ取得・ロジック更新を実行"""
-    global _refresh_state
-
     model_id = request.model_id or settings.llm_model
     api_key = request.api_key or settings.gemini_api_key
     if not api_key:
@@ -47,7 +48,7 @@ async def refresh_data(
             detail="Gemini API キーが指定されていません。設定画面で API キーを保存してください。",
         )
 
-    if _refresh_state.get("status") == "running":
+    if get_refresh_status().get("status") == "running":
         raise HTTPException(
             status_code=409,
             detail="データ更新が既に実行中です。完了をお待ちください。",
@@ -65,10 +66,13 @@ async def refresh_data(
             result = await execute_data_refresh(
                 model_id=model_id,
                 api_key=api_key,
+                force=request.force,
+                use_llm_cache=not request.bypass_llm_cache,
             )
             _last_updated["updated_at"] = datetime.utcnow().isoformat() + "Z"
             _last_updated["gemini_model"] = model_id
         except Exception:
+            # 失敗・キャンセルの内容は _refresh_state に記録済み
             pass
 
     background_tasks.add_task(run_refresh)
@@ -89,10 +93,61 @@ async def get_status() -> Dict[str, Any]:
         "progress": status.get("progress", 0),
         "message": status.get("message", ""),
         "started_at": status.get("started_at"),
+        "models_parsed": status.get("models_parsed"),
+        "models_total": status.get("models_total"),
     }
 
 
+@router.post("/refresh/cancel")
+async def cancel_refresh() -> Dict[str, Any]:
+    """実行中のデータ更新をキャンセル"""
+    if not cancel_data_refresh():
+        raise HTTPException(status_code=409, detail="実行中のデータ更新はありません")
+    return {"status": "cancelling", "message": "データ更新のキャンセルを要求しました"}
+
+
 @router.get("/last-updated")
 async def get_last_updated() -> Dict[str, Any]:
     """最終更新日時を取得"""
     return _last_updated
+
+
+def _serialize_update(record: UpdateHistory) -> Dict[str, Any]:
+    return {
+        "id": record.id,
+        "created_at": record.created_at.isoformat() + "Z" if record.created_at else None,
+        "status": record.status,
+        "summary": record.summary,
+        "gemini_model": record.gemini_model,
+        "data_format": record.data_format or "full",
+    }
+
+
+@router.get("/updates")
+async def get_updates(
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    """データ更新履歴の一覧を取得"""
+    records = (
+        await db.scalars(
+            select(UpdateHistory).order_by(UpdateHistory.created_at.desc()).limit(limit)
+        )
+    ).all()
+    return {"items": [_serialize_update(r) for r in records]}
+
+
+@router.get("/updates/{update_id}/data")
+async def get_update_data(
+    update_id: str,
+    which: str = "new",
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    """データ更新時点の models.json を復元して取得（which=new: 更新後 / old: 更新前）"""
+    if which not in ("new", "old"):
+        raise HTTPException(status_code=400, detail="which は new または old を指定してください")
+    if await db.get(UpdateHistory, update_id) is None:
+        raise HTTPException(status_code=404, detail="更新履歴が見つかりません")
+    # 差分の連鎖をたどる復元処理は同期 Session 用のため run_sync で実行する
+    data = await db.run_sync(load_update_data, update_id, which)
+    return {"id": update_id, "which": which, "data": data}
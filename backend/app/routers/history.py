@@ -1,79 +1,151 @@
-from typing import Any, Dict, List, Optional
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.database import get_db, DiagnosisHistory
+from app.config import get_settings
+from app.models.database import get_async_db, DiagnosisHistory
 from app.models.schemas import FeedbackRequest
+from app.services.history_store import rehydrate_cached, rehydrate_results
+from app.services.history_writer import history_writer
 
 router = APIRouter(prefix="/history", tags=["history"])
+settings = get_settings()
+
+
+def _serialize(item: DiagnosisHistory, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": item.id,
+        "created_at": item.created_at.isoformat() + "Z" if item.created_at else None,
+        "selections": item.selections,
+        "result": result,
+        "feedback": item.feedback,
+    }
+
+
+def _encode_cursor(item: DiagnosisHistory) -> str:
+    return f"{item.created_at.isoformat()},{item.id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """"<created_at>,<id>" 形式のカーソルを解析する"""
+    try:
+        created_at, diagnosis_id = cursor.split(",", 1)
+        return datetime.fromisoformat(created_at.rstrip("Z")), diagnosis_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"不正なカーソルです: {cursor}")
+
+
+# 件数は毎回 COUNT(*) せず、短時間キャッシュする
+_total_cache: Dict[str, Any] = {"value": None, "expires_at": 0.0}
+
+
+async def _get_total(db: AsyncSession) -> int:
+    now = time.monotonic()
+    if _total_cache["value"] is None or now >= _total_cache["expires_at"]:
+        _total_cache["value"] = await db.scalar(
+            select(func.count()).select_from(DiagnosisHistory)
+        )
+        _total_cache["expires_at"] = now + settings.history_count_ttl
+    return _total_cache["value"]
 
 
 @router.get("")
 async def get_history(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
-    """診断履歴を取得"""
-    total = db.query(DiagnosisHistory).count()
-    items = (
-        db.query(DiagnosisHistory)
-        .order_by(DiagnosisHistory.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    """
+    診断履歴を新しい順に取得
+
+    after に前ページの next_cursor を指定するとキーセット方式で続きを取得する
+    （読み飛ばす行をスキャンしない）。未指定の場合は従来どおり offset を使う。
+    total は短時間キャッシュした件数で、include_total=false で省略できる。
+    """
+    query = select(DiagnosisHistory).order_by(
+        DiagnosisHistory.created_at.desc(), DiagnosisHistory.id.desc()
     )
+    if after:
+        created_at, diagnosis_id = _decode_cursor(after)
+        query = query.where(
+            tuple_(DiagnosisHistory.created_at, DiagnosisHistory.id)
+            < tuple_(
+                literal(created_at, DiagnosisHistory.created_at.type),
+                literal(diagnosis_id, DiagnosisHistory.id.type),
+            )
+        )
+    else:
+        query = query.offset(offset)
+
+    # 1 件多く取得し、次のページがある場合だけ next_cursor を返す
+    items = (await db.scalars(query.limit(limit + 1))).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    results = await rehydrate_results(db, [item.result for item in items])
 
     return {
-        "total": total,
-        "items": [
-            {
-                "id": item.id,
-                "created_at": item.created_at.isoformat() + "Z" if item.created_at else None,
-                "selections": item.selections,
-                "result": item.result,
-                "feedback": item.feedback,
-            }
-            for item in items
-        ],
+        "total": await _get_total(db) if include_total else None,
+        "items": [_serialize(item, result) for item, result in zip(items, results)],
+        "next_cursor": _encode_cursor(items[-1]) if has_more and items else None,
     }
 
 
+@router.get("/writer-stats")
+async def get_writer_stats() -> Dict[str, Any]:
+    """診断履歴の書き込みキューの状態（滞留・破棄件数）を取得"""
+    return history_writer.stats()
+
+
 @router.get("/{diagnosis_id}")
 async def get_diagnosis(
     diagnosis_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """特定の診断結果を取得"""
-    item = db.query(DiagnosisHistory).filter(DiagnosisHistory.id == diagnosis_id).first()
+    # 書き込み待ちの行を先に確認する
+    pending = history_writer.get_pending(diagnosis_id)
+    if pending is not None:
+        return {
+            "id": pending["id"],
+            "created_at": pending["created_at"].isoformat() + "Z",
+            "selections": pending["selections"],
+            "result": rehydrate_cached(pending["result"]),
+            "feedback": pending.get("feedback"),
+        }
+
+    item = await db.get(DiagnosisHistory, diagnosis_id)
     if not item:
         raise HTTPException(status_code=404, detail="診断結果が見つかりません")
 
-    return {
-        "id": item.id,
-        "created_at": item.created_at.isoformat() + "Z" if item.created_at else None,
-        "selections": item.selections,
-        "result": item.result,
-        "feedback": item.feedback,
-    }
+    result, = await rehydrate_results(db, [item.result])
+    return _serialize(item, result)
 
 
 @router.post("/{diagnosis_id}/feedback")
 async def submit_feedback(
     diagnosis_id: str,
     request: FeedbackRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """診断結果へのフィードバックを送信"""
     if not (1 <= request.get_value() <= 5):
         raise HTTPException(status_code=400, detail="フィードバックは1〜5の整数で指定してください")
 
-    item = db.query(DiagnosisHistory).filter(DiagnosisHistory.id == diagnosis_id).first()
+    # 書き込み待ちの場合は書き込み完了を待ってから更新する
+    if history_writer.get_pending(diagnosis_id) is not None:
+        await history_writer.flush()
+
+    item = await db.get(DiagnosisHistory, diagnosis_id)
     if not item:
         raise HTTPException(status_code=404, detail="診断結果が見つかりません")
 
     item.feedback = request.get_value()
-    db.commit()
+    await db.commit()
 
     return {"message": "フィードバックを受け付けました", "feedback": request.feedback}
@@ -0,0 +1,134 @@
+"""
+データファイルのインメモリカタログ
+
+models.json / chart.json / recommendation_rules.json をパース済みの
+スナップショットとして保持する。
+
+- ファイルの mtime / サイズが変わった場合のみ再読み込みする
+- 内容のハッシュからバージョン ID を算出する
+- スナップショットは丸ごと差し替えるため、処理中のリクエストは
+  取得済みのスナップショットを最後まで一貫して参照できる
+
+スナップショット内の dict は共有オブジェクトなので、呼び出し側で
+変更してはならない（必要ならコピーしてから変更すること）。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+CATALOG_FILES: Dict[str, str] = {
+    "models": "models.json",
+    "chart": "chart.json",
+    "rules": "recommendation_rules.json",
+}
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """ある時点のデータファイル一式（読み取り専用）"""
+
+    version: str
+    models: Dict[str, Any]
+    chart: Dict[str, Any]
+    rules: Dict[str, Any]
+    models_by_id: Mapping[str, Dict[str, Any]]
+    file_versions: Mapping[str, str]
+
+
+# (mtime_ns, size) をファイルごとに保持
+_Stamps = Tuple[Tuple[int, int], ...]
+
+
+class CatalogStore:
+    """データファイルのスナップショットを管理する"""
+
+    def __init__(self, data_dir: Path = DATA_DIR):
+        self._data_dir = data_dir
+        self._lock = threading.Lock()
+        # (stamps, snapshot) を 1 つのタプルで保持し、参照を原子的に差し替える
+        self._current: Optional[Tuple[_Stamps, CatalogSnapshot]] = None
+        # ファイル名 -> (内容ハッシュ, パース結果)
+        self._parsed: Dict[str, Tuple[str, Any]] = {}
+
+    def _stat_all(self) -> _Stamps:
+        stamps = []
+        for filename in CATALOG_FILES.values():
+            st = os.stat(self._data_dir / filename)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamps)
+
+    def get(self) -> CatalogSnapshot:
+        """最新のスナップショットを返す（変更がなければ再読み込みしない）"""
+        current = self._current
+        stamps = self._stat_all()
+        if current is not None and current[0] == stamps:
+            return current[1]
+
+        with self._lock:
+            current = self._current
+            stamps = self._stat_all()
+            if current is not None and current[0] == stamps:
+                return current[1]
+            snapshot = self._load()
+            self._current = (stamps, snapshot)
+            return snapshot
+
+    def invalidate(self) -> None:
+        """次回の get() で必ずファイルを確認し直す"""
+        with self._lock:
+            self._current = None
+
+    def _load(self) -> CatalogSnapshot:
+        data: Dict[str, Any] = {}
+        file_versions: Dict[str, str] = {}
+
+        for key, filename in CATALOG_FILES.items():
+            raw = (self._data_dir / filename).read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()[:16]
+            cached = self._parsed.get(filename)
+            if cached is not None and cached[0] == digest:
+                # mtime だけ変わって内容が同じ場合はパースし直さない
+                parsed = cached[1]
+            else:
+                parsed = json.loads(raw.decode("utf-8"))
+                self._parsed[filename] = (digest, parsed)
+            data[key] = parsed
+            file_versions[filename] = digest
+
+        version = hashlib.sha256(
+            "|".join(file_versions[f] for f in CATALOG_FILES.values()).encode()
+        ).hexdigest()[:12]
+
+        previous = self._current
+        if previous is None or previous[1].version != version:
+            logger.info(f"Catalog loaded: version={version}")
+
+        return CatalogSnapshot(
+            version=version,
+            models=data["models"],
+            chart=data["chart"],
+            rules=data["rules"],
+            models_by_id={m["id"]: m for m in data["models"].get("models", [])},
+            file_versions=file_versions,
+        )
+
+
+_store = CatalogStore()
+
+
+def get_catalog() -> CatalogSnapshot:
+    return _store.get()
+
+
+def invalidate_catalog() -> None:
+    _store.invalidate()
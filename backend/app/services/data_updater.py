@@ -1,14 +1,29 @@
 import asyncio
+import hashlib
 import json
 import logging
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from app.config import get_settings
-from app.services.scraper import scrape_all_sources
-from app.services.llm_analyzer import analyze_with_llm, generate_update_summary
+from app.services.catalog import invalidate_catalog
+from app.services.scraper import (
+    CONTENT_STATUSES,
+    COPILOT_MODEL_LIST_ID,
+    scrape_all_sources,
+)
+from app.services.llm_analyzer import (
+    analyze_with_llm,
+    build_rule_based_update,
+    generate_update_summary,
+)
+from app.services.recommendation_table import rebuild_table
+from app.services.result_cache import clear_recommendation_cache
+from app.services.stage_timings import StageTimings
+from app.services.update_history import record_update
+from app.services.update_summary import summarize_changes
 from app.models.database import SessionLocal, UpdateHistory
 
 logger = logging.getLogger(__name__)
@@ -26,18 +41,44 @@ _refresh_state: Dict[str, Any] = {
 }
 
 
+# 実行中の更新処理のタスク（キャンセル用）
+_refresh_task: Optional[asyncio.Task] = None
+
+
+class RefreshCancelledError(Exception):
+    """データ更新がキャンセルされた"""
+
+
 def get_refresh_status() -> Dict[str, Any]:
     return _refresh_state.copy()
 
 
+def cancel_data_refresh() -> bool:
+    """
+    実行中のデータ更新をキャンセルする。
+    実行中の更新がなければ False を返す。
+    """
+    if _refresh_task is None or _refresh_task.done():
+        return False
+    _refresh_state["message"] = "更新をキャンセルしています..."
+    _refresh_task.cancel()
+    return True
+
+
 async def execute_data_refresh(
     model_id: str,
     api_key: str,
+    force: bool = False,
+    use_llm_cache: bool = True,
 ) -> Dict[str, Any]:
     """
     データ更新処理のメインフロー
+
+    force=True の場合は情報源に変更がなくても LLM 解析を実行する。
+    use_llm_cache=False の場合は LLM 応答キャッシュを使わずに LLM を呼び直す。
+    cancel_data_refresh() でキャンセルされた場合は RefreshCancelledError を送出する。
     """
-    global _refresh_state
+    global _refresh_state, _refresh_task
 
     if _refresh_state["status"] == "running":
         raise ValueError("データ更新が既に実行中です")
@@ -50,14 +91,73 @@ async def execute_data_refresh(
         "last_result_id": None,
     }
 
-    async def update_progress(progress: int, message: str):
+    # 呼び出し元のタスクを巻き込まずにキャンセルできるよう別タスクで実行する
+    _refresh_task = asyncio.create_task(_run_data_refresh(model_id, api_key, force, use_llm_cache))
+    try:
+        return await _refresh_task
+    except asyncio.CancelledError:
+        current = asyncio.current_task()
+        if current is not None and current.cancelling():
+            # 呼び出し元自体がキャンセルされた（アプリ終了など）
+            raise
+        raise RefreshCancelledError("データ更新がキャンセルされました")
+    finally:
+        _refresh_task = None
+
+
+async def _save_models(new_data: Dict[str, Any]) -> None:
+    with open(DATA_DIR / "models.json", "w", encoding="utf-8") as f:
+        json.dump(new_data, f, ensure_ascii=False, indent=2)
+    invalidate_catalog()
+    clear_recommendation_cache()
+    await asyncio.to_thread(rebuild_table)
+
+
+def _partial_update_summary(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM を使わずに部分更新した場合のサマリ"""
+    summary = summarize_changes(old_data, new_data)
+    key_changes = ["AI 解析に失敗したため、公式ページの表から確定できる項目のみを更新しました"]
+    if summary["models_added"]:
+        key_changes.append(
+            f"新しいモデル {len(summary['models_added'])} 件を仮のスコアで追加しました（次回の AI 解析で更新されます）"
+        )
+    if summary["models_removed"]:
+        key_changes.append(f"公式ページから削除されたモデル {len(summary['models_removed'])} 件を削除しました")
+    summary["key_changes"] = (key_changes + summary["key_changes"])[: len(key_changes) + 3]
+    summary["overall_summary"] = "AI 解析に失敗したため、乗数・コスト区分・コンテキスト長などの確定項目のみを更新しました。"
+    return summary
+
+
+def _rollback(old_data: Dict[str, Any]) -> None:
+    try:
+        with open(DATA_DIR / "models.json", "w", encoding="utf-8") as f:
+            json.dump(old_data, f, ensure_ascii=False, indent=2)
+        invalidate_catalog()
+        clear_recommendation_cache()
+        logger.info("Rolled back to old data")
+    except Exception as re:
+        logger.error(f"Rollback failed: {re}")
+
+
+async def _run_data_refresh(
+    model_id: str,
+    api_key: str,
+    force: bool,
+    use_llm_cache: bool = True,
+) -> Dict[str, Any]:
+    """スクレイピング → LLM 解析 → 保存 の本体"""
+
+    async def update_progress(progress: int, message: str, **details: Any):
+        # details: ストリーミング解析の models_parsed / models_total / analysis_incomplete
         _refresh_state["progress"] = progress
         _refresh_state["message"] = message
+        _refresh_state.update(details)
         logger.info(f"[{progress}%] {message}")
 
     update_id = str(uuid.uuid4())
     old_data = None
     new_data = None
+    timings = StageTimings()
 
     try:
         # 現在のデータをバックアップ
@@ -67,88 +167,140 @@ async def execute_data_refresh(
 
         # スクレイピング実行 (5-40%)
         # Phase 1: GitHub 公式からモデル一覧取得
-        # Phase 2: 各プロバイダーから詳細情報取得
-        await update_progress(10, "GitHub 公式ページからモデル一覧を取得中...")
-        scraped_data = await scrape_all_sources(
-            progress_callback=update_progress
-        )
+        # Phase 2: 各プロバイダーから詳細情報取得（Phase 1 と同時に実行）
+        await update_progress(5, "GitHub 公式ページと各プロバイダーから情報を取得中...")
+        with timings.measure("scrape"):
+            scraped_data = await scrape_all_sources(
+                progress_callback=update_progress
+            )
+        # 解析は取得と並行してワーカーで実行されるため scrape の内訳として記録する
+        timings.add("parse", scraped_data.get("timings", {}).get("parse_ms", 0.0))
 
         copilot_models = scraped_data.get("copilot_models", {})
         detail_sources = scraped_data.get("detail_sources", [])
         model_count = len(copilot_models.get("models", []))
-        detail_ok = sum(1 for s in detail_sources if s.get("status") == "success")
+        detail_ok = sum(1 for s in detail_sources if s.get("status") in CONTENT_STATUSES)
         await update_progress(
             45,
             f"情報収集完了: {model_count} モデル検出, {detail_ok}/{len(detail_sources)} ソース成功",
         )
 
-        # LLM解析 (45-85%)
-        await update_progress(50, f"{model_id} でデータを解析中...")
-        analyzed_data = await analyze_with_llm(
-            scraped_data=scraped_data,
-            model_id=model_id,
-            api_key=api_key,
-            progress_callback=update_progress,
-        )
+        # 前回の更新から情報源が変わっておらず、仮データのモデルもなければ LLM 解析を省略する
+        fingerprints = compute_source_fingerprints(scraped_data)
+        previous_fingerprints = _load_previous_fingerprints()
+        changed_sources = diff_fingerprints(previous_fingerprints, fingerprints)
 
-        if analyzed_data is None:
-            # LLM解析失敗 → スクレイピング結果のみで部分更新
-            status = "partial"
+        if (
+            not force
+            and previous_fingerprints is not None
+            and not changed_sources
+            and copilot_models.get("status") == "success"
+            and not any(m.get("analysis_pending") for m in old_data.get("models", []))
+        ):
+            await update_progress(90, "情報源に変更がないため AI 解析をスキップしました")
+            status = "unchanged"
             summary = {
                 "models_added": [],
                 "models_removed": [],
                 "models_updated": [],
-                "key_changes": ["LLM解析に失敗しましたが、スクレイピングは完了しました"],
-                "overall_summary": f"一部のデータ取得に成功しましたが、AI解析に失敗しました。既存データを維持します。",
+                "key_changes": ["前回の更新以降、情報源に変更はありませんでした"],
+                "overall_summary": "情報源に変更がないため、既存データを維持しました。",
             }
             new_data = old_data
         else:
-            # データを検証・保存
-            await update_progress(85, "データを検証・保存しています...")
-            validated = validate_model_data(analyzed_data)
-
-            if validated:
-                new_data = analyzed_data
-                with open(DATA_DIR / "models.json", "w", encoding="utf-8") as f:
-                    json.dump(new_data, f, ensure_ascii=False, indent=2)
-
-                # サマリ生成
-                await update_progress(90, "更新サマリを生成中...")
-                summary = await generate_update_summary(
-                    old_data=old_data,
-                    new_data=new_data,
-                    model_id=model_id,
-                    api_key=api_key,
-                )
-                status = "success"
+            # LLM解析 (45-85%)
+            await update_progress(50, f"{model_id} でデータを解析中...")
+            analyzed_data = await analyze_with_llm(
+                scraped_data=scraped_data,
+                model_id=model_id,
+                api_key=api_key,
+                progress_callback=update_progress,
+                # force の場合は全モデルを解析し直す
+                changed_sources=None if force else changed_sources,
+                timings=timings,
+                use_cache=use_llm_cache,
+            )
+
+            if analyzed_data is None:
+                # LLM解析失敗 → スクレイピング結果の表から決まる項目のみで部分更新
+                status = "partial"
+                partial_data = build_rule_based_update(scraped_data, old_data)
+                if partial_data is not None and validate_model_data(partial_data):
+                    new_data = partial_data
+                    with timings.measure("persist"):
+                        await _save_models(new_data)
+                    summary = _partial_update_summary(old_data, new_data)
+                else:
+                    summary = {
+                        "models_added": [],
+                        "models_removed": [],
+                        "models_updated": [],
+                        "key_changes": ["LLM解析に失敗しましたが、スクレイピングは完了しました"],
+                        "overall_summary": f"一部のデータ取得に成功しましたが、AI解析に失敗しました。既存データを維持します。",
+                    }
+                    new_data = old_data
             else:
-                # バリデーション失敗 → ロールバック
-                logger.warning("Data validation failed, rolling back")
-                new_data = old_data
-                status = "failed"
-                summary = {
-                    "models_added": [],
-                    "models_removed": [],
-                    "models_updated": [],
-                    "key_changes": ["データのバリデーションに失敗しました"],
-                    "overall_summary": "更新データの形式が正しくないため、既存データを維持しました",
-                }
+                # データを検証・保存
+                await update_progress(85, "データを検証・保存しています...")
+                with timings.measure("validate"):
+                    validated = validate_model_data(analyzed_data)
+
+                if validated:
+                    new_data = analyzed_data
+                    with timings.measure("persist"):
+                        await _save_models(new_data)
+
+                    # サマリ生成
+                    await update_progress(90, "更新サマリを生成中...")
+                    with timings.measure("llm"):
+                        summary = await generate_update_summary(
+                            old_data=old_data,
+                            new_data=new_data,
+                            model_id=model_id,
+                            api_key=api_key,
+                            use_cache=use_llm_cache,
+                        )
+                    status = "success"
+                    if _refresh_state.get("analysis_incomplete"):
+                        # 応答の途中終了や chunk の失敗で、一部のモデルは現在のデータ（仮データ）のまま。
+                        # partial は次回のフィンガープリント比較に使わないため、次回も解析し直す
+                        status = "partial"
+                        summary["key_changes"].insert(
+                            0, "一部のモデルを AI で解析できなかったため、解析できたモデルのみを更新しました"
+                        )
+                else:
+                    # バリデーション失敗 → ロールバック
+                    logger.warning("Data validation failed, rolling back")
+                    new_data = old_data
+                    status = "failed"
+                    summary = {
+                        "models_added": [],
+                        "models_removed": [],
+                        "models_updated": [],
+                        "key_changes": ["データのバリデーションに失敗しました"],
+                        "overall_summary": "更新データの形式が正しくないため、既存データを維持しました",
+                    }
+
+        summary["changed_sources"] = changed_sources
 
         # DB に記録
-        db = SessionLocal()
-        try:
-            record = UpdateHistory(
-                id=update_id,
-                status=status,
-                summary=summary,
-                old_data=old_data,
-                new_data=new_data,
-                gemini_model=model_id,
-            )
-            db.add(record)
-            db.commit()
-        finally:
-            db.close()
+        with timings.measure("persist"):
+            db = SessionLocal()
+            try:
+                record_update(
+                    db,
+                    update_id=update_id,
+                    status=status,
+                    summary=summary,
+                    old_data=old_data,
+                    new_data=new_data,
+                    gemini_model=model_id,
+                    source_fingerprints=fingerprints,
+                )
+                db.commit()
+            finally:
+                db.close()
+        logger.info(f"Data refresh stage timings (ms): {timings.to_dict()}")
 
         await update_progress(100, "更新が完了しました！")
         _refresh_state["status"] = "completed"
@@ -159,8 +311,20 @@ async def execute_data_refresh(
             "status": status,
             "summary": summary,
             "gemini_model": model_id,
+            "timings": {
+                "scrape": scraped_data.get("timings", {}),
+                "stages": timings.to_dict(),
+            },
         }
 
+    except asyncio.CancelledError:
+        logger.info("Data refresh cancelled")
+        _refresh_state["status"] = "cancelled"
+        _refresh_state["message"] = "更新をキャンセルしました"
+        if new_data is not None and new_data is not old_data:
+            _rollback(old_data)
+        raise
+
     except Exception as e:
         logger.error(f"Data refresh failed: {e}", exc_info=True)
         _refresh_state["status"] = "failed"
@@ -168,16 +332,76 @@ async def execute_data_refresh(
 
         # ロールバック
         if old_data is not None:
-            try:
-                with open(DATA_DIR / "models.json", "w", encoding="utf-8") as f:
-                    json.dump(old_data, f, ensure_ascii=False, indent=2)
-                logger.info("Rolled back to old data")
-            except Exception as re:
-                logger.error(f"Rollback failed: {re}")
+            _rollback(old_data)
 
         raise
 
 
+def _fingerprint(value: Any) -> str:
+    normalized = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def compute_source_fingerprints(scraped_data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    スクレイピング結果の情報源ごとのフィンガープリントを計算する。
+    取得に失敗した情報源は含めない（前回の内容から変わったとはみなさない）。
+    """
+    fingerprints: Dict[str, str] = {}
+
+    copilot = scraped_data.get("copilot_models", {})
+    if copilot.get("status") == "success":
+        # 表の行順などの揺れで差分とみなさないよう正規化する
+        fingerprints[COPILOT_MODEL_LIST_ID] = _fingerprint({
+            "models": sorted(
+                copilot.get("models", []),
+                key=lambda m: (m.get("name", ""), m.get("provider", "")),
+            ),
+            "multipliers": copilot.get("multipliers", {}),
+            "retired": sorted(
+                copilot.get("retired", []), key=lambda m: m.get("name", "")
+            ),
+        })
+
+    for src in scraped_data.get("detail_sources", []):
+        if src.get("status") in CONTENT_STATUSES:
+            content = "\n".join(
+                line.strip() for line in src.get("content", "").splitlines() if line.strip()
+            )
+            fingerprints[src["id"]] = _fingerprint(content)
+
+    return fingerprints
+
+
+def diff_fingerprints(
+    previous: Optional[Dict[str, str]], current: Dict[str, str]
+) -> List[str]:
+    """前回から内容が変わった（または新たに取得できた）情報源の ID を返す"""
+    if previous is None:
+        return list(current.keys())
+    return [
+        source_id
+        for source_id, fingerprint in current.items()
+        if previous.get(source_id) != fingerprint
+    ]
+
+
+def _load_previous_fingerprints() -> Optional[Dict[str, str]]:
+    """直近の成功した更新で記録したフィンガープリントを取得する"""
+    db = SessionLocal()
+    try:
+        record = (
+            db.query(UpdateHistory)
+            .filter(UpdateHistory.status.in_(["success", "unchanged"]))
+            .filter(UpdateHistory.source_fingerprints.isnot(None))
+            .order_by(UpdateHistory.created_at.desc())
+            .first()
+        )
+        return record.source_fingerprints if record is not None else None
+    finally:
+        db.close()
+
+
 def validate_model_data(data: Dict) -> bool:
     """モデルデータの基本的なバリデーション"""
     try:
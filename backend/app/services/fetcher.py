@@ -0,0 +1,218 @@
+"""
+スクレイピング用の取得レイヤ
+
+- 一時的なエラー（タイムアウト・接続エラー・429 / 5xx）は
+  指数バックオフ + ジッタで scrape_max_retries 回まで再試行する
+  （Retry-After ヘッダーがあればその秒数だけ待つ。scrape_retry_after_max を超える
+  待機を求められた場合は、早すぎる再試行で再び拒否されないよう再試行せずに諦める）
+- 同じホストへの同時リクエスト数を制限する
+- 1 つの httpx.AsyncClient を使い回して keep-alive / HTTP/2 で接続を再利用する
+- 試行ごとの所要時間を記録し、更新処理のどこで時間がかかったかを確認できるようにする
+"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import get_settings
+from app.services.http_cache import FetchResult, HttpCache, fetch_with_cache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# h2 パッケージがある場合のみ HTTP/2 を使う
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchAttempt:
+    """1 回のリクエスト試行の記録"""
+
+    url: str
+    attempt: int
+    started_at: float
+    elapsed_ms: float
+    # ホストごとの同時実行枠が空くまで待った時間
+    queued_ms: float = 0.0
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    # 次の試行までの待機時間（再試行しない場合は None）
+    retry_after_ms: Optional[float] = None
+    # 再試行可能なエラーで再試行しなかった理由
+    gave_up_reason: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def create_scrape_client() -> httpx.AsyncClient:
+    """スクレイピングで共有する AsyncClient を作成する"""
+    return httpx.AsyncClient(
+        http2=settings.scrape_http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=settings.scrape_max_connections,
+            max_keepalive_connections=settings.scrape_max_connections,
+            keepalive_expiry=30.0,
+        ),
+    )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダー（秒数または HTTP 日付）を待機秒数に変換する"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class Fetcher:
+    """再試行・ホストごとの同時実行制限つきで URL を取得する"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_retries: int = 3,
+        per_host_limit: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        retry_after_max: float = 60.0,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.client = client
+        self.cache = cache
+        self.max_retries = max(0, max_retries)
+        self.per_host_limit = max(1, per_host_limit)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.attempts: List[FetchAttempt] = []
+
+    @classmethod
+    def from_settings(cls, client: httpx.AsyncClient) -> "Fetcher":
+        return cls(
+            client,
+            max_retries=settings.scrape_max_retries,
+            per_host_limit=settings.scrape_per_host_limit,
+            backoff_base=settings.scrape_backoff_base,
+            backoff_max=settings.scrape_backoff_max,
+            retry_after_max=settings.scrape_retry_after_max,
+        )
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """次の試行までの待機秒数（Retry-After があればそのまま使う）"""
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = parse_retry_after(error.response.headers.get("retry-after"))
+            if retry_after is not None:
+                return retry_after
+        # full jitter: 0 〜 base * 2^attempt の一様乱数
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def fetch(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        stop_markers: Sequence[bytes] = (),
+    ) -> FetchResult:
+        """
+        URL を取得する。再試行しても失敗した場合は最後のエラーを送出する。
+        max_bytes / stop_markers は fetch_with_cache() を参照。
+        """
+        attempt = 0
+        while True:
+            record = FetchAttempt(
+                url=url, attempt=attempt + 1, started_at=time.time(), elapsed_ms=0.0
+            )
+            self.attempts.append(record)
+            queued = started = time.perf_counter()
+            try:
+                async with self._host_limit(url):
+                    started = time.perf_counter()
+                    record.queued_ms = round((started - queued) * 1000, 1)
+                    result = await fetch_with_cache(
+                        self.client,
+                        url,
+                        headers=headers,
+                        timeout=timeout,
+                        cache=self.cache,
+                        max_bytes=max_bytes,
+                        stop_markers=stop_markers,
+                    )
+                record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                record.status_code = result.status_code
+                logger.info(
+                    f"GET {url} attempt {record.attempt}: {result.status_code} "
+                    f"in {record.elapsed_ms}ms"
+                )
+                return result
+            except Exception as e:
+                record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                record.error = _describe(e)
+                if isinstance(e, httpx.HTTPStatusError):
+                    record.status_code = e.response.status_code
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    logger.warning(
+                        f"GET {url} attempt {record.attempt} failed: {record.error} "
+                        f"in {record.elapsed_ms}ms (giving up)"
+                    )
+                    raise
+
+                delay = self._backoff(attempt, e)
+                if delay > self.retry_after_max:
+                    record.gave_up_reason = (
+                        f"Retry-After {delay:.0f}s exceeds the {self.retry_after_max:.0f}s limit"
+                    )
+                    logger.warning(
+                        f"GET {url} attempt {record.attempt} failed: {record.error} "
+                        f"in {record.elapsed_ms}ms (giving up: {record.gave_up_reason})"
+                    )
+                    raise
+                record.retry_after_ms = round(delay * 1000, 1)
+                logger.info(
+                    f"GET {url} attempt {record.attempt} failed: {record.error} "
+                    f"in {record.elapsed_ms}ms, retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def attempts_for(self, url: str) -> List[FetchAttempt]:
+        return [a for a in self.attempts if a.url == url]
@@ -0,0 +1,340 @@
+"""
+診断履歴の推薦結果のコンパクト保存
+
+DiagnosisHistory.result にはモデル情報の完全なコピーではなく
+モデル ID・順位・スコアとデータバージョンだけを保存し、
+モデル情報（models.json と推薦理由テンプレート）はバージョンごとに
+1 行だけ ModelSnapshot テーブルに保存する。読み出し時に元の形へ復元する。
+
+    保存形式:
+    {
+      "data_version": "9010631b5519",
+      "recommendations": [{"rank": 1, "model_id": "gpt-4.1", "score": 82.3}, ...]
+    }
+
+旧形式（モデル情報を埋め込んだ行）はそのまま読み出せる。
+`python -m app.services.history_store migrate` で旧形式の行を変換できる。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.database import DiagnosisHistory, ModelSnapshot
+from app.services.catalog import CatalogSnapshot, get_catalog
+from app.services.scoring_engine import DEFAULT_REASON
+
+logger = logging.getLogger(__name__)
+
+# メモリ上に保持するスナップショットの数
+_MAX_CACHED_SNAPSHOTS = 32
+
+
+@dataclass(frozen=True)
+class SnapshotView:
+    """復元に必要なデータバージョンごとの情報"""
+
+    version: str
+    models: Dict[str, Any]
+    templates: Dict[str, Any]
+    models_by_id: Dict[str, Dict[str, Any]]
+
+
+def _view(version: str, models: Dict[str, Any], templates: Dict[str, Any]) -> SnapshotView:
+    return SnapshotView(
+        version=version,
+        models=models,
+        templates=templates,
+        models_by_id={m["id"]: m for m in models.get("models", [])},
+    )
+
+
+_lock = threading.Lock()
+_snapshots: "OrderedDict[str, SnapshotView]" = OrderedDict()
+# DB への保存が確認済みのバージョン
+_persisted: Set[str] = set()
+
+
+def _remember(view: SnapshotView) -> None:
+    with _lock:
+        _snapshots[view.version] = view
+        _snapshots.move_to_end(view.version)
+        while len(_snapshots) > _MAX_CACHED_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+
+
+def _cached(version: str) -> Optional[SnapshotView]:
+    with _lock:
+        view = _snapshots.get(version)
+        if view is not None:
+            _snapshots.move_to_end(version)
+        return view
+
+
+def register_catalog(catalog: CatalogSnapshot) -> None:
+    """推薦に使ったカタログを復元・スナップショット保存用に登録する"""
+    if _cached(catalog.version) is None:
+        _remember(_view(
+            catalog.version,
+            catalog.models,
+            catalog.rules.get("recommendation_templates", {}),
+        ))
+
+
+# ─────────────────────────────────────────────────────────────────
+# 保存
+# ─────────────────────────────────────────────────────────────────
+
+def compact_result(
+    results: List[Dict[str, Any]], catalog: CatalogSnapshot
+) -> Dict[str, Any]:
+    """推薦結果を ID 参照のコンパクト形式に変換する"""
+    register_catalog(catalog)
+    return {
+        "data_version": catalog.version,
+        "recommendations": [
+            {"rank": r["rank"], "model_id": r["model"]["id"], "score": r["score"]}
+            for r in results
+        ],
+    }
+
+
+def add_missing_snapshots(db: Session, versions: Iterable[str]) -> List[str]:
+    """
+    未保存のデータバージョンの ModelSnapshot 行を追加する（commit は呼び出し側）。
+    追加したバージョンを返すので、commit 成功後に mark_persisted() に渡すこと。
+    """
+    added = []
+    for version in set(versions):
+        if version in _persisted:
+            continue
+        if db.get(ModelSnapshot, version) is not None:
+            _persisted.add(version)
+            continue
+        view = _cached(version)
+        if view is None:
+            logger.warning(f"Model snapshot for data version {version} is not available")
+            continue
+        db.add(ModelSnapshot(
+            version=version, models=view.models, templates=view.templates
+        ))
+        added.append(version)
+    return added
+
+
+def mark_persisted(versions: Iterable[str]) -> None:
+    _persisted.update(versions)
+
+
+# ─────────────────────────────────────────────────────────────────
+# 復元
+# ─────────────────────────────────────────────────────────────────
+
+def is_compact(result: Dict[str, Any]) -> bool:
+    return isinstance(result, dict) and "data_version" in result
+
+
+def _rehydrate(result: Dict[str, Any], view: Optional[SnapshotView]) -> Dict[str, Any]:
+    if view is None:
+        # スナップショットが失われている場合は参照のまま返す
+        return result
+    recommendations = []
+    for entry in result.get("recommendations", []):
+        template = view.templates.get(entry["model_id"], {})
+        recommendations.append({
+            "rank": entry["rank"],
+            "model": view.models_by_id.get(entry["model_id"], {"id": entry["model_id"]}),
+            "score": entry["score"],
+            "reason": template.get("strengths_text", DEFAULT_REASON),
+            "caution": template.get("caution_text", None),
+        })
+    return {"recommendations": recommendations}
+
+
+def rehydrate_cached(result: Dict[str, Any]) -> Dict[str, Any]:
+    """メモリ上のスナップショットだけで復元する（書き込み待ちの行用）"""
+    if not is_compact(result):
+        return result
+    return _rehydrate(result, _cached(result["data_version"]))
+
+
+async def rehydrate_results(
+    db: AsyncSession, results: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """保存形式の推薦結果をまとめて元の形に復元する"""
+    versions = {r["data_version"] for r in results if is_compact(r)}
+    missing = [v for v in versions if _cached(v) is None]
+    if missing:
+        rows = (
+            await db.scalars(
+                select(ModelSnapshot).where(ModelSnapshot.version.in_(missing))
+            )
+        ).all()
+        for row in rows:
+            _remember(_view(row.version, row.models, row.templates))
+
+    return [
+        _rehydrate(r, _cached(r["data_version"])) if is_compact(r) else r
+        for r in results
+    ]
+
+
+# ─────────────────────────────────────────────────────────────────
+# 旧形式からの移行
+# ─────────────────────────────────────────────────────────────────
+
+def _legacy_templates(recommendations: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {
+        r["model"]["id"]: {
+            "strengths_text": r.get("reason", DEFAULT_REASON),
+            "caution_text": r.get("caution"),
+        }
+        for r in recommendations
+    }
+
+
+def _matches_catalog(
+    models: Dict[str, Dict[str, Any]],
+    templates: Dict[str, Dict[str, Any]],
+    catalog: CatalogSnapshot,
+) -> bool:
+    """旧形式の行に埋め込まれたモデル情報が現在のデータと同一か"""
+    current_templates = catalog.rules.get("recommendation_templates", {})
+    return all(
+        catalog.models_by_id.get(model_id) == model
+        and current_templates.get(model_id, {}).get("strengths_text", DEFAULT_REASON)
+        == templates[model_id]["strengths_text"]
+        and current_templates.get(model_id, {}).get("caution_text")
+        == templates[model_id]["caution_text"]
+        for model_id, model in models.items()
+    )
+
+
+@dataclass
+class _LegacyGroup:
+    """埋め込まれた内容が矛盾しない旧形式の行をまとめたスナップショット"""
+
+    models: Dict[str, Dict[str, Any]]
+    templates: Dict[str, Dict[str, Any]]
+
+    def accepts(self, models: Dict[str, Any], templates: Dict[str, Any]) -> bool:
+        return all(
+            model_id not in self.models
+            or (self.models[model_id] == model and self.templates[model_id] == templates[model_id])
+            for model_id, model in models.items()
+        )
+
+    def view(self) -> SnapshotView:
+        payload = {"models": {"models": list(self.models.values())}, "templates": self.templates}
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()[:12]
+        return _view(f"legacy-{digest}", payload["models"], self.templates)
+
+
+def migrate_legacy_results(db: Session, batch_size: int = 500) -> Dict[str, int]:
+    """
+    旧形式（モデル情報埋め込み）の診断履歴をコンパクト形式に変換する。
+
+    現在のデータと同一の内容を埋め込んだ行は現在のバージョンを参照する。
+    それ以外はバッチ内で内容が矛盾しない行を 1 つのスナップショットにまとめ、
+    内容から決まる legacy-<digest> バージョンを割り当てる。
+    行の書き換えと参照先の ModelSnapshot 行の追加は同じ commit で行う。
+    """
+    catalog = get_catalog()
+    current_view = _view(
+        catalog.version, catalog.models, catalog.rules.get("recommendation_templates", {})
+    )
+    converted = 0
+    skipped = 0
+    last_key = None
+
+    while True:
+        query = (
+            select(DiagnosisHistory)
+            .where(func.json_extract(DiagnosisHistory.result, "$.data_version").is_(None))
+            .order_by(DiagnosisHistory.created_at, DiagnosisHistory.id)
+            .limit(batch_size)
+        )
+        if last_key is not None:
+            query = query.where(DiagnosisHistory.id.notin_(last_key))
+        rows = db.scalars(query).all()
+        if not rows:
+            break
+
+        groups: List[_LegacyGroup] = []
+        pending = []
+        unconvertible = []
+        for row in rows:
+            recommendations = (row.result or {}).get("recommendations", [])
+            if not all(isinstance(r.get("model"), dict) for r in recommendations):
+                unconvertible.append(row.id)
+                continue
+            models = {r["model"]["id"]: r["model"] for r in recommendations}
+            templates = _legacy_templates(recommendations)
+            group = None
+            if not _matches_catalog(models, templates, catalog):
+                group = next((g for g in groups if g.accepts(models, templates)), None)
+                if group is None:
+                    group = _LegacyGroup(models={}, templates={})
+                    groups.append(group)
+                group.models.update(models)
+                group.templates.update(templates)
+            pending.append((row, recommendations, group))
+
+        # バッチ内の全スナップショットをメモリ上のキャッシュを介さずに保存する
+        views = {id(g): g.view() for g in groups}
+        used = {views[id(g)].version: views[id(g)] for _, _, g in pending if g is not None}
+        if any(g is None for _, _, g in pending):
+            used[current_view.version] = current_view
+        for version, view in used.items():
+            if db.get(ModelSnapshot, version) is None:
+                db.add(ModelSnapshot(version=version, models=view.models, templates=view.templates))
+
+        for row, recommendations, group in pending:
+            row.result = {
+                "data_version": views[id(group)].version if group is not None else current_view.version,
+                "recommendations": [
+                    {"rank": r["rank"], "model_id": r["model"]["id"], "score": r["score"]}
+                    for r in recommendations
+                ],
+            }
+        db.commit()
+        converted += len(pending)
+        mark_persisted(used)
+        for view in used.values():
+            _remember(view)
+
+        # 変換できない行は次のバッチで再び取得しないよう除外する
+        skipped += len(unconvertible)
+        if unconvertible:
+            last_key = (last_key or []) + unconvertible
+        logger.info(f"Migrated {converted} diagnosis history rows")
+
+    return {"converted": converted, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.models.database import SessionLocal, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["migrate"]:
+        print("usage: python -m app.services.history_store migrate")
+        sys.exit(1)
+
+    init_db()
+    session = SessionLocal()
+    try:
+        print(migrate_legacy_results(session))
+    finally:
+        session.close()
@@ -0,0 +1,212 @@
+"""
+診断履歴の非同期書き込みキュー (write-behind)
+
+推薦 API は履歴行をキューに積むだけで即座に応答し、
+バックグラウンドタスクが件数 / 時間の閾値でまとめて 1 トランザクションで
+書き込む。書き込み前の行はメモリ上から参照できる。
+
+- キューは上限つきで、溢れた行は破棄して dropped として計上する
+- 書き込みに失敗したバッチは retry_delay 後に 1 度だけ再試行し、
+  それでも失敗した行は ID をエラーログに残して failed として計上する
+- アプリ終了時は stop() でキューを空にしてから終了する
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.models.database import DiagnosisHistory, SessionLocal
+from app.services.history_store import add_missing_snapshots, mark_persisted
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """DiagnosisHistory 行をまとめて書き込むバッファ"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        retry_delay: float = 1.0,
+    ):
+        self._session_factory = session_factory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 書き込み待ちの行（id -> 行データ）
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """キューに残った行を全て書き込んでから停止する"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        履歴行を書き込みキューに積む（書き込みは待たない）。
+        キューが満杯で破棄した場合は False を返す。
+        """
+        row = dict(row)
+        row.setdefault("created_at", datetime.utcnow())
+
+        if not self.running:
+            # ライフサイクル外（スクリプト等）ではその場で書き込む
+            await self._persist([row])
+            return True
+
+        try:
+            self._pending[row["id"]] = row
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            del self._pending[row["id"]]
+            self.dropped += 1
+            logger.warning(f"History queue full, dropped diagnosis {row['id']}")
+            return False
+
+    def get_pending(self, diagnosis_id: str) -> Optional[Dict[str, Any]]:
+        """まだ書き込まれていない行を返す"""
+        return self._pending.get(diagnosis_id)
+
+    async def flush(self) -> None:
+        """現時点までにキューに積まれた行の書き込み完了を待つ"""
+        if not self.running:
+            return
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(done)
+        await done
+
+    async def _run(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            batch: List[Dict[str, Any]] = []
+            waiters: List[asyncio.Future] = []
+
+            # 最初の 1 件から flush_interval 以内に届いた分をまとめる
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, asyncio.Future):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if stopping:
+                # 停止要求以降に積まれた行も取りこぼさない
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if isinstance(item, asyncio.Future):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                await self._persist(batch)
+                for row in batch:
+                    self._pending.pop(row["id"], None)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _persist(self, rows: List[Dict[str, Any]]) -> None:
+        """行をスレッドで書き込み、失敗した場合は 1 度だけ再試行する"""
+        if await asyncio.to_thread(self._write_batch, rows):
+            return
+        await asyncio.sleep(self.retry_delay)
+        self.retried += len(rows)
+        if await asyncio.to_thread(self._write_batch, rows):
+            return
+        self.failed += len(rows)
+        ids = ", ".join(row["id"] for row in rows)
+        logger.error(f"Dropped {len(rows)} diagnosis history rows after retry: {ids}")
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> bool:
+        start = time.perf_counter()
+        db = self._session_factory()
+        try:
+            # 行が参照するデータバージョンのスナップショットを同じトランザクションで保存
+            added = add_missing_snapshots(db, {
+                row["result"]["data_version"]
+                for row in rows
+                if "data_version" in row["result"]
+            })
+            db.add_all([DiagnosisHistory(**row) for row in rows])
+            db.commit()
+            mark_persisted(added)
+            self.written += len(rows)
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to write {len(rows)} diagnosis history rows: {e}")
+            return False
+        finally:
+            db.close()
+            self.batches += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending": len(self._pending),
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+history_writer = HistoryWriter(
+    max_queue=settings.history_queue_size,
+    batch_size=settings.history_batch_size,
+    flush_interval=settings.history_flush_interval,
+)
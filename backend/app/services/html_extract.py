@@ -0,0 +1,179 @@
+"""
+スクレイピング結果の HTML から本文テキストとテーブルを取り出すバックエンド
+
+- bs4:  BeautifulSoup + html.parser（純 Python。常に利用可能なフォールバック）
+- lxml: lxml.html（C 実装で高速。lxml がインストールされている場合のみ）
+
+どちらも同じ規則で抽出し、同じ HTML からは同じ結果を返す
+（tests/fixtures/html の保存済みページで一致を確認している）。
+ただし大きく崩れた HTML ではパーサごとの木構造の違いが出ることがある。
+lxml が捨てる制御文字はどちらのバックエンドでも解析前に取り除く。
+
+SCRAPE_HTML_BACKEND=auto の場合は lxml があれば lxml、なければ bs4 を使う。
+"""
+
+import importlib.util
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 本文とみなす要素（先に見つかったものを優先）
+MAIN_CONTENT_SELECTORS = ["article", "main", ".content", ".documentation", "body"]
+# この終了タグまで受信すれば本文は揃っている（article / main が本文として選ばれるため）
+MAIN_CONTENT_END_MARKERS = (b"</article>", b"</main>")
+# 本文から除外する要素
+NOISE_TAGS = ["script", "style", "nav", "footer", "header"]
+# 中の文字列を本文として扱わない要素（BeautifulSoup の get_text() と同じ規則）
+_NON_TEXT_CONTAINERS = {"script", "style", "template", "rt", "rp"}
+
+# タブ・改行以外の C0 制御文字（lxml は空白に置き換えたり捨てたりする）
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+LXML_AVAILABLE = importlib.util.find_spec("lxml") is not None
+
+Table = List[List[str]]
+
+
+def _truncate(text: str, max_chars: Optional[int]) -> str:
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars] + "\n... (truncated)"
+    return text
+
+
+class Bs4Backend:
+    """BeautifulSoup (html.parser) による抽出"""
+
+    name = "bs4"
+
+    def parse(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(_CONTROL_CHARS.sub("", html), "html.parser")
+
+    def tables(self, soup: BeautifulSoup) -> List[Table]:
+        """HTML テーブルを 3次元リスト(tables > rows > cells)として取得"""
+        tables = []
+        for table in soup.find_all("table"):
+            rows = []
+            for tr in table.find_all("tr"):
+                cells = [
+                    td.get_text(separator=" ", strip=True)
+                    for td in tr.find_all(["td", "th"])
+                ]
+                if cells:
+                    rows.append(cells)
+            if rows:
+                tables.append(rows)
+        return tables
+
+    def main_text(self, soup: BeautifulSoup, max_chars: Optional[int] = None) -> str:
+        """
+        本文テキストを抽出（除外要素を取り除くため soup を変更する）。
+        既定では切り詰めない（解析プロンプトの長さは prompt_builder がトークン予算で決める）。
+        """
+        for selector in MAIN_CONTENT_SELECTORS:
+            el = soup.select_one(selector)
+            if el:
+                for tag in el.find_all(NOISE_TAGS):
+                    tag.decompose()
+                return _truncate(el.get_text(separator="\n", strip=True), max_chars)
+        return ""
+
+
+class LxmlBackend:
+    """lxml.html による抽出"""
+
+    name = "lxml"
+
+    def parse(self, html: str) -> Any:
+        from lxml import etree
+        from lxml import html as lxml_html
+
+        # str のまま渡すと <?xml encoding=...?> 宣言つきの文書で ValueError になるため、
+        # UTF-8 のバイト列として渡し、宣言の encoding は無視させる
+        parser = lxml_html.HTMLParser(encoding="utf-8")
+        try:
+            return lxml_html.document_fromstring(
+                _CONTROL_CHARS.sub("", html).encode("utf-8"), parser=parser
+            )
+        except etree.ParserError:
+            # 空白だけのページ（bs4 と同じく本文・表なしとして扱う）
+            return lxml_html.Element("html")
+
+    @staticmethod
+    def _strings(el: Any, skip: bool = False) -> Iterator[str]:
+        """要素内の文字列を文書順に返す（コメント等は除き、tail は含める）"""
+        skip = skip or el.tag in _NON_TEXT_CONTAINERS
+        if el.text and not skip:
+            yield el.text
+        for child in el:
+            if isinstance(child.tag, str):
+                yield from LxmlBackend._strings(child, skip)
+            if child.tail and not skip:
+                yield child.tail
+
+    def _get_text(self, el: Any, separator: str) -> str:
+        return separator.join(
+            s.strip() for s in self._strings(el) if s.strip()
+        )
+
+    def tables(self, doc: Any) -> List[Table]:
+        tables = []
+        for table in doc.iter("table"):
+            rows = []
+            for tr in table.iterdescendants("tr"):
+                cells = [
+                    self._get_text(td, " ")
+                    for td in tr.iterdescendants("td", "th")
+                ]
+                if cells:
+                    rows.append(cells)
+            if rows:
+                tables.append(rows)
+        return tables
+
+    def _select_one(self, doc: Any, selector: str) -> Optional[Any]:
+        if selector.startswith("."):
+            matches = doc.xpath(
+                "//*[contains(concat(' ', normalize-space(@class), ' '), $cls)]",
+                cls=f" {selector[1:]} ",
+            )
+            return matches[0] if matches else None
+        return next(doc.iter(selector), None)
+
+    def main_text(self, doc: Any, max_chars: Optional[int] = None) -> str:
+        for selector in MAIN_CONTENT_SELECTORS:
+            el = self._select_one(doc, selector)
+            if el is not None:
+                for tag in list(el.iterdescendants(*NOISE_TAGS)):
+                    # drop_tree() は後続のテキスト (tail) を残す
+                    tag.drop_tree()
+                return _truncate(self._get_text(el, "\n"), max_chars)
+        return ""
+
+
+BACKENDS = {"bs4": Bs4Backend, "lxml": LxmlBackend}
+
+_instances: Dict[str, Any] = {}
+
+
+def get_backend(name: Optional[str] = None) -> Any:
+    """設定（または指定）に応じた抽出バックエンドを返す"""
+    name = (name or settings.scrape_html_backend).lower()
+    if name == "auto":
+        name = "lxml" if LXML_AVAILABLE else "bs4"
+    elif name == "lxml" and not LXML_AVAILABLE:
+        logger.warning("lxml is not installed, falling back to BeautifulSoup")
+        name = "bs4"
+    elif name not in BACKENDS:
+        logger.warning(f"Unknown HTML backend '{name}', falling back to BeautifulSoup")
+        name = "bs4"
+
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
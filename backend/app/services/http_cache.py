@@ -0,0 +1,193 @@
+"""
+スクレイピング用の条件付き HTTP キャッシュ
+
+URL ごとに ETag / Last-Modified と本文をディスクに保存し、次回の取得では
+If-None-Match / If-Modified-Since を付けてリクエストする。
+304 Not Modified の場合は保存済みの本文を使う。
+情報源が前回の更新から変わったかどうかは、このキャッシュではなく
+data_updater が前回成功時のフィンガープリントと比較して判定する。
+
+本文はストリームで受信し、max_bytes を超えた時点で打ち切る (oversize)。
+stop_markers のいずれか（例: </main>）を受信した時点でも、
+必要な本文が揃ったとみなして残りを読まずに終了する。
+
+キャッシュファイルには本文全体が入るため、fetch_with_cache() では
+読み書きをスレッドで行い、並行する他のソースの取得を止めない。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class FetchResult:
+    url: str
+    text: str
+    status_code: int
+    # 304 で保存済みの本文を再利用したか
+    from_cache: bool
+    # max_bytes を超えたため本文を途中で打ち切ったか
+    oversize: bool = False
+    # stop_markers を受信したため残りを読まずに終了したか
+    stopped_early: bool = False
+    bytes_read: int = 0
+
+
+class HttpCache:
+    """URL ごとのレスポンスをディスクに保存するキャッシュ"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring broken HTTP cache entry for {url}: {e}")
+            return None
+
+    def store(
+        self, url: str, response: httpx.Response, text: str, oversize: bool = False
+    ) -> None:
+        entry = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": datetime.utcnow().isoformat() + "Z",
+            "oversize": oversize,
+            "body": text,
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # 書き込み途中のファイルを読まないよう一時ファイルから置き換える
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, self._path(url))
+        except Exception as e:
+            logger.warning(f"Failed to write HTTP cache for {url}: {e}")
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+_cache = HttpCache(Path(settings.http_cache_dir))
+
+
+def get_http_cache() -> HttpCache:
+    return _cache
+
+
+async def _read_bounded(
+    response: httpx.Response,
+    max_bytes: Optional[int],
+    stop_markers: Sequence[bytes],
+) -> Tuple[bytes, bool, bool]:
+    """
+    本文を max_bytes まで読む。
+    (本文, 上限を超えたか, stop_markers で打ち切ったか) を返す。
+    """
+    markers = [m.lower() for m in stop_markers]
+    overlap = max((len(m) for m in markers), default=0)
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        searched_from = max(0, len(body) - overlap)
+        body.extend(chunk)
+        if max_bytes is not None and len(body) > max_bytes:
+            return bytes(body[:max_bytes]), True, False
+        if markers:
+            window = bytes(body[searched_from:]).lower()
+            for marker in markers:
+                index = window.find(marker)
+                if index != -1:
+                    return bytes(body[:searched_from + index + len(marker)]), False, True
+    return bytes(body), False, False
+
+
+async def fetch_with_cache(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    cache: Optional[HttpCache] = None,
+    max_bytes: Optional[int] = None,
+    stop_markers: Sequence[bytes] = (),
+) -> FetchResult:
+    """
+    条件付きリクエストで URL を取得する。
+    HTTP エラーは httpx.HTTPStatusError として送出する。
+    """
+    if cache is None:
+        cache = _cache if settings.http_cache_enabled else None
+
+    entry = await asyncio.to_thread(cache.load, url) if cache is not None else None
+    request_headers = dict(headers or {})
+    if entry is not None and entry.get("body") is not None:
+        request_headers.update(HttpCache.conditional_headers(entry))
+
+    async with client.stream(
+        "GET",
+        url,
+        timeout=timeout,
+        follow_redirects=True,
+        headers=request_headers,
+    ) as response:
+        if response.status_code == 304 and entry is not None:
+            return FetchResult(
+                url=url,
+                text=entry["body"],
+                status_code=304,
+                from_cache=True,
+                oversize=entry.get("oversize", False),
+            )
+
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+
+        body, oversize, stopped_early = await _read_bounded(
+            response, max_bytes, stop_markers
+        )
+        text = body.decode(response.encoding or "utf-8", errors="replace")
+
+    if oversize:
+        logger.warning(f"{url} exceeded {max_bytes} bytes, truncated")
+    if cache is not None:
+        await asyncio.to_thread(cache.store, url, response, text, oversize)
+    return FetchResult(
+        url=url,
+        text=text,
+        status_code=response.status_code,
+        from_cache=False,
+        oversize=oversize,
+        stopped_early=stopped_early,
+        bytes_read=len(body),
+    )
@@ -0,0 +1,104 @@
+"""
+LLM の JSON 応答の逐次パーサ
+
+ストリーミングで受信した断片を feed() するたびに、
+{"models": [{...}, {...}]} または [{...}, {...}] の models 配列の要素のうち
+閉じ括弧まで受信できたモデルを dict として返す。
+
+括弧の対応がおかしい・配列の要素が JSON として解釈できないなど、
+応答の構造が壊れていることが分かった時点で StreamStructureError を送出する
+（残りの生成を待たずに打ち切れるようにするため）。
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class StreamStructureError(ValueError):
+    """JSON 応答の構造が壊れている"""
+
+
+class ModelArrayParser:
+    """models 配列の要素を、受信した順に 1 件ずつ取り出す"""
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        # 開いている括弧（"{" または "["）
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # ルートのオブジェクト直下で、次の文字列がキーかどうか
+        self._expect_key = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        # models 配列の深さと、受信中の要素の開始位置
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.text += chunk
+        completed = []
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            ch = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._expect_key and len(self._stack) == 1:
+                        self._key = text[self._string_start + 1:pos]
+                        self._expect_key = False
+                continue
+
+            if ch.isspace():
+                continue
+            if self.complete:
+                raise StreamStructureError(f"JSON の終了後に余分な文字があります: {ch!r}")
+            if not self._stack and ch not in "{[":
+                raise StreamStructureError(f"JSON が {{ または [ で始まっていません: {ch!r}")
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch in "{[":
+                self._open(ch, pos)
+            elif ch in "}]":
+                item = self._close(ch, pos)
+                if item is not None:
+                    completed.append(item)
+            elif ch == "," and self._stack == ["{"]:
+                self._expect_key = True
+        self._pos = len(text)
+        return completed
+
+    def _open(self, ch: str, pos: int) -> None:
+        if ch == "[" and self._array_depth is None and (
+            not self._stack or (self._stack == ["{"] and self._key == "models")
+        ):
+            self._array_depth = len(self._stack) + 1
+        elif ch == "{" and self._array_depth == len(self._stack) and self._stack[-1] == "[":
+            self._item_start = pos
+        self._stack.append(ch)
+        if self._stack == ["{"]:
+            self._expect_key = True
+
+    def _close(self, ch: str, pos: int) -> Optional[Dict[str, Any]]:
+        expected = "{" if ch == "}" else "["
+        if not self._stack or self._stack[-1] != expected:
+            raise StreamStructureError(f"{ch} に対応する括弧がありません（{pos} 文字目）")
+        self._stack.pop()
+        if not self._stack:
+            self.complete = True
+
+        if ch == "}" and self._item_start is not None and len(self._stack) == self._array_depth:
+            start, self._item_start = self._item_start, None
+            try:
+                return json.loads(self.text[start:pos + 1])
+            except json.JSONDecodeError as e:
+                raise StreamStructureError(f"モデルのデータを JSON として解釈できません: {e}")
+        return None
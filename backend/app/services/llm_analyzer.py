@@ -4,16 +4,51 @@ LLM を使った Copilot モデルデータ解析
 Phase 1 (GitHub 公式) で取得したモデル一覧を正として、
 Phase 2 (各プロバイダー) の詳細情報を組み合わせて
 最終的な models.json を生成する。
+
+表から規則で決まる項目（乗数・cost_tier・コンテキスト長など）は model_facts で埋め、
+LLM には説明や性能スコアなどの主観的な項目だけを生成させる。
 """
 
+import asyncio
+import contextlib
 import json
 import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
 import google.generativeai as genai
 
 from app.config import get_settings
+from app.services.llm_budget import LlmBudget, create_llm_budget, estimate_tokens
+from app.services.llm_cache import get_llm_cache, response_cache_key
+from app.services.json_stream import ModelArrayParser, StreamStructureError
+from app.services.llm_client import generate_content, stream_content
+from app.services.model_delta import has_unique_ids
+from app.services.model_facts import (
+    ModelFacts,
+    extract_model_facts,
+    name_key,
+    placeholder_model,
+)
+from app.services.prompt_builder import (
+    TokenCounter,
+    build_detail_context,
+    calibrate_token_counter,
+    compact_json,
+    fit_models_json,
+)
+from app.services.stage_timings import StageTimings
+from app.services.update_summary import summarize_changes
+from app.services.scraper import (
+    COMMON_SOURCE_IDS,
+    CONTENT_STATUSES,
+    GITHUB_SUPPORTED_MODELS_URL,
+    PROVIDER_SOURCE_IDS,
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -25,6 +60,47 @@ DATA_DIR = Path(__file__).parent.parent / "data"
 # プロンプト
 # ─────────────────────────────────────────────────────────────────
 
+# 1 モデル分の出力スキーマ（ANALYSIS_PROMPT / MODEL_ANALYSIS_PROMPT で共通）
+# provider・乗数・cost_tier・context_length・cost_efficiency などは model_facts で設定する
+_MODEL_SCHEMA = """\
+    {{
+      "id": "モデルID（小文字ケバブケース。例: gpt-5.1, claude-sonnet-4）",
+      "name": "表示名（例: GPT-5.1, Claude Sonnet 4）",
+      "description": "日本語での簡潔な説明（60文字以内）",
+      "context_window": コンテキストウィンドウのトークン数（整数。モデル一覧に記載がある場合はその値）,
+      "performance": {{
+        "speed": 1.0〜5.0,
+        "reasoning": 1.0〜5.0,
+        "coding": 1.0〜5.0,
+        "instruction_following": 1.0〜5.0,
+        "creativity": 1.0〜5.0,
+        "long_output": 1.0〜5.0
+      }},
+      "strengths": ["強み1", "強み2", "強み3"],
+      "cautions": ["注意点1", "注意点2"],
+      "best_for": ["最適な用途1", "最適な用途2", "最適な用途3"]
+    }}
+"""
+
+_FIELD_GUIDE = """\
+### performance の各軸の意味:
+- **speed**: 応答速度（高速なモデルほど高スコア）
+- **reasoning**: 推論力・多段階思考能力
+- **coding**: コード生成・理解・デバッグの精度
+- **instruction_following**: 指示追従性
+- **creativity**: 創造性・新しいアイデア提案能力
+- **long_output**: 長文出力の品質
+
+プロバイダー・乗数・コスト区分・リリース状況、コンテキスト長とコスト効率のスコアは
+公式の表から自動で設定するため出力不要です。
+
+### id の命名規則:
+- モデル名をそのまま小文字ケバブケースに変換
+- 例: "GPT-5.1" → "gpt-5.1", "Claude Sonnet 4" → "claude-sonnet-4"
+- 例: "Gemini 2.5 Pro" → "gemini-2.5-pro"
+- 例: "Claude Opus 4.6 (fast mode)" → "claude-opus-4.6-fast"
+"""
+
 ANALYSIS_PROMPT = """\
 あなたは GitHub Copilot で使用できる AI モデルの専門家です。
 
@@ -62,60 +138,617 @@ JSON で出力してください。
   "version": "ISO8601タイムスタンプ",
   "last_updated": "ISO8601タイムスタンプ",
   "models": [
-    {{
-      "id": "モデルID（小文字ケバブケース。例: gpt-5.1, claude-sonnet-4）",
-      "name": "表示名（例: GPT-5.1, Claude Sonnet 4）",
-      "provider": "プロバイダー名（OpenAI / Anthropic / Google / xAI / GitHub）",
-      "description": "日本語での簡潔な説明（60文字以内）",
-      "context_window": コンテキストウィンドウのトークン数（整数）,
-      "cost_tier": "free / low / medium / high / premium のいずれか",
-      "premium_multiplier": {{
-        "chat": "チャットの乗数（数値文字列 or 'Not applicable'）",
-        "completions": "補完の乗数（数値文字列 or 'Not applicable'）"
-      }},
-      "release_status": "GA / Public preview",
-      "performance": {{
-        "speed": 1.0〜5.0,
-        "reasoning": 1.0〜5.0,
-        "coding": 1.0〜5.0,
-        "context_length": 1.0〜5.0,
-        "cost_efficiency": 1.0〜5.0,
-        "instruction_following": 1.0〜5.0,
-        "creativity": 1.0〜5.0,
-        "long_output": 1.0〜5.0
-      }},
-      "strengths": ["強み1", "強み2", "強み3"],
-      "cautions": ["注意点1", "注意点2"],
-      "best_for": ["最適な用途1", "最適な用途2", "最適な用途3"],
-      "available": true
-    }}
-  ]
+""" + _MODEL_SCHEMA + """  ]
 }}
 ```
 
-### performance の各軸の意味:
-- **speed**: 応答速度（高速なモデルほど高スコア）
-- **reasoning**: 推論力・多段階思考能力
-- **coding**: コード生成・理解・デバッグの精度
-- **context_length**: コンテキスト長（128K=2.0, 200K=3.0, 1M=4.0, 2M+=5.0）
-- **cost_efficiency**: コスト効率（乗数0=5.0, 0.25~0.33=4.0, 1=3.0, 3=2.0, 30=1.0）
-- **instruction_following**: 指示追従性
-- **creativity**: 創造性・新しいアイデア提案能力
-- **long_output**: 長文出力の品質
+""" + _FIELD_GUIDE
 
-### cost_tier の決定基準:
-- free: 乗数 0
-- low: 乗数 0.25〜0.33
-- medium: 乗数 1
-- high: 乗数 3
-- premium: 乗数 30
+# 差分解析の 1 リクエストのプロンプト予算（llm_prompt_token_budget に対する割合）
+_CHUNK_BUDGET_RATIO = 0.5
+# 全体解析で「現在のシステムデータ」に割り当てる予算の上限（同上）
+_CURRENT_MODELS_BUDGET_RATIO = 0.25
 
-### id の命名規則:
-- モデル名をそのまま小文字ケバブケースに変換
-- 例: "GPT-5.1" → "gpt-5.1", "Claude Sonnet 4" → "claude-sonnet-4"
-- 例: "Gemini 2.5 Pro" → "gemini-2.5-pro"
-- 例: "Claude Opus 4.6 (fast mode)" → "claude-opus-4.6-fast"
-"""
+MODEL_ANALYSIS_PROMPT = """\
+あなたは GitHub Copilot で使用できる AI モデルの専門家です。
+
+## タスク
+以下の「対象モデル」について情報源を総合的に分析し、各モデルのデータを
+JSON で出力してください。対象モデル以外は出力しないでください。
+
+## 重要なルール
+1. 各モデルの id は「対象モデル」に記載された id をそのまま使用してください。
+2. 各モデルの情報は、各AI会社の公式情報やその他の情報源から総合的に判断してください。
+3. 情報が不確かな場合は、控えめな中央値（3.0）のスコアを付けてください。
+4. 現在のデータがあるモデルは、情報源から変化が読み取れる項目以外は現在の値を維持してください。
+
+## 対象モデル（GitHub 公式で確認された情報）
+{targets_json}
+
+## 対象モデルの現在のデータ（参考）
+{current_json}
+
+## 詳細情報（各プロバイダー等のスクレイピング結果）
+{detail_content}
+
+## 出力形式
+必ず以下の JSON スキーマに従って出力してください。配列の各要素は1つのモデルです。
+
+```json
+{{
+  "models": [
+""" + _MODEL_SCHEMA + """  ]
+}}
+```
+
+""" + _FIELD_GUIDE
+
+
+# ─────────────────────────────────────────────────────────────────
+# 差分解析の計画
+# ─────────────────────────────────────────────────────────────────
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"\s+", " ", name).strip().lower()
+
+
+def model_id_from_name(name: str) -> str:
+    """
+    表示名からモデル ID を作る（プロンプトの id 命名規則と同じ）
+    例: "Claude Opus 4.6 (fast mode)" → "claude-opus-4.6-fast"
+    """
+    text = re.sub(
+        r"\(([^)]*)\)",
+        lambda m: " " + re.sub(r"\bmode\b", "", m.group(1)),
+        name.lower(),
+    )
+    return re.sub(r"[^a-z0-9.]+", "-", text).strip("-")
+
+
+@dataclass
+class AnalysisTarget:
+    """LLM で解析するモデル"""
+
+    id: str
+    phase1: Dict[str, Any]
+    multiplier: Optional[Dict[str, str]]
+    current: Optional[Dict[str, Any]]
+
+    def prompt_entry(self) -> Dict[str, Any]:
+        entry = {"id": self.id, **self.phase1}
+        if self.multiplier is not None:
+            entry["premium_multiplier"] = self.multiplier
+        return entry
+
+
+@dataclass
+class AnalysisPlan:
+    """差分解析の対象と、LLM を使わずに引き継ぐモデル"""
+
+    targets: List[AnalysisTarget] = field(default_factory=list)
+    carried: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # 出力する models の順序（GitHub 公式ページの掲載順）
+    order: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # モデル ID → GitHub 公式ページでの表示名
+    names: Dict[str, str] = field(default_factory=dict)
+
+
+def _relevant_sources(provider: str) -> List[str]:
+    provider = provider.lower()
+    return COMMON_SOURCE_IDS + [
+        source_id for key, source_id in PROVIDER_SOURCE_IDS.items() if key in provider
+    ]
+
+
+def _phase1_changed(
+    current: Dict[str, Any], entry: Dict[str, Any], multiplier: Optional[Dict[str, str]]
+) -> bool:
+    if multiplier is not None and current.get("premium_multiplier") != multiplier:
+        return True
+    status = entry.get("status", "").strip()
+    return bool(status) and status.lower() != str(current.get("release_status", "")).lower()
+
+
+def plan_incremental_analysis(
+    copilot: Dict[str, Any],
+    current_data: Dict[str, Any],
+    changed_sources: Optional[List[str]],
+) -> AnalysisPlan:
+    """
+    Phase 1 のモデル一覧と現在のデータを突き合わせ、
+    追加されたモデル・公式情報が変わったモデル・関係する詳細情報ソースが
+    変わったモデル・前回仮データで追加したモデルを解析対象とする。
+    それ以外は現在のデータを引き継ぐ。
+    changed_sources が None の場合は全モデルを解析対象とする。
+    """
+    current_models = current_data.get("models", [])
+    by_name = {_normalize_name(m.get("name", "")): m for m in current_models}
+    by_id = {m["id"]: m for m in current_models}
+    retired = {_normalize_name(r["name"]) for r in copilot.get("retired", [])}
+    multipliers = copilot.get("multipliers", {})
+
+    plan = AnalysisPlan()
+    for entry in copilot.get("models", []):
+        key = _normalize_name(entry["name"])
+        if key in retired:
+            continue
+        current = by_name.get(key) or by_id.get(model_id_from_name(entry["name"]))
+        target_id = current["id"] if current is not None else model_id_from_name(entry["name"])
+        if target_id in plan.order:
+            continue
+        plan.order.append(target_id)
+        plan.names[target_id] = entry["name"]
+
+        multiplier = multipliers.get(entry["name"])
+        sources_changed = changed_sources is None or any(
+            source_id in changed_sources
+            for source_id in _relevant_sources(entry.get("provider", ""))
+        )
+        if (
+            current is None
+            or current.get("analysis_pending")
+            or sources_changed
+            or _phase1_changed(current, entry, multiplier)
+        ):
+            plan.targets.append(AnalysisTarget(target_id, entry, multiplier, current))
+        else:
+            plan.carried[target_id] = current
+
+    plan.removed = [m["id"] for m in current_models if m["id"] not in plan.order]
+    return plan
+
+
+def _chunk_targets(targets: List[AnalysisTarget], size: int) -> List[List[AnalysisTarget]]:
+    """同じプロバイダーのモデルをまとめて chunk に分ける（詳細情報を絞り込むため）"""
+    groups: Dict[str, List[AnalysisTarget]] = {}
+    for target in targets:
+        groups.setdefault(target.phase1.get("provider", "").lower(), []).append(target)
+    size = max(1, size)
+    return [
+        group[i:i + size]
+        for group in groups.values()
+        for i in range(0, len(group), size)
+    ]
+
+
+# ─────────────────────────────────────────────────────────────────
+# 差分解析
+# ─────────────────────────────────────────────────────────────────
+
+def _content_sources(detail_sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        src for src in detail_sources
+        if src.get("status") in CONTENT_STATUSES and src.get("content")
+    ]
+
+
+def _build_chunk_prompt(
+    chunk: List[AnalysisTarget],
+    detail_sources: List[Dict[str, Any]],
+    counter: Optional[TokenCounter] = None,
+    facts: Optional[Dict[str, ModelFacts]] = None,
+) -> str:
+    counter = counter or TokenCounter()
+    facts = facts or {}
+    relevant = set()
+    targets = []
+    for target in chunk:
+        relevant.update(_relevant_sources(target.phase1.get("provider", "")))
+        target_facts = facts.get(name_key(target.phase1["name"]))
+        targets.append({
+            **target.prompt_entry(),
+            **(target_facts.prompt_fields() if target_facts else {}),
+        })
+
+    prompt_args = {
+        "targets_json": compact_json(targets),
+        "current_json": compact_json([t.current for t in chunk if t.current is not None]),
+    }
+    budget = int(settings.llm_prompt_token_budget * _CHUNK_BUDGET_RATIO)
+    budget -= counter(MODEL_ANALYSIS_PROMPT.format(detail_content="", **prompt_args))
+    detail = build_detail_context(
+        [src for src in _content_sources(detail_sources) if src["id"] in relevant],
+        [t.phase1["name"] for t in chunk],
+        max(0, budget),
+        counter,
+    )
+    return MODEL_ANALYSIS_PROMPT.format(detail_content=detail.text, **prompt_args)
+
+
+def _generation_config(**overrides: Any) -> Dict[str, Any]:
+    config = {
+        "temperature": settings.llm_temperature,
+        "max_output_tokens": settings.llm_max_tokens,
+        "response_mime_type": "application/json",
+    }
+    config.update(overrides)
+    return config
+
+
+def _cache_key(
+    model_id: str, generation_config: Dict[str, Any], prompt: str, use_cache: bool
+) -> Optional[str]:
+    """LLM 応答キャッシュのキー（キャッシュを使わない場合は None）"""
+    if not use_cache or get_llm_cache() is None:
+        return None
+    return response_cache_key(model_id, generation_config, prompt)
+
+
+class IncompleteResponseError(Exception):
+    """ストリーミング中に応答が打ち切られた、または構造が壊れていた"""
+
+    def __init__(self, reason: str, models: List[Dict[str, Any]]):
+        super().__init__(reason)
+        # 打ち切るまでに最後まで受信できたモデル
+        self.models = models
+
+
+class ModelProgress:
+    """
+    ストリーミングで受信したモデル数を progress_callback に通知する（50-80%）。
+    progress_callback には models_parsed / models_total / analysis_incomplete を
+    キーワード引数で渡す。
+    """
+
+    def __init__(self, total: int, callback: Optional[Callable] = None):
+        self.total = max(1, total)
+        self.callback = callback
+        self.parsed = 0
+        self.complete = True
+
+    def _progress(self) -> int:
+        return 50 + int(min(self.parsed, self.total) / self.total * 30)
+
+    async def model_parsed(self, model: Dict[str, Any]) -> None:
+        await self.add_parsed(1)
+
+    async def add_parsed(self, count: int) -> None:
+        self.parsed += count
+        if self.callback:
+            await self.callback(
+                self._progress(),
+                f"AI によるデータ解析中... ({self.parsed}/{self.total} モデル)",
+                models_parsed=self.parsed,
+                models_total=self.total,
+            )
+
+    async def mark_incomplete(self, reason: str) -> None:
+        self.complete = False
+        if self.callback:
+            await self.callback(
+                self._progress(),
+                f"AI の応答が途中で終了しました（{reason}）。受信できたモデルのみ更新します",
+                analysis_incomplete=True,
+            )
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # 終了理由だけのチャンクなど、本文がない場合
+        return ""
+
+
+def _finish_reason(chunk: Any) -> str:
+    try:
+        reason = chunk.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return ""
+    return getattr(reason, "name", str(reason))
+
+
+async def _stream_json(
+    model: "genai.GenerativeModel",
+    prompt: str,
+    progress: Optional[ModelProgress] = None,
+) -> str:
+    """
+    応答をストリーミングで受信し、models 配列の要素を受信した順に progress に通知する。
+    構造が壊れていた場合や出力トークンの上限で打ち切られた場合は、
+    残りを受信せずに IncompleteResponseError を送出する。
+    """
+    parser = ModelArrayParser()
+    models: List[Dict[str, Any]] = []
+    async with contextlib.aclosing(stream_content(model, prompt)) as chunks:
+        async for chunk in chunks:
+            try:
+                parsed = parser.feed(_chunk_text(chunk))
+            except StreamStructureError as e:
+                raise IncompleteResponseError(f"応答の構造が壊れています: {e}", models)
+            for item in parsed:
+                models.append(item)
+                if progress is not None:
+                    await progress.model_parsed(item)
+            if _finish_reason(chunk) == "MAX_TOKENS":
+                raise IncompleteResponseError("出力トークンの上限に達しました", models)
+    if not parser.complete:
+        raise IncompleteResponseError("応答が JSON の途中で終了しました", models)
+    return parser.text
+
+
+async def _generate_cached(
+    model: "genai.GenerativeModel",
+    prompt: str,
+    cache_key: Optional[str],
+    parse: Callable[[str], Any],
+    budget: Optional[LlmBudget] = None,
+    stream: bool = False,
+    progress: Optional[ModelProgress] = None,
+) -> Any:
+    """
+    キャッシュに応答があればそれを、なければ LLM の応答を parse した結果を返す。
+    parse が例外を送出した応答（JSON として解釈できないなど）はキャッシュしない。
+    stream=True の場合は _stream_json() で受信する（途中で打ち切った応答もキャッシュしない）。
+    """
+    cache = get_llm_cache() if cache_key else None
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Using cached LLM response {cache_key[:12]}")
+            result = parse(cached)
+            if progress is not None:
+                # ストリーミングしない場合も、キャッシュから得たモデル数を進捗に反映する
+                models = result.get("models", []) if isinstance(result, dict) else result
+                await progress.add_parsed(len(models) if isinstance(models, list) else 0)
+            return result
+
+    acquire = (
+        budget.acquire(estimate_tokens(prompt) + settings.llm_max_tokens)
+        if budget is not None
+        else contextlib.nullcontext()
+    )
+    async with acquire:
+        if stream:
+            text = await _stream_json(model, prompt, progress)
+        else:
+            text = (await generate_content(model, prompt)).text
+
+    result = parse(text)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, cache_key, text)
+    return result
+
+
+def _match_targets(
+    targets: List[AnalysisTarget], returned: List[Any]
+) -> Dict[str, Dict[str, Any]]:
+    """LLM が返したモデルを ID または表示名で解析対象に対応づける"""
+    by_id = {m.get("id"): m for m in returned if isinstance(m, dict)}
+    by_name = {_normalize_name(m.get("name", "")): m for m in returned if isinstance(m, dict)}
+
+    analyzed = {}
+    for target in targets:
+        model_data = by_id.get(target.id) or by_name.get(_normalize_name(target.phase1["name"]))
+        if model_data is None:
+            logger.warning(f"LLM response did not include model {target.id}")
+            continue
+        # ID は計画時に決めたものに揃える（既存モデルの ID を変えない）
+        analyzed[target.id] = {**model_data, "id": target.id}
+    return analyzed
+
+
+async def _analyze_chunk(
+    model: "genai.GenerativeModel",
+    chunk: List[AnalysisTarget],
+    prompt: str,
+    budget: LlmBudget,
+    cache_key: Optional[str] = None,
+    progress: Optional[ModelProgress] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    1 チャンク分のモデルを解析し、ID → モデルデータを返す。
+    ストリーミング中に打ち切られた場合は、受信できたモデルだけを返す。
+    """
+    try:
+        data = await _generate_cached(
+            model, prompt, cache_key, json.loads, budget,
+            stream=settings.llm_streaming, progress=progress,
+        )
+    except IncompleteResponseError as e:
+        logger.warning(f"LLM chunk response incomplete ({e}), keeping {len(e.models)} parsed models")
+        if progress is not None:
+            await progress.mark_incomplete(str(e))
+        data = e.models
+    returned = data if isinstance(data, list) else data.get("models", [])
+    return _match_targets(chunk, returned)
+
+
+async def _analyze_incremental(
+    scraped_data: Dict[str, Any],
+    current_data: Dict[str, Any],
+    model_id: str,
+    changed_sources: Optional[List[str]],
+    progress_callback: Optional[Callable] = None,
+    timings: Optional[StageTimings] = None,
+    use_cache: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """追加・変更されたモデルだけを chunk に分けて並列に解析し、現在のデータにマージする"""
+    timings = timings or StageTimings()
+    copilot = scraped_data.get("copilot_models", {})
+    plan = plan_incremental_analysis(copilot, current_data, changed_sources)
+    facts = extract_model_facts(copilot, scraped_data.get("detail_sources", []))
+    chunks = _chunk_targets(plan.targets, settings.llm_chunk_size)
+    logger.info(
+        f"Incremental analysis: {len(plan.targets)} models in {len(chunks)} chunks, "
+        f"{len(plan.carried)} carried over, {len(plan.removed)} removed"
+    )
+
+    analyzed: Dict[str, Dict[str, Any]] = {}
+    if chunks:
+        if progress_callback:
+            await progress_callback(
+                50, f"AI によるデータ解析中... ({len(plan.targets)} モデル / {len(chunks)} リクエスト)"
+            )
+
+        generation_config = _generation_config()
+        model = genai.GenerativeModel(model_name=model_id, generation_config=generation_config)
+        budget = create_llm_budget()
+        detail_sources = scraped_data.get("detail_sources", [])
+        with timings.measure("prompt"):
+            counter = await calibrate_token_counter(
+                model, "\n".join(src["content"] for src in _content_sources(detail_sources))
+            )
+            prompts = [
+                _build_chunk_prompt(chunk, detail_sources, counter, facts) for chunk in chunks
+            ]
+        progress = ModelProgress(len(plan.targets), progress_callback)
+        tasks = [
+            asyncio.ensure_future(_analyze_chunk(
+                model, chunk, prompt, budget,
+                _cache_key(model_id, generation_config, prompt, use_cache),
+                progress,
+            ))
+            for chunk, prompt in zip(chunks, prompts)
+        ]
+        # 並列に実行するため llm には全チャンクの完了までの実時間を記録する
+        llm_started = time.perf_counter()
+
+        failed = 0
+        try:
+            for i, task in enumerate(asyncio.as_completed(tasks)):
+                try:
+                    analyzed.update(await task)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"LLM chunk analysis failed: {e}")
+                # ストリーミング時はモデル単位で ModelProgress が通知する
+                if progress_callback and not settings.llm_streaming:
+                    await progress_callback(
+                        50 + int((i + 1) / len(chunks) * 30),  # 50-80%
+                        f"AI によるデータ解析中... ({i + 1}/{len(chunks)})",
+                    )
+        finally:
+            # キャンセル時に残りのチャンクを実行し続けないようにする
+            for task in tasks:
+                task.cancel()
+            timings.add("llm", (time.perf_counter() - llm_started) * 1000)
+
+        if failed == len(chunks):
+            return None
+
+        # 失敗した chunk や応答に含まれなかったモデルは現在のデータ（仮データ）のままになる。
+        # 不完全な解析として記録し、次回の更新で情報源が同じでも解析し直すようにする
+        missing = [target.id for target in plan.targets if target.id not in analyzed]
+        if missing:
+            logger.warning(
+                f"{len(missing)} models were not analyzed ({failed} chunks failed): "
+                f"{', '.join(missing)}"
+            )
+            if progress_callback:
+                await progress_callback(
+                    80,
+                    f"{len(missing)} モデルを AI で解析できませんでした。解析できたモデルのみ更新します",
+                    analysis_incomplete=True,
+                )
+
+    if progress_callback:
+        await progress_callback(80, "解析結果を処理中...")
+
+    return _merge_plan(plan, analyzed, current_data, facts)
+
+
+def _merge_plan(
+    plan: AnalysisPlan,
+    analyzed: Dict[str, Dict[str, Any]],
+    current_data: Dict[str, Any],
+    facts: Dict[str, ModelFacts],
+    keep_unlisted: bool = False,
+) -> Dict[str, Any]:
+    """
+    解析結果・引き継ぐモデル・現在のデータを Phase 1 の順に並べ、表から決まる項目を上書きする。
+    解析できなかった新しいモデルは仮データで追加する（次回の解析対象になる）。
+    keep_unlisted=True の場合（Phase 1 の一覧が途中までしか取れていない場合）は、
+    一覧にない現在のモデルを削除せずに末尾に残す。
+    """
+    current_by_id = {m["id"]: m for m in current_data.get("models", [])}
+    models = []
+    for target_id in plan.order:
+        current = current_by_id.get(target_id)
+        model_facts = facts.get(name_key(plan.names[target_id]))
+        if target_id in analyzed:
+            model = analyzed[target_id]
+        elif target_id in plan.carried:
+            model = plan.carried[target_id]
+        elif current is not None:
+            # 解析に失敗した既存モデルは現在のデータを維持する
+            logger.warning(f"Keeping current data for {target_id} (not analyzed)")
+            model = current
+        elif model_facts is not None:
+            logger.warning(f"Adding new model {target_id} with placeholder data (not analyzed)")
+            models.append(placeholder_model(target_id, model_facts))
+            continue
+        else:
+            logger.warning(f"Skipping new model {target_id} (not analyzed)")
+            continue
+        models.append(model_facts.apply(model, current) if model_facts else model)
+    if keep_unlisted:
+        models.extend(current_by_id[model_id] for model_id in plan.removed)
+
+    now = datetime.utcnow().isoformat() + "Z"
+    result = {k: v for k, v in current_data.items() if k != "models"}
+    result.update({"version": now, "last_updated": now, "models": models})
+    return result
+
+
+def build_rule_based_update(
+    scraped_data: Dict[str, Any], current_data: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    LLM を使わずに作る部分的な更新データ。
+    Phase 1 の一覧どおりにモデルを追加・削除し、表から決まる項目だけを更新する。
+    説明や性能スコアは現在の値を維持し、新しいモデルは仮データにする。
+    Phase 1 の一覧を完全に取得できていない場合は None を返す。
+    """
+    copilot = scraped_data.get("copilot_models", {})
+    if copilot.get("status") != "success" or not copilot.get("models"):
+        return None
+    facts = extract_model_facts(copilot, scraped_data.get("detail_sources", []))
+    plan = plan_incremental_analysis(copilot, current_data, changed_sources=[])
+    return _merge_plan(plan, {}, current_data, facts)
+
+
+# ─────────────────────────────────────────────────────────────────
+# 解析
+# ─────────────────────────────────────────────────────────────────
+
+def _prompt_fields(facts: Dict[str, ModelFacts], name: str) -> Dict[str, Any]:
+    model_facts = facts.get(name_key(name))
+    return model_facts.prompt_fields() if model_facts else {}
+
+
+def _apply_facts(
+    analyzed_data: Dict[str, Any],
+    facts: Dict[str, ModelFacts],
+    current_data: Dict[str, Any],
+    complete_list: bool = True,
+) -> Dict[str, Any]:
+    """
+    全体解析の結果に表から決まる項目を上書きする。
+    complete_list=True の場合は公式の一覧にないモデルを除く。
+    一覧が途中までしか取れていない場合（oversize など）は一覧にないことが削除を意味しないため、
+    LLM の出力をそのまま残し、LLM の出力にもない現在のモデルも維持する。
+    """
+    by_id = {model_id_from_name(f.name): f for f in facts.values()}
+    current_by_id = {m["id"]: m for m in current_data.get("models", [])}
+    models = []
+    for model in analyzed_data.get("models", []):
+        model_facts = facts.get(name_key(model.get("name", ""))) or by_id.get(model.get("id"))
+        if model_facts is None:
+            if complete_list:
+                logger.warning(f"Dropping model not on the GitHub supported models page: {model.get('id')}")
+                continue
+            models.append(model)
+            continue
+        models.append(model_facts.apply(model, current_by_id.get(model.get("id"))))
+    if not complete_list:
+        returned = {m.get("id") for m in models}
+        for model_id, current in current_by_id.items():
+            if model_id not in returned:
+                logger.warning(f"Keeping current data for {model_id} (Phase 1 list incomplete)")
+                models.append(current)
+    return {**analyzed_data, "models": models}
 
 
 async def analyze_with_llm(
@@ -123,18 +756,29 @@ async def analyze_with_llm(
     model_id: str,
     api_key: str,
     progress_callback: Optional[Callable] = None,
+    changed_sources: Optional[List[str]] = None,
+    timings: Optional[StageTimings] = None,
+    use_cache: bool = True,
 ) -> Optional[Dict[str, Any]]:
     """
     Phase 1 + Phase 2 のスクレイピング結果を LLM で解析し、
     更新された models.json データを返す。
 
+    llm_incremental_analysis が有効な場合は、追加・変更されたモデルだけを
+    解析して現在のデータにマージする。
+
     Args:
         scraped_data: scrape_all_sources() の返り値
             {
                 "copilot_models": { ... },
                 "detail_sources": [ ... ],
             }
+        changed_sources: 前回から内容が変わった情報源の ID。
+            None の場合は全モデルを解析し直す
+        timings: 指定した場合、prompt / llm の所要時間を記録する
+        use_cache: False の場合は LLM 応答キャッシュを使わずに必ず LLM を呼ぶ
     """
+    timings = timings or StageTimings()
     try:
         genai.configure(api_key=api_key)
 
@@ -148,131 +792,166 @@ async def analyze_with_llm(
 
         # Phase 1 データ
         copilot = scraped_data.get("copilot_models", {})
-        copilot_models_json = json.dumps(
-            copilot.get("models", []), ensure_ascii=False, indent=2
-        )
-        multipliers_json = json.dumps(
-            copilot.get("multipliers", {}), ensure_ascii=False, indent=2
-        )
-        retired_json = json.dumps(
-            copilot.get("retired", []), ensure_ascii=False, indent=2
-        )
 
-        # Phase 2 詳細データを結合
-        detail_content = ""
-        for src in scraped_data.get("detail_sources", []):
-            if src.get("status") == "success" and src.get("content"):
-                detail_content += f"\n\n### {src['name']} ({src['url']})\n"
-                detail_content += src["content"]
-
-        # GitHub 公式ページの生テキストも追加
-        github_raw = copilot.get("raw_text", "")
-        if github_raw:
-            detail_content = (
-                f"### GitHub Copilot Supported Models (raw)\n{github_raw}\n"
-                + detail_content
+        # 一覧が途中までしか取れていない場合はモデルの削除と区別できないため全体解析する
+        if (
+            settings.llm_incremental_analysis
+            and copilot.get("status") == "success"
+            and copilot.get("models")
+            and has_unique_ids(current_models)
+        ):
+            return await _analyze_incremental(
+                scraped_data,
+                current_models,
+                model_id,
+                changed_sources,
+                progress_callback,
+                timings,
+                use_cache,
             )
 
-        if progress_callback:
-            await progress_callback(50, "AI によるデータ解析中...")
-
-        prompt = ANALYSIS_PROMPT.format(
-            copilot_models_json=copilot_models_json,
-            multipliers_json=multipliers_json,
-            retired_json=retired_json,
-            detail_content=detail_content[:60000],
-            current_models_json=json.dumps(
-                current_models, ensure_ascii=False, indent=2
-            )[:10000],
-        )
+        # 解析対象となる公式のモデル一覧がなければ LLM を呼ばない
+        if not copilot.get("models"):
+            logger.warning("No models found on the GitHub supported models page, skipping LLM analysis")
+            return None
+        facts = extract_model_facts(copilot, scraped_data.get("detail_sources", []))
+        # 一覧が完全に取れている場合だけ、一覧にないモデルを削除されたとみなす
+        complete_list = copilot.get("status") == "success"
 
         # Gemini モデルで解析
-        model = genai.GenerativeModel(
-            model_name=model_id,
-            generation_config={
-                "temperature": settings.llm_temperature,
-                "max_output_tokens": settings.llm_max_tokens,
-                "response_mime_type": "application/json",
-            },
-        )
+        generation_config = _generation_config()
+        model = genai.GenerativeModel(model_name=model_id, generation_config=generation_config)
 
-        response = model.generate_content(prompt)
+        # Phase 2 詳細データ（GitHub 公式ページの生テキストを先頭に加える）
+        sources = _content_sources(scraped_data.get("detail_sources", []))
+        github_raw = copilot.get("raw_text", "")
+        if github_raw:
+            sources.insert(0, {
+                "name": "GitHub Copilot Supported Models (raw)",
+                "url": GITHUB_SUPPORTED_MODELS_URL,
+                "content": github_raw,
+            })
 
         if progress_callback:
-            await progress_callback(80, "解析結果を処理中...")
+            await progress_callback(50, "AI によるデータ解析中...")
+
+        with timings.measure("prompt"):
+            counter = await calibrate_token_counter(
+                model, "\n".join(src["content"] for src in sources)
+            )
+            token_budget = settings.llm_prompt_token_budget
+            prompt_args = {
+                "copilot_models_json": compact_json([
+                    {**m, **_prompt_fields(facts, m["name"])} for m in copilot.get("models", [])
+                ]),
+                "multipliers_json": compact_json(copilot.get("multipliers", {})),
+                "retired_json": compact_json(copilot.get("retired", [])),
+                "current_models_json": fit_models_json(
+                    current_models.get("models", []),
+                    int(token_budget * _CURRENT_MODELS_BUDGET_RATIO),
+                    counter,
+                ),
+            }
+            # 詳細情報には、それ以外の部分を除いた残りの予算を使う
+            skeleton = ANALYSIS_PROMPT.format(detail_content="", **prompt_args)
+            detail = build_detail_context(
+                sources,
+                [m["name"] for m in copilot.get("models", []) if m.get("name")],
+                max(0, token_budget - counter(skeleton)),
+                counter,
+            )
+            logger.info(
+                f"Prompt detail: {detail.tokens} tokens, {detail.chunks_used}/{detail.chunks_total} chunks "
+                f"from {len(detail.sources_used)}/{len(sources)} sources, "
+                f"{detail.boilerplate_lines} boilerplate lines removed"
+            )
+            prompt = ANALYSIS_PROMPT.format(detail_content=detail.text, **prompt_args)
 
         # レスポンスの JSON をパース
+        progress = ModelProgress(len(copilot.get("models", [])), progress_callback)
         try:
-            result_text = response.text
-            analyzed_data = json.loads(result_text)
-            return analyzed_data
+            with timings.measure("llm"):
+                analyzed_data = await _generate_cached(
+                    model,
+                    prompt,
+                    _cache_key(model_id, generation_config, prompt, use_cache),
+                    json.loads,
+                    stream=settings.llm_streaming,
+                    progress=progress,
+                )
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response as JSON: {e}")
-            logger.error(f"Response text: {response.text[:500]}")
+            logger.error(f"Response text: {e.doc[:500]}")
             return None
+        except IncompleteResponseError as e:
+            # 受信できたモデルだけを解析結果とし、残りは現在のデータ（新モデルは仮データ）にする
+            logger.warning(f"LLM response incomplete ({e}), keeping {len(e.models)} parsed models")
+            await progress.mark_incomplete(str(e))
+            plan = plan_incremental_analysis(copilot, current_models, changed_sources=None)
+            return _merge_plan(
+                plan,
+                _match_targets(plan.targets, e.models),
+                current_models,
+                facts,
+                keep_unlisted=not complete_list,
+            )
+
+        if progress_callback:
+            await progress_callback(80, "解析結果を処理中...")
+
+        return _apply_facts(analyzed_data, facts, current_models, complete_list)
 
     except Exception as e:
         logger.error(f"LLM analysis failed: {e}")
         return None
 
 
+def _nonempty_text(text: str) -> str:
+    text = text.strip()
+    if not text:
+        raise ValueError("LLM の応答が空でした")
+    return text
+
+
 async def generate_update_summary(
     old_data: Dict,
     new_data: Dict,
     model_id: str,
     api_key: str,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
-    """更新内容のサマリを生成する"""
+    """
+    更新内容のサマリを生成する。
+
+    追加・削除・更新されたモデルと主な変更点は models.json の差分から決定的に作る
+    （update_summary.summarize_changes）。LLM_POLISH_SUMMARY が有効な場合だけ、
+    overall_summary の文章を LLM で整える（失敗時は差分から作った文章のまま）。
+    """
+    summary = summarize_changes(old_data, new_data)
+    if not settings.llm_polish_summary or not api_key:
+        return summary
+
     try:
         genai.configure(api_key=api_key)
 
-        model = genai.GenerativeModel(
-            model_name=model_id,
-            generation_config={
-                "temperature": 0.1,
-                "max_output_tokens": 2048,
-                "response_mime_type": "application/json",
-            },
-        )
-
-        old_ids = {m["id"] for m in old_data.get("models", [])}
-        new_ids = {m["id"] for m in new_data.get("models", [])}
-        added = new_ids - old_ids
-        removed = old_ids - new_ids
+        generation_config = {"temperature": 0.1, "max_output_tokens": 512}
+        model = genai.GenerativeModel(model_name=model_id, generation_config=generation_config)
 
         prompt = f"""
-以下の変更内容を日本語で簡潔にサマリしてください。JSONで返してください。
-
-追加されたモデル: {list(added)}
-削除されたモデル: {list(removed)}
-変更前のモデル数: {len(old_data.get("models", []))}
-変更後のモデル数: {len(new_data.get("models", []))}
+以下のモデルデータの更新内容を、利用者向けに日本語 2〜3 文で簡潔にまとめてください。
+まとめた文章だけを返してください。
 
-変更前 (IDリスト):
-{[m["id"] for m in old_data.get("models", [])]}
-
-変更後 (IDリスト):
-{[m["id"] for m in new_data.get("models", [])]}
-
-出力形式:
-{{
-  "models_added": ["追加されたモデルの表示名"],
-  "models_removed": ["削除されたモデルの表示名"],
-  "models_updated": ["スコア等が更新されたモデル名"],
-  "key_changes": ["主な変更点の説明（最大5件）"],
-  "overall_summary": "全体的な変更内容の説明"
-}}
+{compact_json({k: summary[k] for k in ("models_added", "models_removed", "models_updated", "key_changes")})}
 """
 
-        response = model.generate_content(prompt)
-        return json.loads(response.text)
+        summary["overall_summary"] = await _generate_cached(
+            model,
+            prompt,
+            _cache_key(model_id, generation_config, prompt, use_cache),
+            _nonempty_text,
+        )
 
     except Exception as e:
-        logger.error(f"Failed to generate update summary: {e}")
-        return {
-            "models_added": [],
-            "models_removed": [],
-            "models_updated": [],
-            "key_changes": ["更新が完了しました"],
-            "overall_summary": "データが更新されました",
-        }
+        logger.error(f"Failed to polish update summary: {e}")
+
+    return summary
@@ -0,0 +1,85 @@
+"""
+LLM 呼び出しの同時実行数とレート制限の管理
+
+Gemini API の RPM (1 分あたりのリクエスト数) / TPM (1 分あたりのトークン数)
+を超えないよう、直近 1 分間の呼び出し実績を見て待機してから呼び出す。
+同時実行数はセマフォで制限する。
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+_WINDOW_SECONDS = 60.0
+
+
+def estimate_tokens(text: str) -> int:
+    """プロンプトのトークン数の概算（日本語混じりのため 1 トークン ≒ 3 文字）"""
+    return len(text) // 3 + 1
+
+
+class LlmBudget:
+    """同時実行数と RPM / TPM の上限を守るためのリミッタ"""
+
+    def __init__(self, max_concurrency: int, rpm_limit: int, tpm_limit: int):
+        self.rpm_limit = max(1, rpm_limit)
+        self.tpm_limit = max(1, tpm_limit)
+        # RPM を超える同時実行は意味がないため RPM でも制限する
+        self.max_concurrency = max(1, min(max_concurrency, self.rpm_limit))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+        # 直近の呼び出し (開始時刻, 見積もりトークン数)
+        self._calls: Deque[Tuple[float, int]] = deque()
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] >= _WINDOW_SECONDS:
+            self._calls.popleft()
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        self._prune(now)
+        if not self._calls:
+            return 0.0
+        if len(self._calls) >= self.rpm_limit:
+            return self._calls[0][0] + _WINDOW_SECONDS - now
+        used = sum(t for _, t in self._calls)
+        if used + tokens > self.tpm_limit:
+            # 必要な分のトークンが窓から外れるまで待つ
+            for started, spent in self._calls:
+                used -= spent
+                if used + tokens <= self.tpm_limit:
+                    return started + _WINDOW_SECONDS - now
+        return 0.0
+
+    async def _reserve(self, tokens: int) -> None:
+        # 1 回の呼び出しが TPM を超える場合は窓が空くのを待って実行する
+        tokens = min(tokens, self.tpm_limit)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._calls.append((now, tokens))
+                    return
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int) -> AsyncIterator[None]:
+        """tokens 分の呼び出し枠を確保する"""
+        async with self._semaphore:
+            await self._reserve(tokens)
+            yield
+
+
+def create_llm_budget() -> LlmBudget:
+    """設定値から 1 回のデータ更新で使うリミッタを作成する"""
+    return LlmBudget(
+        max_concurrency=settings.llm_max_concurrency,
+        rpm_limit=settings.llm_rpm_limit,
+        tpm_limit=settings.llm_tpm_limit,
+    )
@@ -0,0 +1,140 @@
+"""
+LLM 応答のディスクキャッシュ
+
+(モデル ID, generation_config, プロンプト) のハッシュをキーに応答の本文を保存し、
+同じプロンプトの再実行（失敗後の再試行や、情報源が変わっていない再更新）では
+Gemini を呼ばずに保存済みの応答を返す。
+
+- 有効期限 (llm_cache_ttl 秒) を過ぎたエントリは使わない
+- 合計サイズが llm_cache_max_bytes を超えたら古いエントリから削除する
+  （合計サイズは書き込みごとに加算して追跡し、上限を超えたときだけディレクトリを走査する）
+- JSON として解釈できなかった応答など、呼び出し側が使えなかった応答は保存しない
+
+ファイル操作は同期的に行うため、async 関数からは asyncio.to_thread() 経由で呼ぶ。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def response_cache_key(model_id: str, generation_config: Dict[str, Any], prompt: str) -> str:
+    payload = json.dumps(
+        {"model": model_id, "generation_config": generation_config, "prompt": prompt},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """キーごとに応答を 1 ファイルとして保存するキャッシュ"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int, ttl: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 追跡している合計サイズ（最初の書き込みまでは未計算）
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring broken LLM cache entry {key}: {e}")
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            self._remove(path)
+            return None
+        # 最近使ったエントリを削除対象から外す
+        os.utime(path)
+        return entry.get("text")
+
+    def put(self, key: str, text: str) -> None:
+        entry = {"created_at": time.time(), "text": text}
+        path = self._path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                if self._size is None:
+                    self._size = self._scan_size()
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            # 書き込み途中のファイルを読まないよう一時ファイルから置き換える
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            written = os.path.getsize(tmp)
+            os.replace(tmp, path)
+            with self._lock:
+                self._size += written - replaced
+                if self._size > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat, _ in self._entries())
+
+    def _entries(self) -> List[Tuple[float, os.stat_result, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat, path))
+        return entries
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えた分を、最後に使った時刻が古い順に削除する（_lock 内で呼ぶ）"""
+        entries = self._entries()
+        total = sum(stat.st_size for _, stat, _ in entries)
+        for _, stat, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+        self._size = total
+
+
+_cache = LlmResponseCache(
+    Path(settings.llm_cache_dir), settings.llm_cache_max_bytes, settings.llm_cache_ttl
+)
+
+
+def get_llm_cache() -> Optional[LlmResponseCache]:
+    """キャッシュが無効な場合は None"""
+    return _cache if settings.llm_cache_enabled else None
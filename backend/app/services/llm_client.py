@@ -0,0 +1,143 @@
+"""
+Gemini SDK 呼び出しの非同期ラッパ
+
+google-generativeai の generate_content() は同期 API のため、
+async 関数から直接呼ぶとイベントループ全体が応答を待つ間止まってしまう。
+LLM 呼び出しは専用の上限つきスレッドプールで実行し、
+呼び出しごとにタイムアウトを設ける。
+
+呼び出し側のタスクがキャンセルされた場合は結果を待たずに戻る
+（実行中のリクエスト自体は SDK 側のタイムアウトで打ち切られる）。
+
+stream_content() はストリーミング生成のチャンクを 1 件ずつスレッドプールで受信する。
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.llm_executor_workers),
+    thread_name_prefix="llm",
+)
+
+
+class LlmTimeoutError(Exception):
+    """LLM 呼び出しがタイムアウトした"""
+
+
+async def generate_content(
+    model: Any, prompt: str, timeout: Optional[float] = None
+) -> Any:
+    """
+    model.generate_content(prompt) をスレッドプールで実行して結果を返す。
+    timeout 秒以内に応答がなければ LlmTimeoutError を送出する。
+    """
+    if timeout is None:
+        timeout = settings.llm_request_timeout
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _executor,
+        functools.partial(
+            model.generate_content, prompt, request_options={"timeout": timeout}
+        ),
+    )
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM request timed out after {timeout}s")
+        raise LlmTimeoutError(f"LLM の応答が {timeout} 秒以内にありませんでした")
+
+
+async def count_tokens(model: Any, text: str, timeout: Optional[float] = None) -> int:
+    """model.count_tokens(text) をスレッドプールで実行してトークン数を返す"""
+    if timeout is None:
+        timeout = settings.llm_request_timeout
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _executor,
+        functools.partial(
+            model.count_tokens, text, request_options={"timeout": timeout}
+        ),
+    )
+    try:
+        response = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise LlmTimeoutError(f"トークン数の取得が {timeout} 秒以内に終わりませんでした")
+    return int(response.total_tokens)
+
+
+_STREAM_END = object()
+
+
+def _close_stream(response: Any, chunks: Any) -> None:
+    """読み終える前に打ち切ったストリーミング応答の接続を閉じる"""
+    # SDK の応答は下位のストリーム（gRPC なら cancel()、REST なら close()）を _iterator に持つ
+    inner = getattr(response, "_iterator", None)
+    for name in ("cancel", "close"):
+        method = getattr(inner, name, None)
+        if callable(method):
+            method()
+            break
+    close = getattr(chunks, "close", None)
+    if callable(close):
+        try:
+            close()
+        except ValueError:
+            # タイムアウトした next() がまだ別スレッドで実行中
+            pass
+
+
+async def stream_content(
+    model: Any, prompt: str, timeout: Optional[float] = None
+) -> AsyncIterator[Any]:
+    """
+    model.generate_content(prompt, stream=True) の応答チャンクを受信した順に返す。
+    次のチャンクが timeout 秒以内に届かなければ LlmTimeoutError を送出する。
+    呼び出し側が途中で読むのをやめた場合は、残りを受信せずにストリームを閉じる。
+    """
+    if timeout is None:
+        timeout = settings.llm_request_timeout
+
+    loop = asyncio.get_running_loop()
+    response = None
+    chunks = None
+    finished = False
+    try:
+        response = await asyncio.wait_for(
+            loop.run_in_executor(
+                _executor,
+                functools.partial(
+                    model.generate_content, prompt, stream=True, request_options={"timeout": timeout}
+                ),
+            ),
+            timeout,
+        )
+        chunks = iter(response)
+        while True:
+            chunk = await asyncio.wait_for(
+                loop.run_in_executor(_executor, next, chunks, _STREAM_END), timeout
+            )
+            if chunk is _STREAM_END:
+                finished = True
+                return
+            yield chunk
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM stream stalled for {timeout}s")
+        raise LlmTimeoutError(f"LLM の応答が {timeout} 秒以上途切れました")
+    finally:
+        if response is not None and not finished:
+            try:
+                # 接続の切断はブロックすることがあるためスレッドプールで行う
+                await loop.run_in_executor(_executor, _close_stream, response, chunks)
+            except Exception as e:
+                logger.warning(f"Failed to close LLM stream: {e}")
@@ -0,0 +1,149 @@
+"""
+models.json の構造的な差分
+
+モデル ID 単位で追加・削除・フィールドごとの変更（変更前 / 変更後の値）を
+記録する。変更前後の両方の値を持つため、差分はどちら向きにも適用できる。
+
+    {
+      "meta": {"version": {"old": "...", "new": "..."}},
+      "added": [{...モデル...}],
+      "removed": [{...モデル...}],
+      "changed": {"gpt-4.1": {"description": {"old": "...", "new": "..."}}},
+      "order": {"old": ["gpt-4.1", ...], "new": [...]}
+    }
+
+変更がない場合は空の dict になる。
+"""
+
+from typing import Any, Dict, List, Optional
+
+_MISSING = object()
+
+
+def _pair(old: Any, new: Any) -> Dict[str, Any]:
+    pair = {}
+    if old is not _MISSING:
+        pair["old"] = old
+    if new is not _MISSING:
+        pair["new"] = new
+    return pair
+
+
+def _dict_diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    diff = {}
+    for key in list(old.keys()) + [k for k in new.keys() if k not in old]:
+        old_value = old.get(key, _MISSING)
+        new_value = new.get(key, _MISSING)
+        if old_value != new_value:
+            diff[key] = _pair(old_value, new_value)
+    return diff
+
+
+def _model_ids(data: Dict[str, Any]) -> Optional[List[str]]:
+    models = data.get("models", [])
+    if not isinstance(models, list) or not all(
+        isinstance(m, dict) and "id" in m for m in models
+    ):
+        return None
+    ids = [m["id"] for m in models]
+    return ids if len(set(ids)) == len(ids) else None
+
+
+def has_unique_ids(data: Dict[str, Any]) -> bool:
+    """models がオブジェクトのリストで、モデル ID が一意かどうか"""
+    return _model_ids(data) is not None
+
+
+def can_diff(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """モデル ID で対応づけられる（ID が一意な）データかどうか"""
+    return has_unique_ids(old) and has_unique_ids(new)
+
+
+def diff_models_data(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """2 つの models.json データの差分を計算する"""
+    old_ids = _model_ids(old)
+    new_ids = _model_ids(new)
+    if old_ids is None or new_ids is None:
+        raise ValueError("models must be a list of objects with unique ids")
+
+    delta: Dict[str, Any] = {}
+
+    meta = _dict_diff(
+        {k: v for k, v in old.items() if k != "models"},
+        {k: v for k, v in new.items() if k != "models"},
+    )
+    if meta:
+        delta["meta"] = meta
+
+    old_by_id = {m["id"]: m for m in old.get("models", [])}
+    new_by_id = {m["id"]: m for m in new.get("models", [])}
+
+    added = [new_by_id[i] for i in new_ids if i not in old_by_id]
+    removed = [old_by_id[i] for i in old_ids if i not in new_by_id]
+    changed = {}
+    for model_id in new_ids:
+        if model_id in old_by_id:
+            fields = _dict_diff(old_by_id[model_id], new_by_id[model_id])
+            if fields:
+                changed[model_id] = fields
+
+    if added:
+        delta["added"] = added
+    if removed:
+        delta["removed"] = removed
+    if changed:
+        delta["changed"] = changed
+    if old_ids != new_ids:
+        delta["order"] = {"old": old_ids, "new": new_ids}
+    return delta
+
+
+def apply_delta(
+    base: Dict[str, Any], delta: Dict[str, Any], reverse: bool = False
+) -> Dict[str, Any]:
+    """
+    差分を適用したデータを返す（base は変更しない）。
+    reverse=True の場合は変更後のデータから変更前のデータを復元する。
+    """
+    if not delta:
+        return base
+
+    src, dst = ("new", "old") if reverse else ("old", "new")
+
+    result = {k: v for k, v in base.items() if k != "models"}
+    for key, pair in delta.get("meta", {}).items():
+        if dst in pair:
+            result[key] = pair[dst]
+        else:
+            result.pop(key, None)
+
+    by_id = {m["id"]: m for m in base.get("models", [])}
+    incoming = delta.get("removed" if reverse else "added", [])
+    outgoing = delta.get("added" if reverse else "removed", [])
+    for model in outgoing:
+        by_id.pop(model["id"], None)
+    for model in incoming:
+        by_id[model["id"]] = model
+
+    for model_id, fields in delta.get("changed", {}).items():
+        model = dict(by_id[model_id])
+        for field, pair in fields.items():
+            if dst in pair:
+                model[field] = pair[dst]
+            else:
+                model.pop(field, None)
+        by_id[model_id] = model
+
+    order = delta.get("order", {}).get(dst)
+    if order is None:
+        order = [m["id"] for m in base.get("models", [])]
+    result["models"] = [by_id[model_id] for model_id in order]
+
+    # models キーの位置を元のデータに合わせる
+    if "models" in base:
+        keys = list(base.keys())
+        for key in result:
+            if key not in keys:
+                keys.append(key)
+        result = {k: result[k] for k in keys if k in result}
+    return result
@@ -0,0 +1,220 @@
+"""
+スクレイピングした表から決まるモデルの項目（規則ベースの抽出）
+
+プロンプトの基準表で決まっている項目は LLM に任せずここで埋める。
+- provider / release_status / premium_multiplier / available: GitHub 公式のモデル一覧・乗数表
+- context_window: 各プロバイダーの詳細ページの表（見つからない場合は LLM または現在の値）
+- cost_tier / performance.cost_efficiency: チャットの乗数
+- performance.context_length: context_window
+
+LLM には残りの主観的な項目（説明・性能スコア・強み・注意点・用途）だけを生成させる。
+LLM を使えない場合も、これらの項目と現在のデータから部分的な更新を作れる。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# 乗数 0 / 0.25〜0.33 / 1 / 3 / 30 に対応する cost_tier と cost_efficiency
+COST_EFFICIENCY = {"free": 5.0, "low": 4.0, "medium": 3.0, "high": 2.0, "premium": 1.0}
+# (最小トークン数, context_length スコア)（大きい順）
+CONTEXT_LENGTH_SCORES = [(2_000_000, 5.0), (1_000_000, 4.0), (200_000, 3.0), (128_000, 2.0)]
+
+# 乗数や表の値が得られない新しいモデルの既定値
+DEFAULT_COST_TIER = "medium"
+DEFAULT_CONTEXT_WINDOW = 128_000
+DEFAULT_SCORE = 3.0
+SUBJECTIVE_AXES = ["speed", "reasoning", "coding", "instruction_following", "creativity", "long_output"]
+
+_PROVIDERS = [
+    ("fine-tuned", "GitHub"),
+    ("openai", "OpenAI"),
+    ("anthropic", "Anthropic"),
+    ("google", "Google"),
+    ("xai", "xAI"),
+]
+_TOKEN_COUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kKmM])?")
+
+
+def name_key(name: str) -> str:
+    """表記ゆれを吸収したモデル名の比較用キー（"Claude-Sonnet 4" → "claude sonnet 4"）"""
+    return re.sub(r"[^a-z0-9.]+", " ", name.lower()).strip()
+
+
+def _base_key(name: str) -> str:
+    """括弧書きを除いたキー（"Claude Opus 4.6 (fast mode)" → "claude opus 4.6"）"""
+    return name_key(re.sub(r"\([^)]*\)", "", name))
+
+
+def normalize_provider(provider: str) -> str:
+    lowered = provider.lower()
+    for keyword, name in _PROVIDERS:
+        if keyword in lowered:
+            return name
+    return provider.strip()
+
+
+def parse_token_count(text: str) -> Optional[int]:
+    """"1,047,576" / "200K tokens (1M beta)" / "2M" などの最初の値をトークン数にする"""
+    match = _TOKEN_COUNT.search(text)
+    if match is None:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    value *= {"k": 1_000, "m": 1_000_000}.get(suffix, 1)
+    # 「4」のような表中の別の数値を拾わないよう、現実的な大きさのものだけを使う
+    return int(value) if value >= 1_000 else None
+
+
+def cost_tier_for(multiplier: float) -> str:
+    if multiplier <= 0:
+        return "free"
+    if multiplier < 1:
+        return "low"
+    if multiplier < 3:
+        return "medium"
+    if multiplier < 30:
+        return "high"
+    return "premium"
+
+
+def context_length_score(context_window: int) -> float:
+    for minimum, score in CONTEXT_LENGTH_SCORES:
+        if context_window >= minimum:
+            return score
+    return 1.0
+
+
+def context_windows_from_tables(tables: List[List[List[str]]]) -> Dict[str, int]:
+    """
+    詳細ページの表からモデルごとのコンテキスト長を取り出す。
+    モデルが行の表（Model | Context window | ...）と
+    モデルが列の表（Feature | Model A | Model B / Context window 行）の両方に対応する。
+    """
+    found: Dict[str, int] = {}
+    for table in tables:
+        if len(table) < 2:
+            continue
+        header = [cell.lower() for cell in table[0]]
+        column = next((i for i, cell in enumerate(header) if i > 0 and "context" in cell), None)
+        if column is not None:
+            for row in table[1:]:
+                if len(row) > column and (tokens := parse_token_count(row[column])):
+                    found.setdefault(name_key(row[0]), tokens)
+            continue
+        for row in table[1:]:
+            if row and "context" in row[0].lower():
+                for name, cell in zip(table[0][1:], row[1:]):
+                    if tokens := parse_token_count(cell):
+                        found.setdefault(name_key(name), tokens)
+    return found
+
+
+@dataclass
+class ModelFacts:
+    """GitHub 公式ページと詳細ページの表から決まる 1 モデル分の項目"""
+
+    name: str
+    provider: str
+    release_status: str
+    premium_multiplier: Optional[Dict[str, str]] = None
+    context_window: Optional[int] = None
+
+    @property
+    def cost_tier(self) -> Optional[str]:
+        """チャットの乗数から決まる cost_tier（乗数が数値でなければ None）"""
+        if not self.premium_multiplier:
+            return None
+        try:
+            return cost_tier_for(float(self.premium_multiplier.get("chat", "")))
+        except ValueError:
+            return None
+
+    def prompt_fields(self) -> Dict[str, Any]:
+        """LLM に参考として渡す確定済みの項目"""
+        fields: Dict[str, Any] = {"provider": self.provider}
+        if self.context_window is not None:
+            fields["context_window"] = self.context_window
+        return fields
+
+    def apply(
+        self, model: Dict[str, Any], current: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        model（LLM の出力または現在のデータ）に確定済みの項目を上書きした新しい dict を返す。
+        表から決まらない項目は model → current → 既定値の順に使う。
+        """
+        current = current or {}
+        merged = dict(model)
+        merged.setdefault("name", self.name)
+        merged["provider"] = self.provider
+        merged["release_status"] = self.release_status
+        merged["available"] = True
+        if self.premium_multiplier is not None:
+            merged["premium_multiplier"] = self.premium_multiplier
+
+        context_window = (
+            self.context_window
+            or model.get("context_window")
+            or current.get("context_window")
+            or DEFAULT_CONTEXT_WINDOW
+        )
+        merged["context_window"] = int(context_window)
+        cost_tier = (
+            self.cost_tier or model.get("cost_tier") or current.get("cost_tier") or DEFAULT_COST_TIER
+        )
+        merged["cost_tier"] = cost_tier
+
+        performance = dict(model.get("performance") or {})
+        performance["context_length"] = context_length_score(merged["context_window"])
+        if self.cost_tier is not None:
+            performance["cost_efficiency"] = COST_EFFICIENCY[self.cost_tier]
+        elif "cost_efficiency" not in performance:
+            performance["cost_efficiency"] = (current.get("performance") or {}).get(
+                "cost_efficiency", COST_EFFICIENCY.get(cost_tier, DEFAULT_SCORE)
+            )
+        merged["performance"] = performance
+        return merged
+
+
+def extract_model_facts(
+    copilot: Dict[str, Any], detail_sources: List[Dict[str, Any]]
+) -> Dict[str, ModelFacts]:
+    """
+    Phase 1 の各モデル（リタイア済みを除く）の確定済み項目を name_key() → ModelFacts で返す。
+    """
+    context_windows: Dict[str, int] = {}
+    for src in detail_sources:
+        for key, tokens in context_windows_from_tables(src.get("tables", [])).items():
+            context_windows.setdefault(key, tokens)
+
+    retired = {name_key(r["name"]) for r in copilot.get("retired", [])}
+    multipliers = copilot.get("multipliers", {})
+    facts: Dict[str, ModelFacts] = {}
+    for entry in copilot.get("models", []):
+        key = name_key(entry["name"])
+        if key in retired or key in facts:
+            continue
+        facts[key] = ModelFacts(
+            name=entry["name"],
+            provider=normalize_provider(entry.get("provider", "")),
+            release_status=entry.get("status", "").strip() or "GA",
+            premium_multiplier=multipliers.get(entry["name"]),
+            context_window=context_windows.get(key) or context_windows.get(_base_key(entry["name"])),
+        )
+    return facts
+
+
+def placeholder_model(model_id: str, facts: ModelFacts) -> Dict[str, Any]:
+    """LLM で解析できなかった新しいモデルの仮データ（次回の解析で置き換える）"""
+    model = {
+        "id": model_id,
+        "name": facts.name,
+        "description": f"{facts.provider} のモデル（詳細は次回の AI 解析で更新されます）",
+        "performance": {axis: DEFAULT_SCORE for axis in SUBJECTIVE_AXES},
+        "strengths": [],
+        "cautions": [],
+        "best_for": [],
+        "analysis_pending": True,
+    }
+    return facts.apply(model)
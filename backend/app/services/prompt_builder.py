@@ -0,0 +1,251 @@
+"""
+LLM に渡す詳細情報（スクレイピング結果）の組み立て
+
+各ソースの本文を数行ずつのチャンクに分け、
+- 複数のページに共通する定型文（ナビゲーション・フッター等）を取り除き
+- Phase 1 のモデル名への言及が多いチャンクを優先して
+- トークン予算に収まるだけ選ぶ
+選んだチャンクはソースごとに元の順序で並べ直して出力する。
+
+トークン数はモデルの count_tokens() で 1 回だけ実測して概算値を補正し、
+チャンクごとの見積もりには補正後の概算を使う（チャンクごとに API を呼ばない）。
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from app.services.llm_budget import estimate_tokens
+from app.services.llm_client import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# 1 チャンクの目安の文字数
+CHUNK_CHARS = 1200
+# モデルの仕様に関係する語（モデル名の次に優先する）
+SPEC_KEYWORDS = [
+    "context", "token", "window", "pricing", "price", "multiplier", "input", "output",
+    "reasoning", "latency", "speed", "benchmark", "knowledge cutoff", "deprecat", "retire",
+    "preview", "available",
+]
+# 定型文とみなす行の最大文字数（長い行は本文とみなして残す）
+_BOILERPLATE_MAX_CHARS = 120
+_OMITTED = "(...)"
+
+
+def compact_json(value: Any) -> str:
+    """空白を入れない JSON（プロンプトのトークン節約用）"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class TokenCounter:
+    """概算トークン数に実測から求めた補正係数を掛けて数える"""
+
+    def __init__(self, ratio: float = 1.0):
+        self.ratio = ratio
+
+    def __call__(self, text: str) -> int:
+        return int(estimate_tokens(text) * self.ratio) + 1
+
+
+async def calibrate_token_counter(model: Any, sample: str) -> TokenCounter:
+    """
+    sample の実際のトークン数をモデルの count_tokens() で取得し、補正済みのカウンタを返す。
+    取得できない場合は概算のままのカウンタを返す。
+    """
+    if not sample:
+        return TokenCounter()
+    try:
+        actual = await count_tokens(model, sample)
+    except Exception as e:
+        logger.warning(f"count_tokens failed, using estimated token counts: {e}")
+        return TokenCounter()
+    ratio = actual / estimate_tokens(sample) if actual > 0 else 1.0
+    logger.info(f"Token counter calibrated: ratio {ratio:.2f}")
+    return TokenCounter(ratio)
+
+
+@dataclass
+class _Chunk:
+    source_index: int
+    position: int
+    text: str
+    score: float = 0.0
+
+
+@dataclass
+class DetailContext:
+    """組み立てた詳細情報と、その内訳"""
+
+    text: str
+    tokens: int
+    chunks_total: int = 0
+    chunks_used: int = 0
+    boilerplate_lines: int = 0
+    sources_used: List[str] = field(default_factory=list)
+
+
+def _normalize_line(line: str) -> str:
+    return re.sub(r"\s+", " ", line).strip().lower()
+
+
+def model_terms(names: Iterable[str]) -> List[str]:
+    """モデル名の表記ゆれ（"Claude Sonnet 4" / "claude-sonnet-4"）を含む検索語"""
+    terms: Set[str] = set()
+    for name in names:
+        base = _normalize_line(re.sub(r"\([^)]*\)", "", name))
+        if base:
+            terms.add(base)
+            terms.add(base.replace(" ", "-"))
+    return sorted(terms, key=len, reverse=True)
+
+
+def _mentions(text: str, terms: Sequence[str]) -> int:
+    return sum(1 for term in terms if term in text)
+
+
+def _boilerplate_lines(
+    sources: List[List[str]], terms: Sequence[str]
+) -> Set[str]:
+    """複数のソースに現れる短い行、または同じソース内で何度も繰り返される行"""
+    seen_in: Dict[str, Set[int]] = {}
+    counts: Dict[str, int] = {}
+    for i, lines in enumerate(sources):
+        for line in lines:
+            key = _normalize_line(line)
+            if key and len(key) <= _BOILERPLATE_MAX_CHARS:
+                seen_in.setdefault(key, set()).add(i)
+                counts[key] = counts.get(key, 0) + 1
+
+    return {
+        key for key in seen_in
+        if (len(seen_in[key]) >= 2 or counts[key] >= 3)
+        # 表のセルなどのモデル名だけの行は定型文ではない
+        and not _mentions(key, terms)
+    }
+
+
+def _split_chunks(source_index: int, lines: List[str]) -> List[_Chunk]:
+    chunks: List[_Chunk] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) > CHUNK_CHARS:
+            chunks.append(_Chunk(source_index, len(chunks), "\n".join(current)))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append(_Chunk(source_index, len(chunks), "\n".join(current)))
+    return chunks
+
+
+def _score(chunk: _Chunk, terms: Sequence[str]) -> float:
+    text = chunk.text.lower()
+    mentions = _mentions(text, terms)
+    keywords = _mentions(text, SPEC_KEYWORDS)
+    if not mentions and not keywords:
+        return 0.0
+    # 長いチャンクが有利にならないよう 1000 文字あたりに換算する
+    return (mentions * 3 + keywords) / (len(chunk.text) / 1000 + 1)
+
+
+def build_detail_context(
+    sources: List[Dict[str, Any]],
+    model_names: Iterable[str],
+    token_budget: int,
+    counter: Optional[TokenCounter] = None,
+) -> DetailContext:
+    """
+    sources（{"name", "url", "content"} のリスト、優先順）から
+    token_budget トークン以内の詳細情報を組み立てる。
+    """
+    counter = counter or TokenCounter()
+    terms = model_terms(model_names)
+
+    source_lines = [
+        [line.strip() for line in src.get("content", "").splitlines() if line.strip()]
+        for src in sources
+    ]
+    boilerplate = _boilerplate_lines(source_lines, terms)
+
+    chunks: List[_Chunk] = []
+    dropped = 0
+    seen_chunks: Set[str] = set()
+    for i, lines in enumerate(source_lines):
+        kept = [line for line in lines if _normalize_line(line) not in boilerplate]
+        dropped += len(lines) - len(kept)
+        for chunk in _split_chunks(i, kept):
+            digest = hashlib.sha1(_normalize_line(chunk.text).encode("utf-8")).hexdigest()
+            if digest in seen_chunks:
+                continue
+            seen_chunks.add(digest)
+            chunk.score = _score(chunk, terms)
+            chunks.append(chunk)
+
+    headers = [f"### {src['name']} ({src['url']})" for src in sources]
+    ranked = sorted(chunks, key=lambda c: (-c.score, c.source_index, c.position))
+    # まず各ソースで最も関連度の高いチャンクを 1 つずつ選び、後ろのソースが丸ごと落ちないようにする
+    best_per_source: Dict[int, _Chunk] = {}
+    for chunk in ranked:
+        if chunk.score > 0:
+            best_per_source.setdefault(chunk.source_index, chunk)
+    order = list(best_per_source.values()) + [
+        c for c in ranked if best_per_source.get(c.source_index) is not c
+    ]
+
+    selected: List[_Chunk] = []
+    used_sources: Set[int] = set()
+    remaining = token_budget
+    for chunk in order:
+        cost = counter(chunk.text)
+        if chunk.source_index not in used_sources:
+            cost += counter(headers[chunk.source_index])
+        if cost > remaining:
+            continue
+        selected.append(chunk)
+        used_sources.add(chunk.source_index)
+        remaining -= cost
+
+    parts = []
+    for i in sorted(used_sources):
+        picked = sorted((c for c in selected if c.source_index == i), key=lambda c: c.position)
+        body = []
+        previous = -1
+        for chunk in picked:
+            if chunk.position != previous + 1:
+                body.append(_OMITTED)
+            body.append(chunk.text)
+            previous = chunk.position
+        parts.append(headers[i] + "\n" + "\n".join(body))
+
+    text = "\n\n".join(parts)
+    return DetailContext(
+        text=text,
+        tokens=token_budget - remaining,
+        chunks_total=len(chunks),
+        chunks_used=len(selected),
+        boilerplate_lines=dropped,
+        sources_used=[sources[i]["name"] for i in sorted(used_sources)],
+    )
+
+
+def fit_models_json(
+    models: List[Dict[str, Any]], token_budget: int, counter: Optional[TokenCounter] = None
+) -> str:
+    """
+    モデルの配列をコンパクトな JSON にする。
+    予算を超える場合は末尾のモデルから丸ごと省く（オブジェクトの途中では切らない）。
+    """
+    counter = counter or TokenCounter()
+    kept = list(models)
+    text = compact_json(kept)
+    while kept and counter(text) > token_budget:
+        kept.pop()
+        text = compact_json(kept)
+    if len(kept) < len(models):
+        logger.info(f"Current models JSON trimmed to {len(kept)}/{len(models)} models")
+    return text
@@ -3,6 +3,11 @@ import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from app.services.catalog import CatalogSnapshot, get_catalog
+from app.services import recommendation_table
+from app.services.result_cache import get_recommendation_cache
+from app.services.scoring_engine import DEFAULT_REASON, get_engine
+
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
@@ -14,29 +19,28 @@ def load_json(filename: str) -> Any:
 
 
 def load_models() -> Dict[str, Any]:
-    return load_json("models.json")
+    return get_catalog().models
 
 
 def load_chart() -> Dict[str, Any]:
-    return load_json("chart.json")
+    return get_catalog().chart
 
 
 def load_recommendation_rules() -> Dict[str, Any]:
-    return load_json("recommendation_rules.json")
+    return get_catalog().rules
 
 
 def get_model_by_id(model_id: str) -> Optional[Dict[str, Any]]:
-    models_data = load_models()
-    for model in models_data["models"]:
-        if model["id"] == model_id:
-            return model
-    return None
+    return get_catalog().models_by_id.get(model_id)
 
 
 def compute_recommendation(selections: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     ユーザーの選択結果からモデル推薦スコアを計算する。
 
+    カタログのバージョンごとに構築したスコアリングエンジンで計算する。
+    結果は compute_recommendation_reference と完全に一致する。
+
     selections 形式:
     {
       "q1": "new_development",
@@ -48,8 +52,66 @@ def compute_recommendation(selections: Dict[str, Any]) -> List[Dict[str, Any]]:
       }
     }
     """
-    models_data = load_models()
-    rules = load_recommendation_rules()
+    return get_engine().top_k(selections, k=3)
+
+
+def get_recommendations(
+    selections: Dict[str, Any],
+    catalog: Optional[CatalogSnapshot] = None,
+) -> List[Dict[str, Any]]:
+    """
+    推薦結果を取得する（API 用の入口）。
+
+    事前計算テーブルにあればそれを返す。未知の入力やテーブルの
+    構築前・更新中は LRU キャッシュを確認し、なければ直接計算する。
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    engine = get_engine(catalog)
+    key = engine.canonical_key(selections)
+    if key is None:
+        return engine.top_k(selections, k=recommendation_table.TOP_K)
+
+    results = recommendation_table.lookup(catalog.version, key)
+    if results is not None:
+        return results
+
+    cache = get_recommendation_cache()
+    cache_key = (catalog.version, key)
+    results = cache.get(cache_key)
+    if results is None:
+        results = engine.top_k(selections, k=recommendation_table.TOP_K)
+        cache.put(cache_key, results)
+    return results
+
+
+def compute_recommendations_batch(
+    selections_list: List[Dict[str, Any]],
+    catalog: Optional[CatalogSnapshot] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    複数の選択結果の推薦をまとめて計算する。
+    compute_recommendation と同じ重み計算を使い、結果は入力順に返す。
+    """
+    return get_engine(catalog).top_k_batch(
+        selections_list, k=recommendation_table.TOP_K
+    )
+
+
+def compute_recommendation_reference(
+    selections: Dict[str, Any],
+    catalog: Optional[CatalogSnapshot] = None,
+) -> List[Dict[str, Any]]:
+    """
+    compute_recommendation の純 Python 参照実装。
+    エンジンとの一致確認とベンチマークに使う。
+    selections の形式は compute_recommendation と同じ。
+    """
+    # 1 リクエスト内では同一スナップショットを参照する
+    if catalog is None:
+        catalog = get_catalog()
+    models_data = catalog.models
+    rules = catalog.rules
 
     category = selections.get("q1", "")
     subcategory = selections.get("q2", "")
@@ -69,7 +131,7 @@ def compute_recommendation(selections: Dict[str, Any]) -> List[Dict[str, Any]]:
     sub_mult = subcategory_multipliers.get(subcategory, {})
 
     # Q3 の複雑度による乗数
-    chart_data = load_chart()
+    chart_data = catalog.chart
     q3_questions = chart_data["questions"][2]["questions"]
 
     complexity_mult: Dict[str, float] = {}
@@ -128,7 +190,7 @@ def compute_recommendation(selections: Dict[str, Any]) -> List[Dict[str, Any]]:
 
         # 推薦理由の生成
         template = templates.get(model["id"], {})
-        reason = template.get("strengths_text", "このタスクに適したモデルです。")
+        reason = template.get("strengths_text", DEFAULT_REASON)
         caution = template.get("caution_text", None)
 
         model_scores.append({
@@ -0,0 +1,164 @@
+"""
+推薦結果の事前計算テーブル
+
+チャートの回答空間は有限なので（q1 × q1 ごとの q2 × complexity ×
+context_amount × priority の冪集合）、全組み合わせの上位結果を
+起動時・データ更新時にまとめて計算しておき、推薦リクエストを
+正規化キーによる辞書引きだけで返せるようにする。
+
+テーブルはカタログのバージョンに紐づき、バージョンが一致しない場合や
+未知の入力はテーブルを使わずに直接計算する。
+"""
+
+import itertools
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.catalog import CatalogSnapshot, get_catalog
+from app.services.scoring_engine import SelectionKey, get_engine
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 3
+
+
+@dataclass(frozen=True)
+class RecommendationTable:
+    version: str
+    entries: Dict[SelectionKey, Tuple[Dict[str, Any], ...]]
+    build_seconds: float
+    built_at: str
+    approx_bytes: int = field(default=0)
+
+
+def iter_selection_space(chart: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """チャートから回答可能な全ての選択結果を列挙する"""
+    q1_options = [o["id"] for o in chart["questions"][0]["options"]]
+    q2_by_category = chart["questions"][1]["options_by_category"]
+    q3 = {
+        q["id"]: [o["id"] for o in q["options"]]
+        for q in chart["questions"][2]["questions"]
+    }
+    priority_options = q3.get("priority", [])
+    priorities = [
+        list(combo)
+        for n in range(len(priority_options) + 1)
+        for combo in itertools.combinations(priority_options, n)
+    ]
+
+    for q1 in q1_options:
+        for q2 in q2_by_category.get(q1, []):
+            for complexity, context_amount, priority in itertools.product(
+                q3.get("complexity", ["moderate"]),
+                q3.get("context_amount", ["medium"]),
+                priorities,
+            ):
+                yield {
+                    "q1": q1,
+                    "q2": q2["id"],
+                    "q3": {
+                        "complexity": complexity,
+                        "priority": priority,
+                        "context_amount": context_amount,
+                    },
+                }
+
+
+def build_table(catalog: Optional[CatalogSnapshot] = None) -> RecommendationTable:
+    """全選択結果の推薦をまとめて計算する"""
+    if catalog is None:
+        catalog = get_catalog()
+    engine = get_engine(catalog)
+
+    start = time.perf_counter()
+    entries: Dict[SelectionKey, Tuple[Dict[str, Any], ...]] = {}
+    for selections in iter_selection_space(catalog.chart):
+        key = engine.canonical_key(selections)
+        if key is not None and key not in entries:
+            entries[key] = tuple(engine.top_k(selections, k=TOP_K))
+    build_seconds = time.perf_counter() - start
+
+    # モデル本体は共有されるため、キーと結果エントリ分のみを概算する
+    approx_bytes = sys.getsizeof(entries)
+    for key, results in entries.items():
+        approx_bytes += sys.getsizeof(key) + sys.getsizeof(results)
+        approx_bytes += sum(sys.getsizeof(r) for r in results)
+
+    return RecommendationTable(
+        version=catalog.version,
+        entries=entries,
+        build_seconds=build_seconds,
+        built_at=datetime.utcnow().isoformat() + "Z",
+        approx_bytes=approx_bytes,
+    )
+
+
+_table: Optional[RecommendationTable] = None
+_build_lock = threading.Lock()
+_background_build: Optional[threading.Thread] = None
+
+
+def rebuild_table(catalog: Optional[CatalogSnapshot] = None) -> RecommendationTable:
+    """テーブルを再構築して差し替える（同時に 1 つだけ実行）"""
+    global _table
+    with _build_lock:
+        if catalog is None:
+            catalog = get_catalog()
+        table = _table
+        if table is not None and table.version == catalog.version:
+            return table
+        table = build_table(catalog)
+        _table = table
+    logger.info(
+        f"Recommendation table built: version={table.version}, "
+        f"entries={len(table.entries)}, "
+        f"build={table.build_seconds * 1000:.1f}ms, "
+        f"size~{table.approx_bytes / 1024:.0f}KiB"
+    )
+    return table
+
+
+def _schedule_rebuild() -> None:
+    """テーブルが古い場合にバックグラウンドで再構築する"""
+    global _background_build
+    thread = _background_build
+    if thread is not None and thread.is_alive():
+        return
+    thread = threading.Thread(target=rebuild_table, daemon=True)
+    _background_build = thread
+    thread.start()
+
+
+def lookup(version: str, key: SelectionKey) -> Optional[List[Dict[str, Any]]]:
+    """
+    事前計算済みの結果を返す。
+    テーブルのバージョンが異なる、または未知のキーの場合は None。
+    """
+    table = _table
+    if table is None or table.version != version:
+        _schedule_rebuild()
+        return None
+    results = table.entries.get(key)
+    if results is None:
+        return None
+    # 呼び出し側での変更がテーブルに波及しないよう結果エントリはコピーして返す
+    return [dict(r) for r in results]
+
+
+def table_stats() -> Dict[str, Any]:
+    table = _table
+    if table is None:
+        return {"status": "not_built"}
+    return {
+        "status": "ready",
+        "version": table.version,
+        "entries": len(table.entries),
+        "build_ms": round(table.build_seconds * 1000, 1),
+        "approx_bytes": table.approx_bytes,
+        "built_at": table.built_at,
+    }
@@ -0,0 +1,259 @@
+"""
+推薦スコア計算のコンパイル済みエンジン
+
+カタログのスナップショット 1 つにつき 1 度だけ、
+- ルール・チャートの乗数を軸ごとの密な重みベクトルに
+- 各モデルの performance を (モデル数 × 軸数) の行列に
+変換しておき、リクエストごとの計算を行列ベクトル積 1 回で済ませる。
+
+結果は recommendation.compute_recommendation_reference と完全に一致させる:
+行列積で上位候補を絞り込んだ後、候補だけを参照実装と同じ軸順・同じ
+浮動小数点演算順で再計算し、同点は元のモデル順で並べる。
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.catalog import CatalogSnapshot, get_catalog
+
+DEFAULT_REASON = "このタスクに適したモデルです。"
+
+# 上位 k 件の候補を絞り込む際の余裕幅（0-1 スケール）。
+# score_100 は小数第 1 位に丸めるため、丸め後に同点となり得る
+# 0.001 の幅と、行列積の誤差を十分にカバーする値にしている。
+_CANDIDATE_MARGIN = 0.002
+
+# (q1, q2, complexity, context_amount, priority)
+SelectionKey = Tuple[str, str, str, str, Tuple[str, ...]]
+
+
+class ScoringEngine:
+    """スナップショットから構築した推薦スコア計算器（読み取り専用）"""
+
+    def __init__(self, catalog: CatalogSnapshot):
+        self.version = catalog.version
+        rules = catalog.rules
+
+        base_weights: Dict[str, float] = rules["base_weights"]
+        category_overrides: Dict[str, Dict[str, float]] = rules.get(
+            "category_overrides", {}
+        )
+
+        # 全カテゴリの軸の和集合（base_weights の順を優先）
+        axes: List[str] = list(base_weights.keys())
+        for weights in category_overrides.values():
+            for axis in weights:
+                if axis not in axes:
+                    axes.append(axis)
+        self.axes: Tuple[str, ...] = tuple(axes)
+        axis_index = {axis: i for i, axis in enumerate(axes)}
+
+        def to_vector(values: Dict[str, float], default: float) -> np.ndarray:
+            vec = np.full(len(axes), default, dtype=np.float64)
+            for axis, v in values.items():
+                if axis in axis_index:
+                    vec[axis_index[axis]] = v
+            return vec
+
+        # ベース重み: カテゴリごとのベクトルと、合計・スコア計算時の軸順
+        def compile_base(weights: Dict[str, float]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+            return (
+                to_vector(weights, 0.0),
+                tuple(axis_index[axis] for axis in weights),
+            )
+
+        self._default_base = compile_base(base_weights)
+        self._category_base = {
+            category: compile_base(weights)
+            for category, weights in category_overrides.items()
+        }
+
+        # 乗数ベクトル（該当しない軸は 1.0）
+        self._ones = np.ones(len(axes), dtype=np.float64)
+        self._subcategory = {
+            sub: to_vector(mult, 1.0)
+            for sub, mult in rules.get("subcategory_multipliers", {}).items()
+        }
+        self._complexity: Dict[str, np.ndarray] = {}
+        self._priority: List[Tuple[str, np.ndarray]] = []
+        self._context: Dict[str, np.ndarray] = {}
+        for q in catalog.chart["questions"][2]["questions"]:
+            for opt in q["options"]:
+                vec = to_vector(opt.get("multiplier", {}), 1.0)
+                if q["id"] == "complexity":
+                    self._complexity[opt["id"]] = vec
+                elif q["id"] == "priority":
+                    self._priority.append((opt["id"], vec))
+                elif q["id"] == "context_amount":
+                    self._context[opt["id"]] = vec
+
+        # モデル行列 (models × axes)。参照実装と同じく score / 5.0 で正規化
+        models = catalog.models["models"]
+        self.models: Tuple[Dict[str, Any], ...] = tuple(models)
+        self._perf = np.array(
+            [
+                [model["performance"].get(axis, 0.0) / 5.0 for axis in axes]
+                for model in models
+            ],
+            dtype=np.float64,
+        ).reshape(len(models), len(axes))
+        self._perf_rows: List[List[float]] = self._perf.tolist()
+
+        templates = rules.get("recommendation_templates", {})
+        self._texts: List[Tuple[str, Optional[str]]] = []
+        for model in models:
+            template = templates.get(model["id"], {})
+            self._texts.append((
+                template.get("strengths_text", DEFAULT_REASON),
+                template.get("caution_text", None),
+            ))
+
+    # ─── 重み ─────────────────────────────────────────────────────
+
+    def weights(self, selections: Dict[str, Any]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """
+        選択結果から正規化済みの重みベクトルと、その有効な軸順を返す。
+        軸順は合計・スコアの加算順を参照実装と揃えるために使う。
+        """
+        category = selections.get("q1", "")
+        subcategory = selections.get("q2", "")
+        q3 = selections.get("q3", {})
+        complexity = q3.get("complexity", "moderate")
+        priority = q3.get("priority", [])
+        context_amount = q3.get("context_amount", "medium")
+
+        base, order = self._category_base.get(category, self._default_base)
+
+        priority_vec = self._ones
+        for option_id, vec in self._priority:
+            if option_id in priority:
+                priority_vec = priority_vec * vec
+
+        w = base * self._subcategory.get(subcategory, self._ones)
+        w = w * self._complexity.get(complexity, self._ones)
+        w = w * priority_vec
+        w = w * self._context.get(context_amount, self._ones)
+
+        w_list = w.tolist()
+        total = sum(w_list[j] for j in order)
+        if total > 0:
+            w = w / total
+        return w, order
+
+    def canonical_key(self, selections: Dict[str, Any]) -> Optional[SelectionKey]:
+        """
+        結果が同じになる選択結果を同一視する正規化キーを返す。
+
+        - 未指定の complexity / context_amount は既定値で補う
+        - priority は順序・重複・未知の ID を無視し、チャートの順に並べる
+        想定外の型を含む場合は None を返す（正規化せずに直接計算する）。
+        """
+        q3 = selections.get("q3", {})
+        if not isinstance(q3, dict):
+            return None
+        category = selections.get("q1", "")
+        subcategory = selections.get("q2", "")
+        complexity = q3.get("complexity", "moderate")
+        context_amount = q3.get("context_amount", "medium")
+        priority = q3.get("priority", [])
+        if not all(
+            isinstance(v, str)
+            for v in (category, subcategory, complexity, context_amount)
+        ):
+            return None
+        if not isinstance(priority, (list, tuple)):
+            return None
+        return (
+            category,
+            subcategory,
+            complexity,
+            context_amount,
+            tuple(option_id for option_id, _ in self._priority if option_id in priority),
+        )
+
+    # ─── スコア ───────────────────────────────────────────────────
+
+    def _exact_score(self, row: int, w_list: List[float], order: Sequence[int]) -> float:
+        perf = self._perf_rows[row]
+        score = 0.0
+        for j in order:
+            score += perf[j] * w_list[j]
+        return round(score * 100, 1)
+
+    def _select(
+        self,
+        approx: np.ndarray,
+        w: np.ndarray,
+        order: Sequence[int],
+        k: int,
+    ) -> List[Dict[str, Any]]:
+        n = approx.shape[0]
+        if n > k:
+            top = np.argpartition(-approx, k - 1)[:k]
+            threshold = approx[top].min() - _CANDIDATE_MARGIN
+            candidates = np.flatnonzero(approx >= threshold).tolist()
+        else:
+            candidates = list(range(n))
+
+        w_list = w.tolist()
+        scored = []
+        for i in candidates:
+            score_100 = self._exact_score(i, w_list, order)
+            scored.append((-score_100, i, score_100))
+        # スコア降順、同点は元のモデル順（参照実装の安定ソートと同じ）
+        scored.sort()
+
+        results = []
+        for rank, (_, i, score_100) in enumerate(scored[:k], start=1):
+            reason, caution = self._texts[i]
+            results.append({
+                "rank": rank,
+                "model": self.models[i],
+                "score": score_100,
+                "reason": reason,
+                "caution": caution,
+            })
+        return results
+
+    def top_k(self, selections: Dict[str, Any], k: int = 3) -> List[Dict[str, Any]]:
+        """上位 k 件の推薦結果を返す"""
+        w, order = self.weights(selections)
+        return self._select(self._perf @ w, w, order, k)
+
+    def top_k_batch(
+        self, selections_list: Sequence[Dict[str, Any]], k: int = 3
+    ) -> List[List[Dict[str, Any]]]:
+        """複数の選択結果をまとめて計算する（入力順に結果を返す）"""
+        if not selections_list:
+            return []
+        weighted = [self.weights(selections) for selections in selections_list]
+        # (batch × axes) @ (axes × models) を 1 回で計算する
+        scores = np.stack([w for w, _ in weighted]) @ self._perf.T
+        return [
+            self._select(scores[row], w, order, k)
+            for row, (w, order) in enumerate(weighted)
+        ]
+
+
+_engine: Optional[ScoringEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(catalog: Optional[CatalogSnapshot] = None) -> ScoringEngine:
+    """カタログのバージョンに対応するエンジンを返す（バージョンごとに 1 度だけ構築）"""
+    global _engine
+    if catalog is None:
+        catalog = get_catalog()
+
+    engine = _engine
+    if engine is not None and engine.version == catalog.version:
+        return engine
+
+    with _engine_lock:
+        engine = _engine
+        if engine is None or engine.version != catalog.version:
+            engine = ScoringEngine(catalog)
+            _engine = engine
+        return engine
@@ -8,21 +8,32 @@ GitHub Copilot で利用可能なモデル情報のスクレイピング
 
 import asyncio
 import logging
+import multiprocessing
 import re
-from typing import Any, Callable, Dict, List, Optional
+import time
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import httpx
-from bs4 import BeautifulSoup
-
 from app.config import get_settings
+from app.services.fetcher import Fetcher, create_scrape_client
+from app.services.html_extract import MAIN_CONTENT_END_MARKERS, get_backend
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+T = TypeVar("T")
+
 # ─── Phase 1: GitHub Copilot 公式モデル一覧 ───────────────────────
 GITHUB_SUPPORTED_MODELS_URL = (
     "https://docs.github.com/en/copilot/reference/ai-models/supported-models"
 )
+COPILOT_MODEL_LIST_ID = "github_supported_models"
 
 # ─── Phase 2: 詳細情報ソース ──────────────────────────────────────
 DETAIL_SOURCES = [
@@ -53,6 +64,19 @@ DETAIL_SOURCES = [
     },
 ]
 
+# プロバイダー名 → そのプロバイダーの詳細情報ソース
+PROVIDER_SOURCE_IDS = {
+    "openai": "openai_models",
+    "anthropic": "anthropic_models",
+    "google": "google_models",
+    "xai": "xai_models",
+}
+# 全モデルに関係する詳細情報ソース
+COMMON_SOURCE_IDS = ["github_model_comparison"]
+
+# 本文を使えるソースの状態（oversize は上限までの先頭部分のみ取得できたもの）
+CONTENT_STATUSES = {"success", "oversize"}
+
 HTTP_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -65,125 +89,160 @@ HTTP_HEADERS = {
 
 
 # ─────────────────────────────────────────────────────────────────
-# ユーティリティ
+# HTML 解析の実行
 # ─────────────────────────────────────────────────────────────────
 
-def _extract_text(soup: BeautifulSoup, max_chars: int = 15000) -> str:
-    """BeautifulSoup から本文テキストを抽出"""
-    for selector in ["article", "main", ".content", ".documentation", "body"]:
-        el = soup.select_one(selector)
-        if el:
-            for tag in el.find_all(["script", "style", "nav", "footer", "header"]):
-                tag.decompose()
-            text = el.get_text(separator="\n", strip=True)
-            if len(text) > max_chars:
-                text = text[:max_chars] + "\n... (truncated)"
-            return text
-    return ""
-
-
-def _extract_tables(soup: BeautifulSoup) -> List[List[List[str]]]:
-    """HTML テーブルを 3次元リスト(tables > rows > cells)として取得"""
-    tables = []
-    for table in soup.find_all("table"):
-        rows = []
-        for tr in table.find_all("tr"):
-            cells = [
-                td.get_text(separator=" ", strip=True)
-                for td in tr.find_all(["td", "th"])
-            ]
-            if cells:
-                rows.append(cells)
-        if rows:
-            tables.append(rows)
-    return tables
+# 解析用のワーカー（初回使用時に作成）
+_parse_executor: Optional[Executor] = None
+
+
+def _get_parse_executor() -> Executor:
+    global _parse_executor
+    if _parse_executor is None:
+        workers = max(1, settings.scrape_parse_workers)
+        if settings.scrape_parse_executor == "process":
+            try:
+                _parse_executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable, parsing in threads: {e}")
+        if _parse_executor is None:
+            _parse_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="html-parse"
+            )
+    return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+async def run_parse(func: Callable[[str], T], html: str) -> T:
+    """
+    HTML の解析をイベントループ外のワーカーで実行する。
+    ワーカー数を上限として、取得中の他のソースの通信と並行して解析できる。
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_parse_executor(), func, html)
+    except BrokenExecutor as e:
+        # ワーカープロセスが落ちた場合は作り直し、今回はスレッドで解析する
+        logger.warning(f"Parse worker crashed, retrying in a thread: {e}")
+        shutdown_parse_executor()
+        return await asyncio.to_thread(func, html)
 
 
 # ─────────────────────────────────────────────────────────────────
 # Phase 1: GitHub Copilot サポートモデル一覧
 # ─────────────────────────────────────────────────────────────────
 
+def parse_copilot_model_list(html: str, backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    supported-models ページの HTML からモデル一覧・乗数・リタイア済みモデルを取り出す。
+    CPU 負荷が高いため run_parse() 経由でイベントループ外で実行する。
+    """
+    extractor = get_backend(backend)
+    doc = extractor.parse(html)
+    # 本文抽出は除外要素を取り除くため、先にテーブルを取得する
+    tables = extractor.tables(doc)
+    text = extractor.main_text(doc)
+
+    # テーブルからモデル情報をパース
+    models_raw: List[Dict[str, Any]] = []
+    multipliers: Dict[str, Any] = {}
+    retired: List[Dict[str, str]] = []
+
+    for table in tables:
+        if not table:
+            continue
+
+        for row in table[1:]:
+            if len(row) < 2:
+                continue
+
+            name = row[0].strip()
+            if not name:
+                continue
+
+            # モデル一覧テーブル (Model | Provider | Status | Free | Pro | ...)
+            if len(row) >= 3 and any(
+                p in row[1].lower()
+                for p in ["openai", "anthropic", "google", "xai", "fine-tuned"]
+            ):
+                models_raw.append({
+                    "name": name,
+                    "provider": row[1].strip(),
+                    "status": row[2].strip() if len(row) > 2 else "GA",
+                })
+
+            # 乗数テーブル (Model | Chat multiplier | Completions multiplier)
+            elif len(row) >= 2 and re.match(
+                r"^([\d.]+|Not applicable)$", row[1].strip()
+            ):
+                try:
+                    chat_mult = row[1].strip()
+                    comp_mult = (
+                        row[2].strip() if len(row) > 2 else "Not applicable"
+                    )
+                    multipliers[name] = {
+                        "chat": chat_mult,
+                        "completions": comp_mult,
+                    }
+                except (IndexError, ValueError):
+                    pass
+
+            # リタイアテーブル (Model | Retirement date | Replacement)
+            elif len(row) >= 3 and re.match(
+                r"\d{4}-\d{2}-\d{2}", row[1].strip()
+            ):
+                retired.append({
+                    "name": name,
+                    "retirement_date": row[1].strip(),
+                    "replacement": row[2].strip() if len(row) > 2 else "",
+                })
+
+    return {
+        "models": models_raw,
+        "multipliers": multipliers,
+        "retired": retired,
+        "raw_text": text,
+    }
+
+
 async def scrape_copilot_model_list(
-    client: httpx.AsyncClient,
+    fetcher: Fetcher,
 ) -> Dict[str, Any]:
     """
     GitHub 公式の supported-models ページをスクレイピングし、
     モデル名・プロバイダー・ステータス・乗数などを取得する。
     """
     try:
-        resp = await client.get(
+        # 表がページ全体に散らばるため、本文の終了タグでは打ち切らない
+        resp = await fetcher.fetch(
             GITHUB_SUPPORTED_MODELS_URL,
-            timeout=settings.scrape_timeout,
-            follow_redirects=True,
             headers=HTTP_HEADERS,
+            timeout=settings.scrape_timeout,
+            max_bytes=settings.scrape_max_bytes,
         )
-        resp.raise_for_status()
 
-        soup = BeautifulSoup(resp.text, "html.parser")
-        tables = _extract_tables(soup)
-        text = _extract_text(soup)
-
-        # テーブルからモデル情報をパース
-        models_raw: List[Dict[str, Any]] = []
-        multipliers: Dict[str, Any] = {}
-        retired: List[Dict[str, str]] = []
-
-        for table in tables:
-            if not table:
-                continue
-
-            for row in table[1:]:
-                if len(row) < 2:
-                    continue
-
-                name = row[0].strip()
-                if not name:
-                    continue
-
-                # モデル一覧テーブル (Model | Provider | Status | Free | Pro | ...)
-                if len(row) >= 3 and any(
-                    p in row[1].lower()
-                    for p in ["openai", "anthropic", "google", "xai", "fine-tuned"]
-                ):
-                    models_raw.append({
-                        "name": name,
-                        "provider": row[1].strip(),
-                        "status": row[2].strip() if len(row) > 2 else "GA",
-                    })
-
-                # 乗数テーブル (Model | Chat multiplier | Completions multiplier)
-                elif len(row) >= 2 and re.match(
-                    r"^([\d.]+|Not applicable)$", row[1].strip()
-                ):
-                    try:
-                        chat_mult = row[1].strip()
-                        comp_mult = (
-                            row[2].strip() if len(row) > 2 else "Not applicable"
-                        )
-                        multipliers[name] = {
-                            "chat": chat_mult,
-                            "completions": comp_mult,
-                        }
-                    except (IndexError, ValueError):
-                        pass
-
-                # リタイアテーブル (Model | Retirement date | Replacement)
-                elif len(row) >= 3 and re.match(
-                    r"\d{4}-\d{2}-\d{2}", row[1].strip()
-                ):
-                    retired.append({
-                        "name": name,
-                        "retirement_date": row[1].strip(),
-                        "replacement": row[2].strip() if len(row) > 2 else "",
-                    })
+        parse_started = time.perf_counter()
+        parsed = await run_parse(parse_copilot_model_list, resp.text)
+        parse_ms = (time.perf_counter() - parse_started) * 1000
 
         return {
-            "status": "success",
+            # oversize の場合は一覧が途中までしか取れていない可能性がある
+            "status": "oversize" if resp.oversize else "success",
             "url": GITHUB_SUPPORTED_MODELS_URL,
-            "models": models_raw,
-            "multipliers": multipliers,
-            "retired": retired,
-            "raw_text": text,
+            **parsed,
+            "from_cache": resp.from_cache,
+            "bytes_read": resp.bytes_read,
+            "parse_ms": round(parse_ms, 1),
+            "attempts": len(fetcher.attempts_for(GITHUB_SUPPORTED_MODELS_URL)),
         }
 
     except Exception as e:
@@ -195,6 +254,8 @@ async def scrape_copilot_model_list(
             "multipliers": {},
             "retired": [],
             "raw_text": "",
+            "from_cache": False,
+            "attempts": len(fetcher.attempts_for(GITHUB_SUPPORTED_MODELS_URL)),
             "error": str(e),
         }
 
@@ -203,28 +264,44 @@ async def scrape_copilot_model_list(
 # Phase 2: 各プロバイダー詳細情報
 # ─────────────────────────────────────────────────────────────────
 
+def parse_detail_document(html: str, backend: Optional[str] = None) -> Dict[str, Any]:
+    """詳細情報ページの HTML から本文テキストと表（コンテキスト長などの抽出用）を取り出す"""
+    extractor = get_backend(backend)
+    doc = extractor.parse(html)
+    # 本文抽出は除外要素を取り除くため、先にテーブルを取得する
+    tables = extractor.tables(doc)
+    return {"content": extractor.main_text(doc), "tables": tables}
+
+
 async def scrape_url(
-    client: httpx.AsyncClient, source: Dict
+    fetcher: Fetcher, source: Dict
 ) -> Dict:
     """単一URLのコンテンツをスクレイピングする"""
     try:
-        response = await client.get(
+        # 本文の終了タグを受信した時点で打ち切り、以降のフッター等は読まない
+        response = await fetcher.fetch(
             source["url"],
-            timeout=settings.scrape_timeout,
-            follow_redirects=True,
             headers=HTTP_HEADERS,
+            timeout=settings.scrape_timeout,
+            max_bytes=source.get("max_bytes", settings.scrape_max_bytes),
+            stop_markers=MAIN_CONTENT_END_MARKERS,
         )
-        response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        content = _extract_text(soup)
+        parse_started = time.perf_counter()
+        parsed = await run_parse(parse_detail_document, response.text)
+        parse_ms = (time.perf_counter() - parse_started) * 1000
 
         return {
             "id": source["id"],
             "name": source["name"],
             "url": source["url"],
-            "status": "success",
-            "content": content,
+            "status": "oversize" if response.oversize else "success",
+            **parsed,
+            "from_cache": response.from_cache,
+            "bytes_read": response.bytes_read,
+            "stopped_early": response.stopped_early,
+            "parse_ms": round(parse_ms, 1),
+            "attempts": len(fetcher.attempts_for(source["url"])),
         }
 
     except httpx.TimeoutException:
@@ -235,6 +312,7 @@ async def scrape_url(
             "url": source["url"],
             "status": "timeout",
             "content": "",
+            "attempts": len(fetcher.attempts_for(source["url"])),
         }
     except Exception as e:
         logger.error(f"Error scraping {source['url']}: {e}")
@@ -244,6 +322,7 @@ async def scrape_url(
             "url": source["url"],
             "status": "error",
             "content": "",
+            "attempts": len(fetcher.attempts_for(source["url"])),
             "error": str(e),
         }
 
@@ -252,6 +331,12 @@ async def scrape_url(
 # 統合: Phase 1 + Phase 2
 # ─────────────────────────────────────────────────────────────────
 
+async def _timed(key: str, coro: Awaitable[Dict[str, Any]]) -> Tuple[str, Dict[str, Any], float]:
+    started = time.perf_counter()
+    result = await coro
+    return key, result, (time.perf_counter() - started) * 1000
+
+
 async def scrape_all_sources(
     progress_callback: Optional[Callable] = None,
 ) -> Dict[str, Any]:
@@ -259,42 +344,74 @@ async def scrape_all_sources(
     Phase 1: GitHub 公式ページからモデル一覧取得
     Phase 2: 各プロバイダーページから詳細情報取得
 
+    Phase 2 は Phase 1 の結果に依存しないため、両方を同時に取得する。
+
     Returns:
         {
             "copilot_models": { ... Phase 1 結果 ... },
             "detail_sources": [ ... Phase 2 結果 ... ],
+            "fetch_attempts": [ ... リクエスト試行ごとの記録 ... ],
+            "timings": {"total_ms": ..., "parse_ms": ..., "sources": { ... ソースごとの所要時間 ... }},
         }
     """
-    async with httpx.AsyncClient() as client:
-        # ── Phase 1 ──
-        if progress_callback:
-            await progress_callback(5, "GitHub 公式ページからモデル一覧を取得中...")
-
-        copilot_models = await scrape_copilot_model_list(client)
-
-        model_count = len(copilot_models.get("models", []))
-        if progress_callback:
-            await progress_callback(
-                15,
-                f"GitHub 公式: {model_count} モデルを検出 → 詳細情報を収集中...",
-            )
+    started = time.perf_counter()
+    results: Dict[str, Dict[str, Any]] = {}
+    source_timings: Dict[str, Dict[str, Any]] = {}
 
-        # ── Phase 2 ──
-        detail_results: List[Dict] = []
-        total = len(DETAIL_SOURCES)
-        tasks = [scrape_url(client, src) for src in DETAIL_SOURCES]
-
-        for i, coro in enumerate(asyncio.as_completed(tasks)):
-            result = await coro
-            detail_results.append(result)
-            if progress_callback:
-                pct = 15 + int((i + 1) / total * 25)  # 15-40%
-                await progress_callback(
-                    pct,
-                    f"詳細情報収集中... ({i + 1}/{total}: {result['name']})",
-                )
+    # 1 つのクライアントを共有して接続を再利用する
+    async with create_scrape_client() as client:
+        fetcher = Fetcher.from_settings(client)
+
+        tasks = [
+            asyncio.ensure_future(
+                _timed(COPILOT_MODEL_LIST_ID, scrape_copilot_model_list(fetcher))
+            )
+        ] + [
+            asyncio.ensure_future(_timed(src["id"], scrape_url(fetcher, src)))
+            for src in DETAIL_SOURCES
+        ]
+        total = len(tasks)
+
+        try:
+            for i, coro in enumerate(asyncio.as_completed(tasks)):
+                source_id, result, elapsed_ms = await coro
+                results[source_id] = result
+                source_timings[source_id] = {
+                    "status": result.get("status"),
+                    "elapsed_ms": round(elapsed_ms, 1),
+                    "attempts": result.get("attempts", 0),
+                    "from_cache": result.get("from_cache", False),
+                    "bytes_read": result.get("bytes_read", 0),
+                    "parse_ms": result.get("parse_ms", 0.0),
+                }
+
+                if progress_callback:
+                    pct = 5 + int((i + 1) / total * 35)  # 5-40%
+                    if source_id == COPILOT_MODEL_LIST_ID:
+                        message = (
+                            f"GitHub 公式: {len(result.get('models', []))} モデルを検出 "
+                            f"({i + 1}/{total})"
+                        )
+                    else:
+                        message = f"詳細情報収集中... ({i + 1}/{total}: {result['name']})"
+                    await progress_callback(pct, message)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    copilot_models = results[COPILOT_MODEL_LIST_ID]
+    detail_results = [results[src["id"]] for src in DETAIL_SOURCES]
+    timings = {
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        # 各ソースの解析時間の合計（取得と並行して実行されるため total_ms に含まれる）
+        "parse_ms": round(sum(t["parse_ms"] for t in source_timings.values()), 1),
+        "sources": source_timings,
+    }
 
     return {
         "copilot_models": copilot_models,
         "detail_sources": detail_results,
+        # リクエスト試行ごとの所要時間
+        "fetch_attempts": [a.to_dict() for a in fetcher.attempts],
+        "timings": timings,
     }
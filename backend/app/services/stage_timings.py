@@ -0,0 +1,36 @@
+"""
+データ更新の段階ごとの所要時間の記録
+
+scrape / parse / prompt / llm / validate / persist の各段階の時間 (ms) を集計する。
+同じ段階を複数回計測した場合は合計する（LLM の解析呼び出しとサマリ生成など）。
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# 表示順
+STAGES = ["scrape", "parse", "prompt", "llm", "validate", "persist"]
+
+
+class StageTimings:
+    """段階ごとの所要時間 (ms)"""
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - started) * 1000)
+
+    def add(self, stage: str, elapsed_ms: float) -> None:
+        self._stages[stage] = self._stages.get(stage, 0.0) + elapsed_ms
+
+    def to_dict(self) -> Dict[str, float]:
+        ordered = [s for s in STAGES if s in self._stages]
+        ordered += [s for s in self._stages if s not in STAGES]
+        return {stage: round(self._stages[stage], 1) for stage in ordered}
@@ -0,0 +1,168 @@
+"""
+UpdateHistory の差分保存と復元
+
+データ更新の記録ごとに models.json 全体を 2 つ保存するのではなく、
+- 直前の記録の更新後データに対する差分 (new_delta)
+- 更新前 → 更新後の差分 (old_delta、変更がなければ空)
+だけを保存する。一定件数ごと、または差分が取れない場合は
+更新後データ全体を保存するチェックポイントとする。
+
+任意の記録の更新前 / 更新後データは、直近のチェックポイントから
+差分を順に適用して復元する（復元結果はメモリにキャッシュする）。
+差分導入前の記録（old_data / new_data を丸ごと持つ行）もそのまま読める。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.database import UpdateHistory
+from app.services.model_delta import apply_delta, can_diff, diff_models_data
+
+settings = get_settings()
+
+FORMAT_FULL = "full"
+FORMAT_DELTA = "delta"
+
+_MAX_CACHED_VERSIONS = 16
+
+_cache_lock = threading.Lock()
+# 記録 ID -> 復元済みの更新後データ
+_new_data_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _cache_get(record_id: str) -> Optional[Dict[str, Any]]:
+    with _cache_lock:
+        data = _new_data_cache.get(record_id)
+        if data is not None:
+            _new_data_cache.move_to_end(record_id)
+        return data
+
+
+def _cache_put(record_id: str, data: Dict[str, Any]) -> None:
+    with _cache_lock:
+        _new_data_cache[record_id] = data
+        _new_data_cache.move_to_end(record_id)
+        while len(_new_data_cache) > _MAX_CACHED_VERSIONS:
+            _new_data_cache.popitem(last=False)
+
+
+def _is_full(record: UpdateHistory) -> bool:
+    # data_format が NULL の行は差分導入前の記録（全体を保存している）
+    return record.data_format != FORMAT_DELTA
+
+
+def record_update(
+    db: Session,
+    update_id: str,
+    status: str,
+    summary: Dict[str, Any],
+    old_data: Optional[Dict[str, Any]],
+    new_data: Optional[Dict[str, Any]],
+    gemini_model: str,
+    **extra: Any,
+) -> UpdateHistory:
+    """データ更新の記録を差分形式で追加する（commit は呼び出し側）"""
+    previous = (
+        db.query(UpdateHistory)
+        .order_by(UpdateHistory.created_at.desc())
+        .first()
+    )
+    previous_new = load_new_data(db, previous) if previous is not None else None
+
+    checkpoint = (
+        previous is None
+        or previous_new is None
+        or new_data is None
+        or (previous.chain_depth or 0) + 1 >= settings.update_history_checkpoint_interval
+        or not can_diff(previous_new, new_data)
+    )
+    old_delta = None
+    if old_data is not None and new_data is not None and can_diff(old_data, new_data):
+        old_delta = diff_models_data(old_data, new_data)
+
+    record = UpdateHistory(
+        id=update_id,
+        status=status,
+        summary=summary,
+        gemini_model=gemini_model,
+        old_delta=old_delta,
+        # 差分が取れない場合に限り、更新前データ全体を保存する
+        old_data=old_data if old_delta is None else None,
+        **extra,
+    )
+    if checkpoint:
+        record.data_format = FORMAT_FULL
+        record.new_data = new_data
+        record.chain_depth = 0
+    else:
+        record.data_format = FORMAT_DELTA
+        record.base_id = previous.id
+        record.new_delta = diff_models_data(previous_new, new_data)
+        record.chain_depth = (previous.chain_depth or 0) + 1
+
+    db.add(record)
+    if new_data is not None:
+        _cache_put(update_id, new_data)
+    return record
+
+
+def load_new_data(db: Session, record: UpdateHistory) -> Optional[Dict[str, Any]]:
+    """記録の更新後データを復元する"""
+    cached = _cache_get(record.id)
+    if cached is not None:
+        return cached
+
+    # チェックポイントかキャッシュ済みの記録まで遡る
+    chain: List[UpdateHistory] = []
+    current = record
+    base: Optional[Dict[str, Any]] = None
+    while True:
+        cached = _cache_get(current.id)
+        if cached is not None:
+            base = cached
+            break
+        if _is_full(current):
+            base = current.new_data
+            break
+        chain.append(current)
+        current = db.get(UpdateHistory, current.base_id)
+        if current is None:
+            return None
+
+    if base is None:
+        return None
+    if not chain:
+        _cache_put(record.id, base)
+        return base
+
+    data = base
+    for item in reversed(chain):
+        data = apply_delta(data, item.new_delta or {})
+        _cache_put(item.id, data)
+    return data
+
+
+def load_old_data(db: Session, record: UpdateHistory) -> Optional[Dict[str, Any]]:
+    """記録の更新前データを復元する"""
+    if record.old_data is not None:
+        return record.old_data
+    if record.old_delta is None:
+        return None
+    new_data = load_new_data(db, record)
+    if new_data is None:
+        return None
+    return apply_delta(new_data, record.old_delta, reverse=True)
+
+
+def load_update_data(db: Session, update_id: str, which: str = "new") -> Optional[Dict[str, Any]]:
+    """記録 ID から更新前 (old) / 更新後 (new) のデータを復元する"""
+    record = db.get(UpdateHistory, update_id)
+    if record is None:
+        return None
+    if which == "old":
+        return load_old_data(db, record)
+    return load_new_data(db, record)
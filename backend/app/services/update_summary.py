@@ -0,0 +1,137 @@
+"""
+更新サマリの生成（models.json の差分から決定的に作る）
+
+model_delta のフィールド単位の差分から、追加・削除・更新されたモデルと
+変更前後の値を取り出してサマリを組み立てる。LLM は使わない。
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from app.services.model_delta import can_diff, diff_models_data
+
+# key_changes に載せる件数
+MAX_KEY_CHANGES = 5
+# この幅以上のスコアの変化を主な変更として扱う
+SIGNIFICANT_SCORE_DELTA = 0.5
+
+# 表示名（key_changes 用）と、主な変更として優先する順
+FIELD_LABELS = {
+    "premium_multiplier": "乗数",
+    "cost_tier": "コスト区分",
+    "release_status": "リリース状況",
+    "available": "利用可否",
+    "context_window": "コンテキスト長",
+    "provider": "プロバイダー",
+    "name": "表示名",
+}
+# 値の変化を書かずに「更新」とだけ記録する項目
+_TEXT_FIELDS = {"description", "strengths", "cautions", "best_for"}
+
+
+def _flatten(fields: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """{"performance": {"old": {...}, "new": {...}}} を "performance.coding" 単位に展開する"""
+    flat: Dict[str, Dict[str, Any]] = {}
+    for field, pair in fields.items():
+        old, new = pair.get("old"), pair.get("new")
+        if isinstance(old, dict) and isinstance(new, dict) and field != "premium_multiplier":
+            for key in list(old) + [k for k in new if k not in old]:
+                if old.get(key) != new.get(key):
+                    flat[f"{field}.{key}"] = {"old": old.get(key), "new": new.get(key)}
+        else:
+            flat[field] = pair
+    return flat
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, dict):
+        return "/".join(str(v) for v in value.values())
+    return str(value)
+
+
+def _describe(name: str, field: str, pair: Dict[str, Any]) -> Tuple[int, str]:
+    """(優先度, 説明) を返す。優先度が小さいほど主な変更"""
+    old, new = pair.get("old"), pair.get("new")
+    if field in FIELD_LABELS:
+        priority = list(FIELD_LABELS).index(field)
+        return priority, f"{name}: {FIELD_LABELS[field]} {_format(old)} → {_format(new)}"
+    if field.startswith("performance."):
+        axis = field.split(".", 1)[1]
+        try:
+            delta = float(new) - float(old)
+        except (TypeError, ValueError):
+            delta = 0.0
+        # 変化の大きいものほど優先する
+        priority = len(FIELD_LABELS) + (0 if abs(delta) >= SIGNIFICANT_SCORE_DELTA else 10)
+        return priority, f"{name}: {axis} スコア {_format(old)} → {_format(new)}"
+    return len(FIELD_LABELS) + 20, f"{name}: {field} を更新"
+
+
+def summarize_changes(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    更新前後の models.json からサマリを作る。
+
+    Returns:
+        {
+            "models_added": [表示名], "models_removed": [表示名], "models_updated": [表示名],
+            "key_changes": [主な変更点（最大 MAX_KEY_CHANGES 件）],
+            "overall_summary": "...",
+            "field_changes": {モデル ID: {"name": 表示名, "fields": {項目: {"old", "new"}}}},
+        }
+    """
+    if not can_diff(old_data, new_data):
+        return {
+            "models_added": [],
+            "models_removed": [],
+            "models_updated": [],
+            "key_changes": ["データが更新されました"],
+            "overall_summary": "データが更新されました",
+            "field_changes": {},
+        }
+
+    delta = diff_models_data(old_data, new_data)
+    new_by_id = {m["id"]: m for m in new_data.get("models", [])}
+    added = [m.get("name", m["id"]) for m in delta.get("added", [])]
+    removed = [m.get("name", m["id"]) for m in delta.get("removed", [])]
+
+    field_changes: Dict[str, Dict[str, Any]] = {}
+    candidates: List[Tuple[int, int, str]] = []
+    for model_id, fields in delta.get("changed", {}).items():
+        name = new_by_id[model_id].get("name", model_id)
+        flat = _flatten(fields)
+        field_changes[model_id] = {"name": name, "fields": flat}
+        text_updated = False
+        for field, pair in flat.items():
+            if field in _TEXT_FIELDS:
+                text_updated = True
+                continue
+            priority, text = _describe(name, field, pair)
+            candidates.append((priority, len(candidates), text))
+        if text_updated:
+            candidates.append((len(FIELD_LABELS) + 20, len(candidates), f"{name}: 説明・特徴を更新"))
+
+    key_changes = [f"{name} を追加" for name in added] + [f"{name} を削除" for name in removed]
+    key_changes += [text for _, _, text in sorted(candidates)]
+    key_changes = key_changes[:MAX_KEY_CHANGES]
+
+    updated = [change["name"] for change in field_changes.values()]
+    if added or removed or updated:
+        parts = []
+        if added:
+            parts.append(f"{len(added)} モデルを追加")
+        if removed:
+            parts.append(f"{len(removed)} モデルを削除")
+        if updated:
+            parts.append(f"{len(updated)} モデルの情報を更新")
+        overall = "、".join(parts) + f"しました（全 {len(new_by_id)} モデル）。"
+    else:
+        overall = f"モデルデータに変更はありませんでした（全 {len(new_by_id)} モデル）。"
+        key_changes = key_changes or ["モデルデータに変更はありませんでした"]
+
+    return {
+        "models_added": added,
+        "models_removed": removed,
+        "models_updated": updated,
+        "key_changes": key_changes,
+        "overall_summary": overall,
+        "field_changes": field_changes,
+    }
@@ -0,0 +1,120 @@
+"""
+DB 負荷下での推薦 API レイテンシのベンチマーク
+
+/history を並列で叩き続けている間の /chart/recommend の p50 / p99 を、
+負荷なしの場合と比較する。DB は一時ディレクトリに作成する。
+
+    cd backend && python -m benchmarks.bench_db_concurrency [rows] [concurrency]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.database import DiagnosisHistory, SessionLocal, init_db  # noqa: E402
+from app.services.history_writer import history_writer  # noqa: E402
+from app.services.recommendation_table import rebuild_table  # noqa: E402
+
+MEASURE_SECONDS = 3.0
+REQUEST_INTERVAL = 0.005
+
+SELECTIONS = {
+    "q1": "bug_fixing",
+    "q2": "hard_to_reproduce",
+    "q3": {"complexity": "complex", "priority": ["quality"], "context_amount": "large"},
+}
+
+
+def _seed(rows: int) -> None:
+    db = SessionLocal()
+    now = datetime.utcnow()
+    result = {"recommendations": [{"rank": 1, "model_id": "gpt-4.1", "score": 80.0}]}
+    db.bulk_insert_mappings(DiagnosisHistory, [
+        {
+            "id": str(uuid.uuid4()),
+            "created_at": now - timedelta(seconds=i),
+            "selections": SELECTIONS,
+            "result": result,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+
+def _percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def _measure_recommend(client: httpx.AsyncClient, seconds: float):
+    """
+    一定間隔の送信予定時刻から完了までを計測する。
+    イベントループが止まって送信自体が遅れた時間もレイテンシに含める。
+    """
+    latencies = []
+    begin = time.perf_counter()
+    for i in range(int(seconds / REQUEST_INTERVAL)):
+        scheduled = begin + i * REQUEST_INTERVAL
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        resp = await client.post("/api/v1/chart/recommend", json={"selections": SELECTIONS})
+        resp.raise_for_status()
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+    return latencies
+
+
+async def _hammer_history(client: httpx.AsyncClient, stop: asyncio.Event, offset: int, counter):
+    while not stop.is_set():
+        resp = await client.get("/api/v1/history", params={"limit": 20, "offset": offset})
+        resp.raise_for_status()
+        counter[0] += 1
+
+
+async def main(rows: int, concurrency: int) -> None:
+    init_db()
+    _seed(rows)
+    rebuild_table()
+    await history_writer.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = await _measure_recommend(client, MEASURE_SECONDS)
+
+        stop = asyncio.Event()
+        served = [0]
+        hammers = [
+            asyncio.create_task(_hammer_history(client, stop, max(0, rows - 20), served))
+            for _ in range(concurrency)
+        ]
+        start = time.perf_counter()
+        loaded = await _measure_recommend(client, MEASURE_SECONDS)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*hammers)
+
+    await history_writer.stop()
+
+    print(f"history rows:        {rows}")
+    print(f"history concurrency: {concurrency}")
+    print(f"/history served:     {served[0]} ({served[0] / elapsed:.1f} req/s)")
+    print(f"recommend idle:      p50={statistics.median(idle):.2f}ms p99={_percentile(idle, 0.99):.2f}ms")
+    print(f"recommend loaded:    p50={statistics.median(loaded):.2f}ms p99={_percentile(loaded, 0.99):.2f}ms")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    asyncio.run(main(rows, concurrency))
@@ -0,0 +1,102 @@
+"""
+HTML 抽出バックエンドのベンチマーク
+
+tests/fixtures/html の保存済みページと GitHub Docs 程度の大きさの合成ページについて、
+バックエンドごとの処理速度（ページ / 秒・MB / 秒）と 1 ページあたりのピークメモリを比較する。
+
+ピークメモリは lxml (C 実装) の確保分も含めるため、ページごとに新しいプロセスで
+解析し、解析中の最大 RSS の増加量を測る（Linux 以外では目安）。
+
+    cd backend && python -m benchmarks.bench_html_backends
+"""
+
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from app.services.html_extract import BACKENDS, LXML_AVAILABLE
+from app.services.scraper import parse_copilot_model_list
+from benchmarks.bench_html_parse import _synthetic_page
+
+FIXTURE_DIR = Path(__file__).parent.parent / "tests" / "fixtures" / "html"
+MIN_SECONDS = 0.5
+
+
+def _pages() -> Dict[str, str]:
+    pages = {p.stem: p.read_text(encoding="utf-8") for p in sorted(FIXTURE_DIR.glob("*.html"))}
+    pages["synthetic_large"] = _synthetic_page(rows=200, paragraphs=600)
+    return pages
+
+
+def _throughput(backend: str, html: str) -> float:
+    """1 秒あたりに処理できるページ数"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        parse_copilot_model_list(html, backend)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return count / elapsed
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _peak_rss_kb(backend: str, html: str, queue) -> None:
+    try:
+        # Linux: 最大 RSS (VmHWM) を現在の RSS にリセットしてから測る
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _status_kb("VmRSS")
+        parse_copilot_model_list(html, backend)
+        queue.put(_status_kb("VmHWM") - before)
+    except OSError:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        parse_copilot_model_list(html, backend)
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS はバイト、Linux は KB で返る
+        scale = 1024 if sys.platform == "darwin" else 1
+        queue.put((after - before) / scale)
+
+
+def _peak_memory(backend: str, html: str) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_peak_rss_kb, args=(backend, html, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    backends: List[str] = [name for name in BACKENDS if name != "lxml" or LXML_AVAILABLE]
+    if not LXML_AVAILABLE:
+        print("lxml is not installed: only the bs4 backend is measured\n")
+
+    print(f"{'page':28s} {'size':>8s} " + " ".join(
+        f"{name + ' pages/s':>14s} {name + ' MB/s':>10s} {name + ' peak':>11s}" for name in backends
+    ))
+    for name, html in _pages().items():
+        size_mb = len(html.encode("utf-8")) / 1024 / 1024
+        columns = []
+        for backend in backends:
+            pages_per_sec = _throughput(backend, html)
+            peak_kb = _peak_memory(backend, html)
+            columns.append(
+                f"{pages_per_sec:14.1f} {pages_per_sec * size_mb:10.2f} {peak_kb / 1024:9.1f}MB"
+            )
+        print(f"{name:28s} {size_mb * 1024:6.0f}KB " + " ".join(columns))
+
+
+if __name__ == "__main__":
+    main()
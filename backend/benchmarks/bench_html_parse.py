@@ -0,0 +1,131 @@
+"""
+HTML 解析のベンチマーク
+
+ソースごとの解析時間と、解析中にイベントループが止まる時間を
+「イベントループ上で解析した場合」と「run_parse() でワーカーに逃がした場合」で比較する。
+
+HTTP キャッシュ (HTTP_CACHE_DIR) に保存済みのページがあればそれを使い、
+なければ GitHub Docs 程度の大きさの合成ページを使う。
+
+    cd backend && python -m benchmarks.bench_html_parse
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.config import get_settings
+from app.services.scraper import (
+    DETAIL_SOURCES,
+    GITHUB_SUPPORTED_MODELS_URL,
+    parse_copilot_model_list,
+    parse_detail_document,
+    run_parse,
+    shutdown_parse_executor,
+)
+
+REPEAT = 5
+TICK_SECONDS = 0.005
+
+
+def _synthetic_page(rows: int, paragraphs: int) -> str:
+    head = "<html><head>" + "<script>var x = 1;</script>" * 50 + "</head><body><nav>" + "<a href='#'>link</a>" * 300 + "</nav><main>"
+    table = "<table><tr><th>Model</th><th>Provider</th><th>Status</th><th>Free</th><th>Pro</th></tr>"
+    table += "".join(
+        f"<tr><td>Model {i}</td><td>OpenAI</td><td>GA</td><td>✓</td><td>✓</td></tr>" for i in range(rows)
+    ) + "</table>"
+    table += "<table><tr><th>Model</th><th>Chat</th><th>Completions</th></tr>"
+    table += "".join(f"<tr><td>Model {i}</td><td>1</td><td>Not applicable</td></tr>" for i in range(rows)) + "</table>"
+    text = "".join(
+        f"<h2>Section {i}</h2><p>{'Lorem ipsum dolor sit amet, <code>consectetur</code> adipiscing elit. ' * 20}</p>"
+        for i in range(paragraphs)
+    )
+    return head + table + text + "</main><footer>footer</footer></body></html>"
+
+
+def _load_pages() -> Tuple[str, Dict[str, Tuple[Callable, str]]]:
+    urls = {GITHUB_SUPPORTED_MODELS_URL: ("github_supported_models", parse_copilot_model_list)}
+    urls.update({src["url"]: (src["id"], parse_detail_document) for src in DETAIL_SOURCES})
+
+    pages: Dict[str, Tuple[Callable, str]] = {}
+    cache_dir = Path(get_settings().http_cache_dir)
+    if cache_dir.is_dir():
+        for path in cache_dir.glob("*.json"):
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if entry.get("url") in urls and entry.get("body"):
+                source_id, parser = urls[entry["url"]]
+                pages[source_id] = (parser, entry["body"])
+    if pages:
+        return f"HTTP cache ({cache_dir})", pages
+
+    for url, (source_id, parser) in urls.items():
+        rows = 80 if parser is parse_copilot_model_list else 20
+        pages[source_id] = (parser, _synthetic_page(rows=rows, paragraphs=150))
+    return "synthetic pages", pages
+
+
+async def _max_stall(work) -> float:
+    """work の実行中にイベントループが応答できなかった最大時間 (ms)"""
+    stalls: List[float] = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(TICK_SECONDS)
+            now = time.perf_counter()
+            stalls.append((now - last - TICK_SECONDS) * 1000)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS * 2)
+    await work()
+    done = True
+    await tick
+    return max(stalls) if stalls else 0.0
+
+
+async def main() -> None:
+    origin, pages = _load_pages()
+    print(f"pages: {origin}")
+    print(f"executor: {get_settings().scrape_parse_executor} x {get_settings().scrape_parse_workers}")
+    print()
+    print(f"{'source':28s} {'size':>9s} {'parse (median)':>15s}")
+
+    for source_id, (parser, html) in pages.items():
+        times = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            parser(html)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{source_id:28s} {len(html) / 1024:7.0f}KB {statistics.median(times):12.1f} ms")
+
+    async def inline():
+        for parser, html in pages.values():
+            parser(html)
+
+    async def offloaded():
+        await asyncio.gather(*(run_parse(parser, html) for parser, html in pages.values()))
+
+    # ワーカーの起動時間を除くため 1 回実行しておく
+    await offloaded()
+
+    start = time.perf_counter()
+    inline_stall = await _max_stall(inline)
+    inline_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    offloaded_stall = await _max_stall(offloaded)
+    offloaded_ms = (time.perf_counter() - start) * 1000
+
+    print()
+    print(f"{'all sources':28s} {'wall':>9s} {'max loop stall':>15s}")
+    print(f"{'inline (event loop)':28s} {inline_ms:7.0f}ms {inline_stall:12.1f} ms")
+    print(f"{'run_parse (executor)':28s} {offloaded_ms:7.0f}ms {offloaded_stall:12.1f} ms")
+    shutdown_parse_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+推薦スコア計算のベンチマーク
+
+参照実装 (純 Python) とコンパイル済みエンジンの 1 リクエストあたりの
+処理時間を比較する。
+
+    cd backend && python -m benchmarks.bench_recommendation
+"""
+
+import random
+import time
+
+from app.services.catalog import get_catalog
+from app.services.recommendation import (
+    compute_recommendation,
+    compute_recommendation_reference,
+)
+from app.services.scoring_engine import get_engine
+
+N_REQUESTS = 5000
+
+
+def _random_selections(rng: random.Random):
+    chart = get_catalog().chart
+    q1 = rng.choice(chart["questions"][0]["options"])["id"]
+    q2 = rng.choice(chart["questions"][1]["options_by_category"][q1])["id"]
+    q3 = {q["id"]: [o["id"] for o in q["options"]] for q in chart["questions"][2]["questions"]}
+    return {
+        "q1": q1,
+        "q2": q2,
+        "q3": {
+            "complexity": rng.choice(q3["complexity"]),
+            "priority": [p for p in q3["priority"] if rng.random() < 0.5],
+            "context_amount": rng.choice(q3["context_amount"]),
+        },
+    }
+
+
+def _bench(fn, inputs) -> float:
+    start = time.perf_counter()
+    for selections in inputs:
+        fn(selections)
+    return (time.perf_counter() - start) / len(inputs) * 1e6
+
+
+def main() -> None:
+    rng = random.Random(0)
+    inputs = [_random_selections(rng) for _ in range(N_REQUESTS)]
+
+    start = time.perf_counter()
+    get_engine()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    reference_us = _bench(compute_recommendation_reference, inputs)
+    engine_us = _bench(compute_recommendation, inputs)
+
+    print(f"requests:          {N_REQUESTS}")
+    print(f"models:            {len(get_catalog().models['models'])}")
+    print(f"engine build:      {build_ms:.2f} ms")
+    print(f"reference:         {reference_us:.1f} us/request")
+    print(f"compiled engine:   {engine_us:.1f} us/request")
+    print(f"speedup:           {reference_us / engine_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
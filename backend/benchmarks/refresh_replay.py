@@ -0,0 +1,395 @@
+"""
+データ更新 (execute_data_refresh) の記録・再生ハーネス
+
+record: 実際のページと Gemini API を使って更新を 1 回実行し、
+        スクレイピングの HTTP のやり取りと LLM のリクエスト / レスポンスを fixture ディレクトリに保存する
+replay: 保存したやり取りだけを使って（ネットワークなしで）同じ更新を再実行し、
+        段階ごとの所要時間 (scrape / parse / prompt / llm / validate / persist) を表示する
+
+どちらも一時ディレクトリのデータファイルと SQLite を使い、本番のデータや DB には触れない。
+HTTP キャッシュは使わず、毎回すべてのページを取得する。
+replay では記録時と同じプロンプトに対してのみ LLM の応答を返すため、
+プロンプトの組み立てが変わった場合は記録し直す必要がある。
+
+    cd backend && python -m benchmarks.refresh_replay record /path/to/fixture
+    cd backend && python -m benchmarks.refresh_replay replay /path/to/fixture --repeat 5
+    cd backend && python -m benchmarks.refresh_replay replay /path/to/fixture --latency
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+import google.generativeai as genai
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.models.database import Base
+from app.services import catalog, data_updater, llm_analyzer, scraper
+from app.services.fetcher import HTTP2_AVAILABLE
+from app.services.scraper import shutdown_parse_executor
+
+settings = get_settings()
+
+HTTP_FILE = "http.json"
+LLM_FILE = "llm.json"
+MODELS_FILE = "models.json"
+RESULT_FILE = "result.json"
+
+# 記録時に再現できないヘッダー（本文は展開済みで保存する）
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ReplayMismatchError(Exception):
+    """記録にないリクエストが行われた"""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode_body(body: bytes) -> Dict[str, str]:
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(exchange: Dict[str, Any]) -> bytes:
+    if "body_base64" in exchange:
+        return base64.b64decode(exchange["body_base64"])
+    return exchange.get("body", "").encode("utf-8")
+
+
+# ─────────────────────────────────────────────────────────────────
+# HTTP
+# ─────────────────────────────────────────────────────────────────
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """実際の transport の前に置き、やり取りを記録する"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.exchanges: List[Dict[str, Any]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        headers = [
+            (k, v) for k, v in response.headers.multi_items()
+            if k.lower() not in _DROPPED_HEADERS
+        ]
+        self.exchanges.append({
+            "method": request.method,
+            "url": str(request.url),
+            "status_code": response.status_code,
+            "headers": headers,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            **_encode_body(body),
+        })
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """記録したやり取りを記録順に返す（同じ URL の最後の記録は繰り返し返す）"""
+
+    def __init__(self, exchanges: List[Dict[str, Any]], latency: bool = False):
+        self.latency = latency
+        self.missing: List[str] = []
+        self._queues: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        for exchange in exchanges:
+            key = (exchange["method"], exchange["url"])
+            self._queues.setdefault(key, deque()).append(exchange)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        queue = self._queues.get((request.method, str(request.url)))
+        if not queue:
+            self.missing.append(f"{request.method} {request.url}")
+            raise httpx.ConnectError(f"Not recorded: {request.method} {request.url}", request=request)
+        exchange = queue.popleft() if len(queue) > 1 else queue[0]
+        if self.latency:
+            await asyncio.sleep(exchange["elapsed_ms"] / 1000)
+        return httpx.Response(
+            exchange["status_code"],
+            headers=exchange["headers"],
+            content=_decode_body(exchange),
+            request=request,
+        )
+
+
+# ─────────────────────────────────────────────────────────────────
+# LLM
+# ─────────────────────────────────────────────────────────────────
+
+class LlmRecorder:
+    """GenerativeModel の代わりに使い、呼び出しを記録して本物のモデルに渡す"""
+
+    def __init__(self, model_factory: Callable[..., Any]):
+        self.model_factory = model_factory
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _record(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def __call__(self, **kwargs: Any) -> Any:
+        recorder = self
+        inner = self.model_factory(**kwargs)
+
+        class RecordingModel:
+            def generate_content(self, prompt: str, **options: Any) -> Any:
+                started = time.perf_counter()
+                response = inner.generate_content(prompt, **options)
+                if options.get("stream"):
+                    # ストリーミングは全チャンクを受信してから記録し、同じチャンクを返す
+                    response = list(response)
+                    text = "".join(chunk.text for chunk in response)
+                else:
+                    text = response.text
+                recorder._record({
+                    "kind": "generate_content",
+                    "prompt_sha256": _sha256(prompt),
+                    "prompt": prompt,
+                    "text": text,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                })
+                return response
+
+            def count_tokens(self, text: str, **options: Any) -> Any:
+                started = time.perf_counter()
+                response = inner.count_tokens(text, **options)
+                recorder._record({
+                    "kind": "count_tokens",
+                    "prompt_sha256": _sha256(text),
+                    "total_tokens": response.total_tokens,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                })
+                return response
+
+        return RecordingModel()
+
+
+class LlmReplayer:
+    """記録した応答をプロンプトのハッシュで引いて返す GenerativeModel の代用品"""
+
+    def __init__(self, calls: List[Dict[str, Any]], latency: bool = False):
+        self.latency = latency
+        self.missing: List[str] = []
+        self._calls = {(c["kind"], c["prompt_sha256"]): c for c in calls}
+
+    def _lookup(self, kind: str, prompt: str) -> Dict[str, Any]:
+        call = self._calls.get((kind, _sha256(prompt)))
+        if call is None:
+            self.missing.append(f"{kind} {_sha256(prompt)[:12]}")
+            raise ReplayMismatchError(f"No recorded {kind} response for this prompt")
+        if self.latency:
+            # SDK と同じくワーカースレッドで呼ばれるため同期的に待つ
+            time.sleep(call["elapsed_ms"] / 1000)
+        return call
+
+    def __call__(self, **kwargs: Any) -> Any:
+        replayer = self
+
+        class ReplayModel:
+            def generate_content(self, prompt: str, **options: Any) -> Any:
+                response = SimpleNamespace(text=replayer._lookup("generate_content", prompt)["text"])
+                return [response] if options.get("stream") else response
+
+            def count_tokens(self, text: str, **options: Any) -> Any:
+                return SimpleNamespace(
+                    total_tokens=replayer._lookup("count_tokens", text)["total_tokens"]
+                )
+
+        return ReplayModel()
+
+
+# ─────────────────────────────────────────────────────────────────
+# 実行
+# ─────────────────────────────────────────────────────────────────
+
+@contextmanager
+def _sandbox(
+    models_json: Path,
+    transport: httpx.AsyncBaseTransport,
+    model_factory: Callable[..., Any],
+) -> Iterator[Path]:
+    """一時ディレクトリのデータファイル・DB と、差し替えた transport / LLM で更新を実行する"""
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        data_dir = Path(tmp)
+        for filename in catalog.CATALOG_FILES.values():
+            shutil.copy(catalog.DATA_DIR / filename, data_dir / filename)
+        shutil.copy(models_json, data_dir / MODELS_FILE)
+
+        engine = create_engine(f"sqlite:///{data_dir / 'replay.db'}")
+        Base.metadata.create_all(bind=engine)
+        stack.callback(engine.dispose)
+
+        def create_client() -> httpx.AsyncClient:
+            return httpx.AsyncClient(transport=transport)
+
+        patches = [
+            mock.patch.object(data_updater, "DATA_DIR", data_dir),
+            mock.patch.object(data_updater, "SessionLocal", sessionmaker(bind=engine)),
+            mock.patch.object(llm_analyzer, "DATA_DIR", data_dir),
+            mock.patch.object(catalog, "_store", catalog.CatalogStore(data_dir)),
+            mock.patch.object(scraper, "create_scrape_client", create_client),
+            mock.patch.object(settings, "http_cache_enabled", False),
+            mock.patch.object(settings, "llm_cache_enabled", False),
+            mock.patch.object(genai, "configure", lambda **kwargs: None),
+            mock.patch.object(genai, "GenerativeModel", model_factory),
+        ]
+        for patch in patches:
+            stack.enter_context(patch)
+        yield data_dir
+
+
+def _comparable(models: Dict[str, Any]) -> Dict[str, Any]:
+    """記録と再生の結果の比較用（実行時刻は除く）"""
+    return {k: v for k, v in models.items() if k not in ("version", "last_updated")}
+
+
+async def record(
+    fixture_dir: Path,
+    model_id: Optional[str] = None,
+    api_key: Optional[str] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    model_factory: Optional[Callable[..., Any]] = None,
+) -> Dict[str, Any]:
+    """
+    更新を 1 回実行してやり取りを fixture_dir に保存する。
+    transport / model_factory を省略した場合は実際のネットワークと Gemini API を使う。
+    """
+    model_id = model_id or settings.llm_model
+    api_key = api_key or settings.gemini_api_key
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(catalog.DATA_DIR / MODELS_FILE, fixture_dir / MODELS_FILE)
+
+    recording = RecordingTransport(transport or httpx.AsyncHTTPTransport(
+        http2=settings.scrape_http2 and HTTP2_AVAILABLE,
+    ))
+    recorder = LlmRecorder(model_factory or genai.GenerativeModel)
+    with _sandbox(fixture_dir / MODELS_FILE, recording, recorder) as data_dir:
+        result = await data_updater.execute_data_refresh(model_id, api_key, force=True)
+        output = json.loads((data_dir / MODELS_FILE).read_text(encoding="utf-8"))
+
+    _write_json(fixture_dir / HTTP_FILE, recording.exchanges)
+    _write_json(fixture_dir / LLM_FILE, recorder.calls)
+    _write_json(fixture_dir / RESULT_FILE, {
+        "model_id": model_id,
+        "status": result["status"],
+        "models": _comparable(output),
+        "timings": result["timings"],
+    })
+    return result
+
+
+async def replay(fixture_dir: Path, latency: bool = False) -> Dict[str, Any]:
+    """
+    fixture_dir の記録だけを使って更新を実行する。
+    返り値の "replay" に記録との一致状況（記録になかったリクエスト・結果の一致）を含める。
+    latency=True の場合は記録時の応答時間だけ待ってから応答する。
+    """
+    recorded = json.loads((fixture_dir / RESULT_FILE).read_text(encoding="utf-8"))
+    transport = ReplayTransport(_read_json(fixture_dir / HTTP_FILE), latency=latency)
+    replayer = LlmReplayer(_read_json(fixture_dir / LLM_FILE), latency=latency)
+
+    with _sandbox(fixture_dir / MODELS_FILE, transport, replayer) as data_dir:
+        result = await data_updater.execute_data_refresh(recorded["model_id"], "replay", force=True)
+        output = json.loads((data_dir / MODELS_FILE).read_text(encoding="utf-8"))
+
+    result["replay"] = {
+        "missing_http": transport.missing,
+        "missing_llm": replayer.missing,
+        "matches_recording": (
+            result["status"] == recorded["status"]
+            and _comparable(output) == recorded["models"]
+        ),
+    }
+    return result
+
+
+def _write_json(path: Path, value: Any) -> None:
+    path.write_text(json.dumps(value, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _read_json(path: Path) -> Any:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# ─────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────
+
+def _print_stages(runs: List[Dict[str, float]]) -> None:
+    stages: List[str] = []
+    for run in runs:
+        stages += [s for s in run if s not in stages]
+    print(f"{'stage':10s} {'median':>10s} {'min':>10s} {'max':>10s}")
+    for stage in stages:
+        values = [run.get(stage, 0.0) for run in runs]
+        print(
+            f"{stage:10s} {statistics.median(values):8.1f}ms "
+            f"{min(values):8.1f}ms {max(values):8.1f}ms"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="mode", required=True)
+    rec = sub.add_parser("record", help="実際のページと Gemini API で更新を実行して記録する")
+    rec.add_argument("fixture_dir", type=Path)
+    rec.add_argument("--model", default=None, help="使用する Gemini モデル (既定: LLM_MODEL)")
+    rep = sub.add_parser("replay", help="記録を使ってオフラインで更新を実行する")
+    rep.add_argument("fixture_dir", type=Path)
+    rep.add_argument("--repeat", type=int, default=3)
+    rep.add_argument("--latency", action="store_true", help="記録時の応答時間を再現する")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        result = await record(args.fixture_dir, model_id=args.model)
+        print(f"recorded to {args.fixture_dir}: status={result['status']}")
+        _print_stages([result["timings"]["stages"]])
+        shutdown_parse_executor()
+        return
+
+    # 解析ワーカーの起動時間を除くため 1 回実行しておく
+    await replay(args.fixture_dir)
+
+    runs = []
+    for i in range(args.repeat):
+        result = await replay(args.fixture_dir, latency=args.latency)
+        check = result["replay"]
+        print(
+            f"run {i + 1}: status={result['status']} "
+            f"matches_recording={check['matches_recording']} "
+            f"missing_http={len(check['missing_http'])} missing_llm={len(check['missing_llm'])}"
+        )
+        runs.append(result["timings"]["stages"])
+    print()
+    _print_stages(runs)
+    shutdown_parse_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.services.catalog import CATALOG_FILES, CatalogStore
+
+DATA_DIR = Path(__file__).parent.parent / "app" / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename in CATALOG_FILES.values():
+        shutil.copy(DATA_DIR / filename, tmp_path / filename)
+    return tmp_path
+
+
+def test_catalog_reuses_snapshot_when_unchanged(data_dir):
+    store = CatalogStore(data_dir)
+    first = store.get()
+    assert store.get() is first
+    assert "gpt-4.1" in first.models_by_id
+
+
+def test_catalog_reloads_on_file_change(data_dir):
+    store = CatalogStore(data_dir)
+    first = store.get()
+
+    models = json.loads((data_dir / "models.json").read_text(encoding="utf-8"))
+    models["models"] = models["models"][:1]
+    (data_dir / "models.json").write_text(json.dumps(models), encoding="utf-8")
+
+    second = store.get()
+    assert second.version != first.version
+    assert len(second.models["models"]) == 1
+    # 取得済みのスナップショットは差し替えの影響を受けない
+    assert len(first.models["models"]) > 1
+    # 変更のないファイルはパース結果を使い回す
+    assert second.chart is first.chart
+
+
+def test_catalog_invalidate_keeps_version_for_same_content(data_dir):
+    store = CatalogStore(data_dir)
+    first = store.get()
+    store.invalidate()
+    second = store.get()
+    assert second is not first
+    assert second.version == first.version
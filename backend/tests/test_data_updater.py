@@ -0,0 +1,170 @@
+import asyncio
+import shutil
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, UpdateHistory
+from app.services import data_updater, llm_analyzer
+from app.services.catalog import DATA_DIR
+
+
+def _scraped(content="Claude Sonnet 4 is fast"):
+    return {
+        "copilot_models": {
+            "status": "success",
+            "models": [{"name": "GPT-4.1", "provider": "OpenAI"}, {"name": "Claude Sonnet 4", "provider": "Anthropic"}],
+            "multipliers": {"GPT-4.1": 0},
+            "retired": [],
+        },
+        "detail_sources": [
+            {"id": "anthropic_models", "status": "success", "content": content},
+            {"id": "google_models", "status": "error", "content": ""},
+        ],
+    }
+
+
+def test_fingerprints_ignore_row_order_and_failed_sources():
+    base = data_updater.compute_source_fingerprints(_scraped())
+    reordered = _scraped()
+    reordered["copilot_models"]["models"].reverse()
+
+    assert set(base) == {"github_supported_models", "anthropic_models"}
+    assert data_updater.compute_source_fingerprints(reordered) == base
+    assert data_updater.diff_fingerprints(base, base) == []
+    assert data_updater.diff_fingerprints(
+        base, data_updater.compute_source_fingerprints(_scraped("Claude Sonnet 4 is slow"))
+    ) == ["anthropic_models"]
+    assert data_updater.diff_fingerprints(None, base) == list(base)
+
+
+def test_refresh_skips_llm_when_sources_unchanged(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    shutil.copy(DATA_DIR / "models.json", tmp_path / "models.json")
+
+    db = session_factory()
+    db.add(UpdateHistory(
+        id="previous",
+        status="success",
+        summary={},
+        source_fingerprints=data_updater.compute_source_fingerprints(_scraped()),
+    ))
+    db.commit()
+    db.close()
+
+    llm_calls = []
+
+    async def fake_scrape(progress_callback=None):
+        return _scraped()
+
+    async def fake_analyze(**kwargs):
+        llm_calls.append(kwargs)
+        return None
+
+    monkeypatch.setattr(data_updater, "SessionLocal", session_factory)
+    monkeypatch.setattr(data_updater, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_updater, "scrape_all_sources", fake_scrape)
+    monkeypatch.setattr(data_updater, "analyze_with_llm", fake_analyze)
+
+    result = asyncio.run(data_updater.execute_data_refresh("gemini-test", "key"))
+    assert result["status"] == "unchanged"
+    assert result["summary"]["changed_sources"] == []
+    assert llm_calls == []
+
+    # force=True の場合は変更がなくても解析する
+    result = asyncio.run(data_updater.execute_data_refresh("gemini-test", "key", force=True))
+    assert result["status"] == "partial"
+    assert len(llm_calls) == 1
+
+
+def test_refresh_writes_rule_based_update_when_llm_unavailable(tmp_path, monkeypatch):
+    import json
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    shutil.copy(DATA_DIR / "models.json", tmp_path / "models.json")
+
+    async def fake_scrape(progress_callback=None):
+        scraped = _scraped()
+        scraped["copilot_models"]["models"].append({"name": "GPT-6", "provider": "OpenAI", "status": "GA"})
+        return scraped
+
+    async def fake_analyze(**kwargs):
+        return None
+
+    async def fake_save(new_data):
+        (tmp_path / "models.json").write_text(json.dumps(new_data), encoding="utf-8")
+
+    monkeypatch.setattr(data_updater, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(data_updater, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_updater, "scrape_all_sources", fake_scrape)
+    monkeypatch.setattr(data_updater, "analyze_with_llm", fake_analyze)
+    monkeypatch.setattr(data_updater, "_save_models", fake_save)
+
+    result = asyncio.run(data_updater.execute_data_refresh("gemini-test", "key"))
+
+    saved = json.loads((tmp_path / "models.json").read_text(encoding="utf-8"))
+    assert result["status"] == "partial"
+    assert [m["id"] for m in saved["models"]] == ["gpt-4.1", "claude-sonnet-4", "gpt-6"]
+    assert result["summary"]["models_added"] == ["GPT-6"]
+    assert "Claude Opus 4.6" in result["summary"]["models_removed"]
+
+
+def test_refresh_with_failed_chunk_is_analyzed_again_next_time(tmp_path, monkeypatch):
+    import json
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    shutil.copy(DATA_DIR / "models.json", tmp_path / "models.json")
+    scraped = _scraped()
+    scraped["copilot_models"]["models"].append({"name": "GPT-6", "provider": "OpenAI", "status": "GA"})
+    prompts = []
+
+    class FakeModel:
+        def __init__(self, **kwargs):
+            pass
+
+        def generate_content(self, prompt, **kwargs):
+            prompts.append(prompt)
+            targets = json.loads(prompt.split("## 対象モデル（GitHub 公式で確認された情報）\n")[1].split("\n\n##")[0])
+            if any(t["name"] == "GPT-6" for t in targets):
+                raise RuntimeError("chunk failed")
+            models = [
+                {"id": t["id"], "name": t["name"], "provider": t["provider"], "performance": {"speed": 4.0}}
+                for t in targets
+            ]
+
+            class Response:
+                text = json.dumps({"models": models})
+            return [Response()] if kwargs.get("stream") else Response()
+
+    async def fake_scrape(progress_callback=None):
+        return scraped
+
+    async def fake_save(new_data):
+        (tmp_path / "models.json").write_text(json.dumps(new_data), encoding="utf-8")
+
+    monkeypatch.setattr(data_updater, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(data_updater, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_updater, "scrape_all_sources", fake_scrape)
+    monkeypatch.setattr(data_updater, "_save_models", fake_save)
+    monkeypatch.setattr(llm_analyzer, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(llm_analyzer.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(llm_analyzer.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_chunk_size", 1)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", False)
+
+    first = asyncio.run(data_updater.execute_data_refresh("gemini-test", "key"))
+    first_calls = len(prompts)
+    saved = json.loads((tmp_path / "models.json").read_text(encoding="utf-8"))
+
+    # GPT-6 の chunk だけ失敗し、仮データで追加される
+    assert first["status"] == "partial"
+    assert saved["models"][-1]["analysis_pending"]
+
+    # 情報源が変わっていなくても、前回解析できなかったモデルは解析し直す
+    second = asyncio.run(data_updater.execute_data_refresh("gemini-test", "key"))
+    assert second["status"] == "partial"
+    assert len(prompts) > first_calls
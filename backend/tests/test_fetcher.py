@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+
+from app.services.fetcher import Fetcher, parse_retry_after
+from app.services.http_cache import HttpCache
+
+
+def _run(handler, tmp_path, urls, **kwargs):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            fetcher = Fetcher(client, cache=HttpCache(tmp_path), backoff_base=0.01, **kwargs)
+            results = await asyncio.gather(
+                *(fetcher.fetch(url) for url in urls), return_exceptions=True
+            )
+        return fetcher, results
+
+    return asyncio.run(scenario())
+
+
+def test_retries_transient_errors_then_succeeds(tmp_path):
+    calls = {"n": 0}
+
+    def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise httpx.ReadTimeout("timed out", request=request)
+        if calls["n"] == 2:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, text="ok")
+
+    fetcher, [result] = _run(handler, tmp_path, ["https://example.com/a"], max_retries=3)
+
+    assert result.text == "ok"
+    assert [(a.attempt, a.status_code) for a in fetcher.attempts] == [(1, None), (2, 503), (3, 200)]
+    assert fetcher.attempts[0].error.startswith("ReadTimeout")
+    assert fetcher.attempts[1].retry_after_ms == 0.0
+    assert fetcher.attempts[2].retry_after_ms is None
+
+
+def test_gives_up_after_max_retries_and_on_client_errors(tmp_path):
+    def handler(request):
+        return httpx.Response(404 if request.url.path == "/missing" else 500)
+
+    fetcher, results = _run(
+        handler, tmp_path, ["https://example.com/missing", "https://example.com/broken"], max_retries=2
+    )
+
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+    assert len(fetcher.attempts_for("https://example.com/missing")) == 1
+    assert len(fetcher.attempts_for("https://example.com/broken")) == 3
+
+
+def test_honors_retry_after_and_gives_up_beyond_limit(tmp_path):
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "120"})
+
+    # バックオフの上限を超える Retry-After もそのまま待つ
+    error = httpx.HTTPStatusError(
+        "", request=httpx.Request("GET", "https://example.com"),
+        response=httpx.Response(503, headers={"Retry-After": "30"}),
+    )
+    assert Fetcher(None, backoff_max=10.0)._backoff(0, error) == 30.0
+
+    fetcher, [result] = _run(handler, tmp_path, ["https://example.com/slow"], max_retries=3)
+    assert isinstance(result, httpx.HTTPStatusError)
+    # 早すぎる再試行をせずに、理由を記録して諦める
+    [attempt] = fetcher.attempts
+    assert attempt.retry_after_ms is None
+    assert "120s" in attempt.gave_up_reason
+
+
+def test_limits_concurrent_requests_per_host(tmp_path):
+    active = {}
+    peak = {}
+
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200, text="ok")
+
+    urls = [f"https://a.example.com/{i}" for i in range(6)] + [f"https://b.example.com/{i}" for i in range(2)]
+    _run(handler, tmp_path, urls, per_host_limit=2)
+
+    assert peak == {"a.example.com": 2, "b.example.com": 2}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,126 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models.database import Base, DiagnosisHistory, ModelSnapshot, get_async_db
+from app.routers import chart, history
+from app.services import history_store
+
+SELECTIONS = {"q1": "bug_fixing"}
+
+
+def _run(tmp_path, scenario, rows):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with Session() as db:
+            db.add_all(rows)
+            await db.commit()
+
+        async def override_db():
+            async with Session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(chart.router)
+        app.include_router(history.router)
+        app.dependency_overrides[get_async_db] = override_db
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            result = await scenario(client, Session)
+        await engine.dispose()
+        return result
+
+    return asyncio.run(main())
+
+
+def _rows(count, ties=3):
+    base = datetime(2026, 1, 1)
+    # ties 件ずつ同じ created_at にする
+    return [
+        DiagnosisHistory(
+            id=f"d{i:03d}",
+            created_at=base + timedelta(minutes=i // ties),
+            selections=SELECTIONS,
+            result={"recommendations": []},
+        )
+        for i in range(count)
+    ]
+
+
+def test_cursor_pages_cover_all_rows_once_with_tied_timestamps(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "_total_cache", {"value": None, "expires_at": 0.0})
+
+    async def scenario(client, Session):
+        pages = []
+        params = {"limit": 4, "include_total": "false"}
+        while True:
+            body = (await client.get("/history", params=params)).json()
+            pages.append(body)
+            if body["next_cursor"] is None:
+                return pages
+            params["after"] = body["next_cursor"]
+
+    pages = _run(tmp_path, scenario, _rows(12))
+
+    ids = [item["id"] for page in pages for item in page["items"]]
+    assert ids == [f"d{i:03d}" for i in reversed(range(12))]
+    # 最後の満杯のページでは空のページへのカーソルを返さない
+    assert [len(page["items"]) for page in pages] == [4, 4, 4]
+    assert all(page["total"] is None for page in pages)
+
+
+def test_malformed_cursor_returns_400(tmp_path):
+    async def scenario(client, Session):
+        return await client.get("/history", params={"after": "not-a-cursor"})
+
+    response = _run(tmp_path, scenario, [])
+    assert response.status_code == 400
+
+
+def test_total_is_cached_until_ttl_expires(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "_total_cache", {"value": None, "expires_at": 0.0})
+    monkeypatch.setattr(history.settings, "history_count_ttl", 1)
+
+    async def scenario(client, Session):
+        totals = [(await client.get("/history")).json()["total"]]
+        async with Session() as db:
+            db.add_all(_rows(5)[3:])
+            await db.commit()
+        totals.append((await client.get("/history")).json()["total"])
+        await asyncio.sleep(1.1)
+        totals.append((await client.get("/history")).json()["total"])
+        return totals
+
+    assert _run(tmp_path, scenario, _rows(3)) == [3, 3, 5]
+
+
+def test_batch_history_saves_snapshot_on_cold_cache_and_rehydrates(tmp_path, monkeypatch):
+    # 起動直後と同じく、スナップショットがメモリにも DB にもない状態から始める
+    monkeypatch.setattr(history_store, "_snapshots", OrderedDict())
+    monkeypatch.setattr(history_store, "_persisted", set())
+    selections = {"q1": "bug_fixing", "q2": "memory_leak", "q3": {"priority": ["quality"]}}
+
+    async def scenario(client, Session):
+        body = (await client.post(
+            "/chart/recommend/batch", json={"selections": [selections]}
+        )).json()
+        item = body["results"][0]
+        async with Session() as db:
+            snapshots = await db.scalar(select(func.count()).select_from(ModelSnapshot))
+        history_store._snapshots.clear()
+        stored = (await client.get(f"/history/{item['diagnosis_id']}")).json()
+        return item, snapshots, stored
+
+    item, snapshots, stored = _run(tmp_path, scenario, [])
+
+    assert item["diagnosis_id"] is not None
+    assert snapshots == 1
+    assert stored["result"] == {"recommendations": item["recommendations"]}
@@ -0,0 +1,88 @@
+import copy
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, DiagnosisHistory, ModelSnapshot
+from app.services import history_store
+from app.services.catalog import get_catalog
+from app.services.recommendation import compute_recommendation
+
+SELECTIONS = {"q1": "bug_fixing", "q2": "memory_leak", "q3": {"priority": ["quality"]}}
+
+
+def test_compact_result_round_trips():
+    catalog = get_catalog()
+    results = compute_recommendation(SELECTIONS)
+    compact = history_store.compact_result(results, catalog)
+
+    assert compact["data_version"] == catalog.version
+    assert "model" not in compact["recommendations"][0]
+    assert history_store.rehydrate_cached(compact) == {"recommendations": results}
+
+
+def test_migrate_legacy_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    history_store._persisted.clear()
+
+    results = compute_recommendation(SELECTIONS)
+    edited = copy.deepcopy(results)
+    edited[0]["model"]["description"] = "以前のバージョンの説明"
+
+    db = Session()
+    db.add_all([
+        DiagnosisHistory(id="current", selections=SELECTIONS, result={"recommendations": results}),
+        DiagnosisHistory(id="older", selections=SELECTIONS, result={"recommendations": edited}),
+    ])
+    db.commit()
+
+    assert history_store.migrate_legacy_results(db) == {"converted": 2, "skipped": 0}
+
+    current = db.get(DiagnosisHistory, "current").result
+    older = db.get(DiagnosisHistory, "older").result
+    assert current["data_version"] == get_catalog().version
+    assert older["data_version"].startswith("legacy-")
+    assert db.query(ModelSnapshot).count() == 2
+    assert history_store.rehydrate_cached(current) == {"recommendations": results}
+    assert history_store.rehydrate_cached(older) == {"recommendations": edited}
+    db.close()
+
+
+def test_migrate_persists_every_legacy_snapshot(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    history_store._persisted.clear()
+
+    results = compute_recommendation(SELECTIONS)
+    count = history_store._MAX_CACHED_SNAPSHOTS + 8
+    expected = {}
+    db = Session()
+    for i in range(count):
+        edited = copy.deepcopy(results)
+        edited[0]["model"]["description"] = f"以前のバージョンの説明 {i}"
+        expected[f"row-{i}"] = edited
+        db.add(DiagnosisHistory(id=f"row-{i}", selections=SELECTIONS, result={"recommendations": edited}))
+    # 内容が同じ行は同じスナップショットを参照する
+    db.add(DiagnosisHistory(id="row-0-copy", selections=SELECTIONS, result={"recommendations": expected["row-0"]}))
+    expected["row-0-copy"] = expected["row-0"]
+    db.commit()
+
+    assert history_store.migrate_legacy_results(db, batch_size=16) == {
+        "converted": count + 1, "skipped": 0
+    }
+
+    assert db.query(ModelSnapshot).count() == count
+    history_store._snapshots.clear()
+    for row_id, recommendations in expected.items():
+        result = db.get(DiagnosisHistory, row_id).result
+        snapshot = db.get(ModelSnapshot, result["data_version"])
+        view = history_store._view(snapshot.version, snapshot.models, snapshot.templates)
+        assert history_store._rehydrate(result, view) == {"recommendations": recommendations}
+    assert (
+        db.get(DiagnosisHistory, "row-0").result["data_version"]
+        == db.get(DiagnosisHistory, "row-0-copy").result["data_version"]
+    )
+    db.close()
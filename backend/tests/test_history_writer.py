@@ -0,0 +1,97 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, DiagnosisHistory
+from app.services.history_writer import HistoryWriter
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _row(i):
+    return {"id": f"diag-{i}", "selections": {"q1": "testing"}, "result": {"recommendations": []}}
+
+
+def test_writer_buffers_then_flushes_in_batches(tmp_path):
+    Session = _session_factory(tmp_path)
+    writer = HistoryWriter(session_factory=Session, batch_size=2, flush_interval=60)
+
+    async def scenario():
+        await writer.start()
+        for i in range(3):
+            assert await writer.submit(_row(i))
+        # 書き込み前でもメモリ上から参照できる
+        assert writer.get_pending("diag-2")["selections"] == {"q1": "testing"}
+        await writer.flush()
+        assert writer.get_pending("diag-2") is None
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+    db = Session()
+    assert db.query(DiagnosisHistory).count() == 3
+    db.close()
+    assert writer.stats()["written"] == 3
+
+
+def test_writer_drops_when_queue_is_full_and_drains_on_stop(tmp_path):
+    Session = _session_factory(tmp_path)
+    writer = HistoryWriter(session_factory=Session, max_queue=2, flush_interval=60)
+
+    async def scenario():
+        await writer.start()
+        # イベントループに制御を返さないので書き込みタスクは消費できない
+        results = [await writer.submit(_row(i)) for i in range(3)]
+        await writer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+
+    db = Session()
+    assert db.query(DiagnosisHistory).count() == 2
+    db.close()
+
+
+def test_writer_retries_failed_batch_once_then_reports_failure(tmp_path, caplog):
+    Session = _session_factory(tmp_path)
+    attempts = []
+
+    def flaky_session(fail_times):
+        def factory():
+            attempts.append(1)
+            session = Session()
+            if len(attempts) <= fail_times:
+                session.commit = _raise
+            return session
+        return factory
+
+    def _raise():
+        raise RuntimeError("database is locked")
+
+    writer = HistoryWriter(session_factory=flaky_session(1), retry_delay=0)
+
+    async def scenario(w, row):
+        await w.start()
+        await w.submit(row)
+        await w.stop()
+
+    asyncio.run(scenario(writer, _row(0)))
+    assert writer.stats()["written"] == 1
+    assert writer.stats()["failed"] == 0
+
+    attempts.clear()
+    writer = HistoryWriter(session_factory=flaky_session(2), retry_delay=0)
+    asyncio.run(scenario(writer, _row(1)))
+    assert writer.stats()["failed"] == 1
+    assert writer.get_pending("diag-1") is None
+    assert "diag-1" in caplog.text
+
+    db = Session()
+    assert [h.id for h in db.query(DiagnosisHistory).all()] == ["diag-0"]
+    db.close()
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from app.services import html_extract
+from app.services.scraper import parse_copilot_model_list, parse_detail_document
+
+FIXTURES = sorted((Path(__file__).parent / "fixtures" / "html").glob("*.html"))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.stem)
+def test_lxml_backend_matches_bs4(path):
+    pytest.importorskip("lxml")
+    html = path.read_text(encoding="utf-8")
+
+    assert parse_copilot_model_list(html, "lxml") == parse_copilot_model_list(html, "bs4")
+    # 本文だけでなく、コンテキスト長の抽出に使う表も一致すること
+    assert parse_detail_document(html, "lxml") == parse_detail_document(html, "bs4")
+
+
+@pytest.mark.parametrize("html", [
+    "",
+    "  \n ",
+    '<?xml version="1.0" encoding="iso-8859-1"?>'
+    "<html><body><main><p>café</p><table><tr><td>a</td></tr></table></main></body></html>",
+    "<html><body><main><p>a\x00b\x0cc\x01d</p></main></body></html>",
+], ids=["empty", "whitespace", "xml-declaration", "control-chars"])
+def test_lxml_backend_matches_bs4_on_edge_cases(html):
+    pytest.importorskip("lxml")
+
+    assert parse_detail_document(html, "lxml") == parse_detail_document(html, "bs4")
+
+
+def test_fixture_extraction():
+    html = (FIXTURES[0].parent / "github_supported_models.html").read_text(encoding="utf-8")
+    parsed = parse_copilot_model_list(html, "bs4")
+
+    assert len(parsed["models"]) == 10
+    assert parsed["models"][4] == {
+        "name": "Claude Opus 4.6 (fast mode)", "provider": "Anthropic", "status": "Public preview",
+    }
+    assert parsed["multipliers"]["Grok Code Fast 1"] == {"chat": "0.25", "completions": "1"}
+    assert [r["name"] for r in parsed["retired"]] == ["o1-mini", "Claude Sonnet 3.7 Thinking"]
+    # ページ内の script / header / footer は本文に含めない
+    assert "analytics" not in parsed["raw_text"]
+    assert "Edit this page" not in parsed["raw_text"]
+
+    # 長いページも切り詰めず、末尾の内容まで prompt_builder に渡す
+    long_page = (FIXTURES[0].parent / "google_models.html").read_text(encoding="utf-8")
+    content = parse_detail_document(long_page, "bs4")["content"]
+    assert len(content) > 15000 and not content.endswith("(truncated)")
+
+
+def test_backend_selection(monkeypatch):
+    assert html_extract.get_backend("bs4").name == "bs4"
+    assert html_extract.get_backend("unknown").name == "bs4"
+
+    monkeypatch.setattr(html_extract, "LXML_AVAILABLE", False)
+    assert html_extract.get_backend("auto").name == "bs4"
+    assert html_extract.get_backend("lxml").name == "bs4"
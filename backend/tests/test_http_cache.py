@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+
+from app.services.http_cache import HttpCache, fetch_with_cache
+
+URL = "https://example.com/models"
+
+
+def test_conditional_fetch_reuses_cached_body_on_304(tmp_path):
+    cache = HttpCache(tmp_path)
+    seen_headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_headers.append(dict(request.headers))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html>v1</html>", headers={"ETag": '"v1"'})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await fetch_with_cache(client, URL, cache=cache)
+            second = await fetch_with_cache(client, URL, cache=cache)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert not first.from_cache
+    assert "if-none-match" not in seen_headers[0]
+    assert seen_headers[1]["if-none-match"] == '"v1"'
+    assert second.status_code == 304
+    assert second.text == "<html>v1</html>"
+    assert second.from_cache
+
+
+def test_fetch_without_validators_always_returns_fresh_body(tmp_path):
+    cache = HttpCache(tmp_path)
+    bodies = iter(["same", "same", "different"])
+    seen_headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_headers.append(dict(request.headers))
+        return httpx.Response(200, text=next(bodies))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [await fetch_with_cache(client, URL, cache=cache) for _ in range(3)]
+
+    results = asyncio.run(scenario())
+    assert [r.text for r in results] == ["same", "same", "different"]
+    assert not any(r.from_cache for r in results)
+    assert not any("if-none-match" in h or "if-modified-since" in h for h in seen_headers)
+
+
+def test_fetch_truncates_body_over_max_bytes(tmp_path):
+    cache = HttpCache(tmp_path)
+    chunks = [b"<html><main>", b"x" * 4096, b"y" * 4096, b"</main></html>"]
+    sent = []
+
+    async def stream():
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=stream(), headers={"ETag": '"v1"'})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await fetch_with_cache(client, URL, cache=cache, max_bytes=4000)
+            second = await fetch_with_cache(client, URL, cache=cache, max_bytes=4000)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.oversize and not first.stopped_early
+    assert first.bytes_read == 4000
+    assert first.text.startswith("<html><main>x") and "y" not in first.text
+    # 上限を超えた時点で残りのチャンクは読まない
+    assert len(sent) == 2
+    # 304 で再利用した場合も途中までの本文であることを引き継ぐ
+    assert second.from_cache and second.oversize
+
+
+def test_fetch_stops_after_main_content_end_marker():
+    chunks = [b"<html><body><main>text</ma", b"in><footer>", b"z" * 10000, b"</footer></body></html>"]
+    sent = []
+
+    async def stream():
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=stream())
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_with_cache(
+                client, URL, max_bytes=100000, stop_markers=(b"</MAIN>",)
+            )
+
+    result = asyncio.run(scenario())
+
+    assert result.stopped_early and not result.oversize
+    # チャンクの境界をまたいだ終了タグも検出する
+    assert result.text == "<html><body><main>text</main>"
+    assert len(sent) == 2
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from app.services.json_stream import ModelArrayParser, StreamStructureError
+
+
+def test_yields_models_as_they_complete():
+    text = json.dumps({
+        "version": "1",
+        "notes": ["[not a model]", {"x": "}"}],
+        "models": [{"id": "a", "name": "A {1}", "strengths": ["x"]}, {"id": "b", "performance": {"speed": 4}}],
+    }, ensure_ascii=False)
+    parser = ModelArrayParser()
+    seen = []
+    for i in range(0, len(text), 7):
+        seen.extend(parser.feed(text[i:i + 7]))
+        if i + 7 < len(text):
+            assert not parser.complete
+    assert [m["id"] for m in seen] == ["a", "b"]
+    assert seen[0]["name"] == "A {1}"
+    assert parser.complete and json.loads(parser.text)["version"] == "1"
+
+    parser = ModelArrayParser()
+    assert parser.feed('[{"id": "a"}, {"id": "b"') == [{"id": "a"}]
+    assert not parser.complete
+
+
+def test_structural_errors_are_raised_immediately():
+    parser = ModelArrayParser()
+    parser.feed('{"models": [{"id": "a"}')
+    with pytest.raises(StreamStructureError):
+        parser.feed('}')
+
+    with pytest.raises(StreamStructureError):
+        ModelArrayParser().feed('{"models": [{"id": "a",}]}')
+
+    with pytest.raises(StreamStructureError):
+        ModelArrayParser().feed('以下が結果です')
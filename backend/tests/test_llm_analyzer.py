@@ -0,0 +1,185 @@
+import asyncio
+import copy
+import json
+import threading
+import time
+
+from app.services import llm_analyzer
+from app.services.catalog import get_catalog
+
+
+def _copilot(models):
+    return {
+        "status": "success",
+        "models": [
+            {"name": m["name"], "provider": m["provider"], "status": m["release_status"]}
+            for m in models
+        ],
+        "multipliers": {m["name"]: m["premium_multiplier"] for m in models},
+        "retired": [],
+    }
+
+
+def test_plan_only_targets_added_and_changed_models():
+    current = copy.deepcopy(get_catalog().models)
+    copilot = _copilot(current["models"])
+    copilot["models"].append({"name": "GPT-6", "provider": "OpenAI", "status": "Public preview"})
+    copilot["multipliers"]["Claude Sonnet 4"] = {"chat": "2", "completions": "Not applicable"}
+    copilot["retired"].append({"name": "Goldeneye", "retirement_date": "2026-01-01", "replacement": ""})
+
+    plan = llm_analyzer.plan_incremental_analysis(copilot, current, changed_sources=[])
+    assert [t.id for t in plan.targets] == ["claude-sonnet-4", "gpt-6"]
+    assert plan.removed == ["goldeneye"]
+    assert len(plan.carried) == len(current["models"]) - 2
+
+    # プロバイダーの詳細情報が変わった場合はそのプロバイダーのモデルを再解析する
+    plan = llm_analyzer.plan_incremental_analysis(
+        _copilot(current["models"]), current, changed_sources=["xai_models"]
+    )
+    assert [t.id for t in plan.targets] == ["grok-code-fast-1"]
+
+    plan = llm_analyzer.plan_incremental_analysis(_copilot(current["models"]), current, None)
+    assert len(plan.targets) == len(current["models"])
+
+
+def test_incremental_analysis_runs_chunks_concurrently(tmp_path, monkeypatch):
+    current = copy.deepcopy(get_catalog().models)
+    (tmp_path / "models.json").write_text(json.dumps(current), encoding="utf-8")
+    copilot = _copilot(current["models"])
+    for name in ["GPT-6", "GPT-6 mini", "GPT-6 nano"]:
+        copilot["models"].append({"name": name, "provider": "OpenAI", "status": "GA"})
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    class FakeModel:
+        def __init__(self, **kwargs):
+            pass
+
+        def generate_content(self, prompt, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            targets = json.loads(prompt.split("## 対象モデル（GitHub 公式で確認された情報）\n")[1].split("\n\n##")[0])
+            models = [
+                {"id": t["id"], "name": t["name"], "provider": t["provider"], "performance": {"speed": 4.0}}
+                for t in targets
+            ]
+
+            class Response:
+                text = json.dumps({"models": models})
+            return [Response()] if kwargs.get("stream") else Response()
+
+    monkeypatch.setattr(llm_analyzer, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(llm_analyzer.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(llm_analyzer.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_chunk_size", 1)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_max_concurrency", 2)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", False)
+
+    result = asyncio.run(llm_analyzer.analyze_with_llm(
+        {"copilot_models": copilot, "detail_sources": []},
+        model_id="gemini-test",
+        api_key="key",
+        changed_sources=[],
+    ))
+
+    ids = [m["id"] for m in result["models"]]
+    assert ids == [m["id"] for m in current["models"]] + ["gpt-6", "gpt-6-mini", "gpt-6-nano"]
+    # 変更のないモデルは LLM を通さずにそのまま引き継ぐ
+    assert result["models"][:len(current["models"])] == current["models"]
+    assert peak == 2
+
+
+def test_streaming_analysis_stops_at_truncation_and_keeps_parsed_models(tmp_path, monkeypatch):
+    current = copy.deepcopy(get_catalog().models)
+    (tmp_path / "models.json").write_text(json.dumps(current), encoding="utf-8")
+    copilot = _copilot(current["models"])
+    first, second = current["models"][:2]
+    text = json.dumps({"models": [
+        {**first, "description": "ストリーミングで更新"},
+        {**second, "description": "途中で切れる"},
+    ]}, ensure_ascii=False)
+    # 2 件目の途中で出力トークンの上限に達した応答
+    truncated = text[:text.index("途中で切れる")]
+    pieces = [truncated[i:i + 200] for i in range(0, len(truncated), 200)]
+
+    class Chunk:
+        def __init__(self, text, last):
+            self.text = text
+            reason = type("Reason", (), {"name": "MAX_TOKENS" if last else "FINISH_REASON_UNSPECIFIED"})
+            self.candidates = [type("Candidate", (), {"finish_reason": reason})]
+
+    class FakeModel:
+        def __init__(self, **kwargs):
+            pass
+
+        def generate_content(self, prompt, stream=False, **kwargs):
+            assert stream
+            for i, piece in enumerate(pieces):
+                yield Chunk(piece, i == len(pieces) - 1)
+
+    progress = []
+
+    async def on_progress(percent, message, **details):
+        progress.append(details)
+
+    monkeypatch.setattr(llm_analyzer, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(llm_analyzer.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(llm_analyzer.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_incremental_analysis", False)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_streaming", True)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", False)
+
+    result = asyncio.run(llm_analyzer.analyze_with_llm(
+        {"copilot_models": copilot, "detail_sources": []},
+        model_id="gemini-test",
+        api_key="key",
+        progress_callback=on_progress,
+    ))
+
+    # 受信できたモデルだけを更新し、残りは現在のデータを維持する
+    assert [m["id"] for m in result["models"]] == [m["id"] for m in current["models"]]
+    assert result["models"][0]["description"] == "ストリーミングで更新"
+    assert result["models"][1:] == current["models"][1:]
+    assert {"models_parsed": 1, "models_total": len(current["models"])} in progress
+    assert progress[-1] == {"analysis_incomplete": True}
+
+
+def test_oversize_phase1_list_does_not_drop_unlisted_models(tmp_path, monkeypatch):
+    current = copy.deepcopy(get_catalog().models)
+    (tmp_path / "models.json").write_text(json.dumps(current), encoding="utf-8")
+    # 一覧の先頭 1 件だけが取得できた（残りは読み込み上限で打ち切られた）
+    copilot = _copilot(current["models"][:1])
+    copilot["status"] = "oversize"
+    text = json.dumps(current, ensure_ascii=False)
+
+    class FakeModel:
+        def __init__(self, **kwargs):
+            pass
+
+        def generate_content(self, prompt, stream=False, **kwargs):
+            if stream:
+                # 2 件目の途中で終了した応答
+                return [type("Chunk", (), {"text": text[:text.index(current["models"][1]["id"]) + 5]})()]
+            return type("Response", (), {"text": text})()
+
+    monkeypatch.setattr(llm_analyzer, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(llm_analyzer.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(llm_analyzer.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", False)
+    ids = [m["id"] for m in current["models"]]
+
+    for streaming in [False, True]:
+        monkeypatch.setattr(llm_analyzer.settings, "llm_streaming", streaming)
+        result = asyncio.run(llm_analyzer.analyze_with_llm(
+            {"copilot_models": copilot, "detail_sources": []},
+            model_id="gemini-test",
+            api_key="key",
+        ))
+        assert [m["id"] for m in result["models"]] == ids
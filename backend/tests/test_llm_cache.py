@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from app.services import llm_analyzer, llm_cache
+from app.services.llm_budget import LlmBudget
+from app.services.llm_cache import LlmResponseCache, response_cache_key
+
+
+def test_entries_expire_and_oldest_are_evicted(tmp_path):
+    cache = LlmResponseCache(tmp_path, max_bytes=10_000, ttl=60)
+    key = response_cache_key("gemini-test", {"temperature": 0.3}, "prompt")
+    assert key != response_cache_key("gemini-test", {"temperature": 0.1}, "prompt")
+
+    cache.put(key, "応答")
+    assert cache.get(key) == "応答"
+
+    # 有効期限切れ
+    entry = json.loads((tmp_path / f"{key}.json").read_text(encoding="utf-8"))
+    entry["created_at"] = time.time() - 120
+    (tmp_path / f"{key}.json").write_text(json.dumps(entry), encoding="utf-8")
+    assert cache.get(key) is None
+
+    # 上限を超えたら最後に使った時刻が古いものから消す
+    # （ディレクトリの走査は最初の書き込みと上限を超えたときだけ）
+    scans = []
+    entries = cache._entries
+    cache._entries = lambda: scans.append(1) or entries()
+    for i in range(3):
+        cache.put(f"k{i}", "x" * 4_000)
+        os.utime(tmp_path / f"k{i}.json", (i, i))
+    assert len(scans) == 1
+    cache.put("k3", "x" * 4_000)
+    assert len(scans) == 2
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["k2", "k3"]
+
+
+def test_chunk_responses_are_cached_unless_bypassed(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", LlmResponseCache(tmp_path, 1_000_000, 3600))
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_streaming", False)
+    responses = ["not json", json.dumps({"models": [{"id": "gpt-6", "name": "GPT-6"}]})]
+    calls = []
+
+    async def fake_generate(model, prompt, **kwargs):
+        calls.append(prompt)
+        return type("Response", (), {"text": responses[min(len(calls), len(responses)) - 1]})()
+
+    monkeypatch.setattr(llm_analyzer, "generate_content", fake_generate)
+    chunk = [llm_analyzer.AnalysisTarget(
+        id="gpt-6", phase1={"name": "GPT-6", "provider": "OpenAI"}, multiplier=None, current=None
+    )]
+    config = llm_analyzer._generation_config()
+
+    def analyze(use_cache=True):
+        key = llm_analyzer._cache_key("gemini-test", config, "prompt", use_cache)
+        budget = LlmBudget(rpm_limit=100, tpm_limit=1_000_000, max_concurrency=1)
+        return asyncio.run(llm_analyzer._analyze_chunk(None, chunk, "prompt", budget, key))
+
+    # 解釈できなかった応答は保存しない
+    with pytest.raises(json.JSONDecodeError):
+        analyze()
+    assert list(tmp_path.glob("*.json")) == []
+
+    assert analyze() == {"gpt-6": {"id": "gpt-6", "name": "GPT-6"}}
+    assert analyze() == {"gpt-6": {"id": "gpt-6", "name": "GPT-6"}}
+    assert len(calls) == 2
+
+    analyze(use_cache=False)
+    assert len(calls) == 3
+
+
+def test_cache_hits_report_parsed_models(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", LlmResponseCache(tmp_path, 1_000_000, 3600))
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", True)
+    key = llm_analyzer._cache_key("gemini-test", {}, "prompt", True)
+    llm_cache._cache.put(key, json.dumps({"models": [{"id": "a"}, {"id": "b"}]}))
+    updates = []
+
+    async def on_progress(percent, message, **details):
+        updates.append(details)
+
+    progress = llm_analyzer.ModelProgress(2, on_progress)
+    asyncio.run(llm_analyzer._generate_cached(None, "prompt", key, json.loads, stream=True, progress=progress))
+    assert updates == [{"models_parsed": 2, "models_total": 2}]
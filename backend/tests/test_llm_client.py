@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import shutil
+import time
+
+import httpx
+import pytest
+
+from app.services import data_updater, llm_client
+from app.services.catalog import DATA_DIR
+from app.services.history_writer import history_writer
+
+SELECTIONS = {
+    "q1": "bug_fixing",
+    "q2": "hard_to_reproduce",
+    "q3": {"complexity": "complex", "priority": ["quality"], "context_amount": "medium"},
+}
+
+
+class SlowModel:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.seconds)
+        return "done"
+
+
+def test_recommend_stays_responsive_during_slow_llm_call(monkeypatch):
+    from app.main import app
+
+    async def fake_submit(row):
+        return True
+
+    monkeypatch.setattr(history_writer, "submit", fake_submit)
+    llm_delay = 1.0
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/v1/chart/recommend", json={"selections": SELECTIONS})
+
+            llm_call = asyncio.create_task(
+                llm_client.generate_content(SlowModel(llm_delay), "prompt")
+            )
+            await asyncio.sleep(0.05)
+
+            latencies = []
+            while not llm_call.done():
+                start = time.perf_counter()
+                response = await client.post("/api/v1/chart/recommend", json={"selections": SELECTIONS})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                await asyncio.sleep(0.05)
+            assert await llm_call == "done"
+            return latencies
+
+    latencies = asyncio.run(scenario())
+    # LLM 呼び出し中も推薦 API は待たされない
+    assert len(latencies) >= 2
+    assert max(latencies) < llm_delay * 0.5
+
+
+def test_generate_content_times_out():
+    with pytest.raises(llm_client.LlmTimeoutError):
+        asyncio.run(llm_client.generate_content(SlowModel(0.5), "prompt", timeout=0.05))
+
+
+def test_refresh_can_be_cancelled_during_llm_call(tmp_path, monkeypatch):
+    shutil.copy(DATA_DIR / "models.json", tmp_path / "models.json")
+    llm_delay = 1.0
+
+    async def fake_scrape(progress_callback=None):
+        return {"copilot_models": {"status": "error", "models": []}, "detail_sources": []}
+
+    async def slow_analyze(**kwargs):
+        return await llm_client.generate_content(SlowModel(llm_delay), "prompt")
+
+    monkeypatch.setattr(data_updater, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_updater, "scrape_all_sources", fake_scrape)
+    monkeypatch.setattr(data_updater, "_load_previous_fingerprints", lambda: None)
+    monkeypatch.setattr(data_updater, "analyze_with_llm", slow_analyze)
+
+    async def scenario():
+        refresh = asyncio.create_task(data_updater.execute_data_refresh("gemini-test", "key"))
+        await asyncio.sleep(0.1)
+        assert data_updater.cancel_data_refresh()
+        start = time.perf_counter()
+        with pytest.raises(data_updater.RefreshCancelledError):
+            await refresh
+        return time.perf_counter() - start
+
+    # LLM 呼び出しの完了を待たずに終了する
+    assert asyncio.run(scenario()) < llm_delay * 0.5
+    assert data_updater.get_refresh_status()["status"] == "cancelled"
+    assert not data_updater.cancel_data_refresh()
+
+
+def test_stream_is_closed_when_consumer_stops_early():
+    class Stream:
+        cancelled = False
+        received = 0
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            self.received += 1
+            return f"chunk {self.received}"
+
+        def cancel(self):
+            self.cancelled = True
+
+    class Response:
+        def __init__(self):
+            self._iterator = Stream()
+
+        def __iter__(self):
+            yield from self._iterator
+
+    response = Response()
+
+    class StreamingModel:
+        def generate_content(self, prompt, stream=False, **kwargs):
+            assert stream
+            return response
+
+    async def consume():
+        async with contextlib.aclosing(llm_client.stream_content(StreamingModel(), "prompt")) as chunks:
+            async for chunk in chunks:
+                if chunk == "chunk 2":
+                    break
+
+    asyncio.run(consume())
+    assert response._iterator.cancelled
+    assert response._iterator.received == 2
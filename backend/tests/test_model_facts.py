@@ -0,0 +1,103 @@
+import copy
+from pathlib import Path
+
+from app.services import llm_analyzer
+from app.services.catalog import get_catalog
+from app.services.data_updater import validate_model_data
+from app.services.model_facts import (
+    ModelFacts,
+    context_length_score,
+    cost_tier_for,
+    extract_model_facts,
+    name_key,
+    parse_token_count,
+)
+from app.services.scraper import parse_copilot_model_list, parse_detail_document
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "html"
+
+
+def _scraped():
+    copilot = parse_copilot_model_list(
+        (FIXTURE_DIR / "github_supported_models.html").read_text(encoding="utf-8")
+    )
+    copilot["status"] = "success"
+    detail_sources = [
+        {"id": stem, "status": "success",
+         **parse_detail_document((FIXTURE_DIR / f"{stem}.html").read_text(encoding="utf-8"))}
+        for stem in ["openai_models", "anthropic_models"]
+    ]
+    return {"copilot_models": copilot, "detail_sources": detail_sources}
+
+
+def test_rules_match_prompt_criteria():
+    assert [cost_tier_for(m) for m in [0, 0.25, 0.33, 1, 3, 30]] == [
+        "free", "low", "low", "medium", "high", "premium"
+    ]
+    assert [context_length_score(t) for t in [64_000, 131_072, 200_000, 1_047_576, 2_000_000]] == [
+        1.0, 2.0, 3.0, 4.0, 5.0
+    ]
+    assert parse_token_count("1,047,576") == 1_047_576
+    assert parse_token_count("200K tokens (1M beta)") == 200_000
+    assert parse_token_count("2M") == 2_000_000
+    assert parse_token_count("Yes") is None
+
+
+def test_extracts_facts_from_scraped_tables():
+    scraped = _scraped()
+    facts = extract_model_facts(scraped["copilot_models"], scraped["detail_sources"])
+
+    gpt = facts[name_key("GPT-4.1")]
+    assert gpt.context_window == 1_047_576
+    assert gpt.cost_tier == "free"
+    # モデルが列の表と、括弧書きつきのモデル名
+    assert facts[name_key("Claude Haiku 4.5")].context_window == 200_000
+    fast = facts[name_key("Claude Opus 4.6 (fast mode)")]
+    assert fast.context_window == 200_000 and fast.cost_tier == "premium"
+    assert facts[name_key("Raptor mini")].provider == "GitHub"
+    assert name_key("o1-mini") not in facts
+
+
+def test_applying_facts_reproduces_current_deterministic_fields():
+    for model in get_catalog().models["models"]:
+        facts = ModelFacts(
+            name=model["name"],
+            provider=model["provider"],
+            release_status=model["release_status"],
+            premium_multiplier=model["premium_multiplier"],
+            context_window=model["context_window"],
+        )
+        assert facts.apply(model) == model
+
+
+def test_rule_based_update_adds_placeholders_and_refreshes_facts():
+    current = copy.deepcopy(get_catalog().models)
+    scraped = _scraped()
+    scraped["copilot_models"]["models"].append({"name": "GPT-6", "provider": "OpenAI", "status": "GA"})
+    scraped["copilot_models"]["multipliers"]["Claude Sonnet 4.5"] = {"chat": "3", "completions": "Not applicable"}
+
+    result = llm_analyzer.build_rule_based_update(scraped, current)
+
+    assert validate_model_data(result)
+    by_id = {m["id"]: m for m in result["models"]}
+    # 公式一覧にないモデルは削除し、一覧の順に並べる
+    assert list(by_id)[:2] == ["gpt-4.1", "gpt-5-mini"]
+    assert "claude-sonnet-4" not in by_id
+    sonnet = by_id["claude-sonnet-4.5"]
+    assert sonnet["cost_tier"] == "high" and sonnet["performance"]["cost_efficiency"] == 2.0
+    # 主観的な項目は現在の値を維持する
+    current_sonnet = next(m for m in current["models"] if m["id"] == "claude-sonnet-4.5")
+    assert sonnet["description"] == current_sonnet["description"]
+    assert sonnet["performance"]["coding"] == current_sonnet["performance"]["coding"]
+
+    new = by_id["gpt-6"]
+    assert new["analysis_pending"] and new["cost_tier"] == "medium"
+    assert new["context_window"] == 128_000 and new["performance"]["context_length"] == 2.0
+
+    # 仮データのモデルは次回の解析対象になる
+    plan = llm_analyzer.plan_incremental_analysis(scraped["copilot_models"], result, changed_sources=[])
+    assert "gpt-6" in [t.id for t in plan.targets]
+
+    # Phase 1 が完全に取得できていない場合は作らない
+    scraped["copilot_models"]["status"] = "oversize"
+    assert llm_analyzer.build_rule_based_update(scraped, current) is None
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from pathlib import Path
+
+from app.services.prompt_builder import (
+    TokenCounter,
+    build_detail_context,
+    calibrate_token_counter,
+    fit_models_json,
+)
+from app.services.scraper import parse_detail_document
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "html"
+NAV = "\n".join(["Docs", "Sign in", "Pricing", "Cookie settings", "Contact sales"])
+
+
+def _source(name, content):
+    return {"name": name, "url": f"https://example.com/{name}", "content": content}
+
+
+def test_removes_shared_boilerplate_but_keeps_model_rows():
+    sources = [
+        _source("a", NAV + "\nGPT-4.1\nGPT-4.1 has a 1M token context window."),
+        _source("b", NAV + "\nGPT-4.1\nClaude Sonnet 4 supports extended thinking."),
+    ]
+
+    context = build_detail_context(sources, ["GPT-4.1", "Claude Sonnet 4"], token_budget=10000)
+
+    assert "Cookie settings" not in context.text
+    assert context.boilerplate_lines == 10
+    # 複数ページに出てくる行でもモデル名を含む行は残す
+    assert context.text.count("GPT-4.1\n") == 2
+    assert "extended thinking" in context.text
+
+
+def test_prefers_relevant_chunks_and_covers_every_source():
+    filler = "\n".join(f"Unrelated paragraph {i} " + "lorem ipsum " * 40 for i in range(40))
+    sources = [
+        _source("first", filler + "\nGemini 2.5 Pro context window is 1M tokens."),
+        _source("last", "Grok Code Fast 1 is a fast reasoning model with 256K context."),
+    ]
+
+    context = build_detail_context(
+        sources, ["Gemini 2.5 Pro", "Grok Code Fast 1"], token_budget=1200
+    )
+
+    assert context.tokens <= 1200
+    assert context.sources_used == ["first", "last"]
+    assert "Gemini 2.5 Pro context window" in context.text
+    assert "Grok Code Fast 1" in context.text
+    # 予算に入らなかった部分は省略記号で示す
+    assert "(...)" in context.text
+
+
+def test_fixture_pages_fit_budget_with_fewer_tokens():
+    sources = [
+        _source(path.stem, parse_detail_document(path.read_text(encoding="utf-8"))["content"])
+        for path in sorted(FIXTURE_DIR.glob("*_models.html"))
+    ]
+    names = ["GPT-4.1", "Claude Sonnet 4", "Gemini 2.5 Pro", "Grok Code Fast 1"]
+    counter = TokenCounter()
+    naive = counter("\n\n".join(src["content"] for src in sources))
+
+    context = build_detail_context(sources, names, token_budget=naive // 2, counter=counter)
+
+    assert context.tokens <= naive // 2
+    assert len(context.sources_used) == len(sources)
+
+
+def test_fit_models_json_drops_whole_models():
+    models = [{"id": f"model-{i}", "description": "x" * 100} for i in range(50)]
+    counter = TokenCounter()
+
+    text = fit_models_json(models, token_budget=500, counter=counter)
+
+    kept = json.loads(text)
+    assert 0 < len(kept) < len(models)
+    assert kept == models[:len(kept)]
+    assert counter(text) <= 500
+    assert json.loads(fit_models_json(models, token_budget=100000)) == models
+
+
+def test_calibrate_token_counter_uses_model_count():
+    class FakeModel:
+        def count_tokens(self, text, **kwargs):
+            class Response:
+                total_tokens = len(text) // 2
+            return Response()
+
+    counter = asyncio.run(calibrate_token_counter(FakeModel(), "x" * 3000))
+    assert 1400 <= counter("y" * 3000) <= 1600
+
+    # count_tokens が使えない場合は概算のまま
+    counter = asyncio.run(calibrate_token_counter(object(), "x" * 3000))
+    assert counter.ratio == 1.0
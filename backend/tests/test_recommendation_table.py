@@ -0,0 +1,40 @@
+from app.services import recommendation_table
+from app.services.catalog import get_catalog
+from app.services.recommendation import compute_recommendation, get_recommendations
+from app.services.scoring_engine import get_engine
+
+
+def test_table_covers_selection_space():
+    catalog = get_catalog()
+    table = recommendation_table.rebuild_table(catalog)
+    expected = sum(1 for _ in recommendation_table.iter_selection_space(catalog.chart))
+    assert len(table.entries) == expected
+
+    stats = recommendation_table.table_stats()
+    assert stats["status"] == "ready"
+    assert stats["entries"] == expected
+
+
+def test_lookup_matches_live_computation_regardless_of_priority_order():
+    catalog = get_catalog()
+    recommendation_table.rebuild_table(catalog)
+    selections = {
+        "q1": "bug_fixing",
+        "q2": "hard_to_reproduce",
+        "q3": {"complexity": "complex", "priority": ["cost", "quality"], "context_amount": "large"},
+    }
+    key = get_engine(catalog).canonical_key(selections)
+    reordered = {
+        "q1": "bug_fixing",
+        "q2": "hard_to_reproduce",
+        "q3": {"complexity": "complex", "priority": ["quality", "cost"], "context_amount": "large"},
+    }
+    assert key == get_engine(catalog).canonical_key(reordered)
+    assert recommendation_table.lookup(catalog.version, key) == compute_recommendation(selections)
+    assert recommendation_table.lookup("stale-version", key) is None
+
+
+def test_unknown_input_falls_back_to_live_computation():
+    recommendation_table.rebuild_table()
+    selections = {"q1": "bug_fixing", "q2": "boilerplate", "q3": {"priority": "speed"}}
+    assert get_recommendations(selections) == compute_recommendation(selections)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+
+from app.services import scraper
+from app.services.catalog import DATA_DIR
+from app.services.stage_timings import STAGES
+from benchmarks import refresh_replay
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "html"
+
+
+def _live_transport():
+    pages = {scraper.GITHUB_SUPPORTED_MODELS_URL: "github_supported_models.html"}
+    pages.update({src["url"]: f"{src['id']}.html" for src in scraper.DETAIL_SOURCES})
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        page = pages.get(str(request.url))
+        if page is None:
+            return httpx.Response(404)
+        return httpx.Response(200, text=(FIXTURE_DIR / page).read_text(encoding="utf-8"))
+
+    return httpx.MockTransport(handler), requests
+
+
+class FakeGemini:
+    """記録時に Gemini API の代わりに使うモデル"""
+
+    calls = 0
+
+    def __init__(self, **kwargs):
+        pass
+
+    def generate_content(self, prompt, **kwargs):
+        FakeGemini.calls += 1
+        if "サマリ" in prompt:
+            text = {"models_added": [], "models_removed": [], "models_updated": [],
+                    "key_changes": ["fake"], "overall_summary": "fake"}
+        else:
+            text = json.loads((DATA_DIR / "models.json").read_text(encoding="utf-8"))
+        response = type("Response", (), {"text": json.dumps(text, ensure_ascii=False)})()
+        return [response] if kwargs.get("stream") else response
+
+    def count_tokens(self, text, **kwargs):
+        return type("Response", (), {"total_tokens": len(text) // 4})()
+
+
+def test_replay_runs_recorded_refresh_offline(tmp_path):
+    models_before = (DATA_DIR / "models.json").read_bytes()
+    transport, live_requests = _live_transport()
+
+    recorded = asyncio.run(refresh_replay.record(
+        tmp_path, model_id="gemini-test", api_key="key",
+        transport=transport, model_factory=FakeGemini,
+    ))
+    assert recorded["status"] == "success"
+    assert len(live_requests) == 1 + len(scraper.DETAIL_SOURCES)
+    llm_calls = FakeGemini.calls
+
+    result = asyncio.run(refresh_replay.replay(tmp_path))
+
+    # ネットワークにも LLM にもアクセスせずに同じ結果になる
+    assert len(live_requests) == 1 + len(scraper.DETAIL_SOURCES)
+    assert FakeGemini.calls == llm_calls
+    assert result["replay"] == {"missing_http": [], "missing_llm": [], "matches_recording": True}
+    assert list(result["timings"]["stages"]) == STAGES
+    # 本番のデータファイルは変更しない
+    assert (DATA_DIR / "models.json").read_bytes() == models_before
@@ -0,0 +1,43 @@
+from app.services import recommendation_table
+from app.services.recommendation import compute_recommendation, get_recommendations
+from app.services.result_cache import RecommendationCache, get_recommendation_cache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RecommendationCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", [{"rank": 1}])
+    cache.put("b", [{"rank": 1}])
+    assert cache.get("a") == [{"rank": 1}]
+    cache.put("c", [{"rank": 1}])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_cache_expires_entries():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=0)
+    cache.put("a", [{"rank": 1}])
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_off_table_selections_hit_cache_with_canonical_key(monkeypatch):
+    # 事前計算テーブルを使わない状態でキャッシュの挙動を確認する
+    monkeypatch.setattr(recommendation_table, "lookup", lambda version, key: None)
+    cache = get_recommendation_cache()
+    cache.clear()
+    hits = cache.hits
+
+    first = {"q1": "testing", "q2": "boilerplate", "q3": {"priority": ["cost", "speed"]}}
+    second = {
+        "q1": "testing",
+        "q2": "boilerplate",
+        "q3": {"complexity": "moderate", "priority": ["speed", "cost"], "context_amount": "medium"},
+    }
+    assert get_recommendations(first) == compute_recommendation(first)
+    assert get_recommendations(second) == compute_recommendation(first)
+    assert cache.hits == hits + 1
@@ -0,0 +1,36 @@
+from app.services.catalog import get_catalog
+from app.services.recommendation import (
+    compute_recommendation,
+    compute_recommendation_reference,
+    compute_recommendations_batch,
+)
+from app.services.recommendation_table import iter_selection_space
+
+
+def test_engine_matches_reference_for_every_selection():
+    count = 0
+    for selections in iter_selection_space(get_catalog().chart):
+        assert compute_recommendation(selections) == compute_recommendation_reference(selections)
+        count += 1
+    assert count > 1000
+
+
+def test_engine_matches_reference_for_partial_and_unknown_input():
+    cases = [
+        {},
+        {"q1": "unknown", "q2": "unknown", "q3": {}},
+        {"q1": "testing", "q3": {"priority": ["cost", "unknown", "cost"]}},
+        {"q2": "boilerplate", "q3": {"complexity": "simple"}},
+    ]
+    for selections in cases:
+        assert compute_recommendation(selections) == compute_recommendation_reference(selections)
+
+
+def test_batch_matches_single_requests_in_input_order():
+    selections_list = list(iter_selection_space(get_catalog().chart))[::97]
+    selections_list.append({"q1": "unknown", "q3": {"priority": ["speed"]}})
+    batch = compute_recommendations_batch(selections_list)
+    assert len(batch) == len(selections_list)
+    for selections, results in zip(selections_list, batch):
+        assert results == compute_recommendation_reference(selections)
+    assert compute_recommendations_batch([]) == []
@@ -8,3 +8,116 @@ def test_scraper_sources_defined():
         assert "id" in source
         assert "name" in source
         assert "url" in source
+
+
+def test_scrape_all_sources_fetches_phases_concurrently(monkeypatch):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import httpx
+
+    from app.services import scraper
+
+    delay = 0.1
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            in_flight -= 1
+        return httpx.Response(200, text="<html><body><main>content</main></body></html>")
+
+    monkeypatch.setattr(scraper.settings, "http_cache_enabled", False)
+    # プロセスの起動時間を計測に含めないようスレッドで解析する
+    monkeypatch.setattr(scraper, "_parse_executor", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(
+        scraper, "create_scrape_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    progress = []
+
+    async def on_progress(pct, message):
+        progress.append(pct)
+
+    result = asyncio.run(scraper.scrape_all_sources(on_progress))
+
+    # Phase 1 と Phase 2 を同時に取得するため、リクエストが重なり、
+    # 全体は各ページの待ち時間の合計より十分に短い
+    total_delay_ms = delay * 1000 * (1 + len(scraper.DETAIL_SOURCES))
+    assert peak > 1
+    assert result["timings"]["total_ms"] < 0.75 * total_delay_ms
+    assert set(result["timings"]["sources"]) == {
+        scraper.COPILOT_MODEL_LIST_ID, *(s["id"] for s in scraper.DETAIL_SOURCES)
+    }
+    assert [s["id"] for s in result["detail_sources"]] == [s["id"] for s in scraper.DETAIL_SOURCES]
+    assert progress == sorted(progress) and progress[0] >= 5 and progress[-1] == 40
+
+
+SUPPORTED_MODELS_HTML = """
+<html><body><nav>menu</nav><main>
+<table>
+  <tr><th>Model</th><th>Provider</th><th>Status</th></tr>
+  <tr><td>GPT-4.1</td><td>OpenAI</td><td>GA</td></tr>
+  <tr><td>Claude Sonnet 4</td><td>Anthropic</td><td>Public preview</td></tr>
+</table>
+<table>
+  <tr><th>Model</th><th>Chat</th><th>Completions</th></tr>
+  <tr><td>GPT-4.1</td><td>0</td><td>Not applicable</td></tr>
+</table>
+<table>
+  <tr><th>Model</th><th>Retirement date</th><th>Replacement</th></tr>
+  <tr><td>o1-mini</td><td>2025-10-23</td><td>GPT-5 mini</td></tr>
+</table>
+</main></body></html>
+"""
+
+
+def test_parse_in_worker_process_matches_inline(monkeypatch):
+    import asyncio
+
+    from app.services import scraper
+
+    monkeypatch.setattr(scraper.settings, "scrape_parse_executor", "process")
+    monkeypatch.setattr(scraper, "_parse_executor", None)
+    try:
+        parsed = asyncio.run(scraper.run_parse(scraper.parse_copilot_model_list, SUPPORTED_MODELS_HTML))
+    finally:
+        scraper.shutdown_parse_executor()
+
+    assert parsed == scraper.parse_copilot_model_list(SUPPORTED_MODELS_HTML)
+    assert parsed["models"][1] == {"name": "Claude Sonnet 4", "provider": "Anthropic", "status": "Public preview"}
+    assert parsed["multipliers"] == {"GPT-4.1": {"chat": "0", "completions": "Not applicable"}}
+    assert parsed["retired"][0]["replacement"] == "GPT-5 mini"
+    assert "menu" not in parsed["raw_text"]
+
+
+def test_scrape_url_marks_oversize_pages_and_keeps_partial_content(monkeypatch):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import httpx
+
+    from app.services import scraper
+    from app.services.fetcher import Fetcher
+
+    def handler(request):
+        return httpx.Response(200, text="<html><body><p>intro</p>" + "<p>more</p>" * 1000 + "</body></html>")
+
+    monkeypatch.setattr(scraper, "_parse_executor", ThreadPoolExecutor(max_workers=1))
+    source = {"id": "big", "name": "Big page", "url": "https://example.com/big", "max_bytes": 1000}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await scraper.scrape_url(Fetcher(client, max_retries=0), source)
+
+    result = asyncio.run(scenario())
+
+    assert result["status"] == "oversize"
+    assert result["status"] in scraper.CONTENT_STATUSES
+    assert result["bytes_read"] == 1000
+    assert result["content"].startswith("intro\nmore")
@@ -0,0 +1,71 @@
+import copy
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, UpdateHistory
+from app.services import update_history
+from app.services.catalog import get_catalog
+from app.services.model_delta import apply_delta, diff_models_data, has_unique_ids
+
+
+def _next_version(data, i):
+    data = copy.deepcopy(data)
+    data["version"] = f"v{i}"
+    data["models"][i % 3]["performance"]["speed"] = float(i % 5)
+    if i % 4 == 0:
+        data["models"].append({"id": f"new-{i}", "name": f"New {i}", "provider": "xAI", "performance": {}})
+    if i % 3 == 0:
+        data["models"].pop(1)
+        data["models"].reverse()
+    return data
+
+
+def test_delta_applies_in_both_directions():
+    old = copy.deepcopy(get_catalog().models)
+    new = _next_version(old, 12)
+    del new["source"]
+
+    delta = diff_models_data(old, new)
+    assert set(delta) == {"meta", "added", "removed", "changed", "order"}
+    assert apply_delta(old, delta) == new
+    assert apply_delta(new, delta, reverse=True) == old
+    assert diff_models_data(old, old) == {}
+
+    assert has_unique_ids(old)
+    duplicated = {**old, "models": old["models"] + old["models"][:1]}
+    assert not has_unique_ids(duplicated)
+
+
+def test_update_history_reconstructs_every_version(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setattr(update_history.settings, "update_history_checkpoint_interval", 4)
+
+    versions = [copy.deepcopy(get_catalog().models)]
+    start = datetime.utcnow()
+    for i in range(1, 10):
+        versions.append(_next_version(versions[-1], i))
+        record = update_history.record_update(
+            db,
+            update_id=f"u{i}",
+            status="success",
+            summary={},
+            old_data=versions[-2],
+            new_data=versions[-1],
+            gemini_model="gemini-test",
+        )
+        record.created_at = start + timedelta(seconds=i)
+        db.commit()
+
+    formats = [db.get(UpdateHistory, f"u{i}").data_format for i in range(1, 10)]
+    assert formats == ["full", "delta", "delta", "delta", "full", "delta", "delta", "delta", "full"]
+    assert db.get(UpdateHistory, "u2").old_data is None
+
+    update_history._new_data_cache.clear()
+    for i in range(1, 10):
+        assert update_history.load_update_data(db, f"u{i}", "new") == versions[i]
+        assert update_history.load_update_data(db, f"u{i}", "old") == versions[i - 1]
+    db.close()
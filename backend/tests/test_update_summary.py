@@ -0,0 +1,75 @@
+import asyncio
+import copy
+
+from app.services import llm_analyzer
+from app.services.catalog import get_catalog
+from app.services.update_summary import MAX_KEY_CHANGES, summarize_changes
+
+
+def _changed_data():
+    old = copy.deepcopy(get_catalog().models)
+    new = copy.deepcopy(old)
+    models = new["models"]
+    removed = models.pop()
+    added = copy.deepcopy(models[0])
+    added.update(id="gpt-6", name="GPT-6")
+    models.append(added)
+    models[0]["premium_multiplier"] = {"chat": "1", "completions": "Not applicable"}
+    models[0]["cost_tier"] = "medium"
+    models[1]["performance"]["coding"] = models[1]["performance"]["coding"] - 1.0
+    models[2]["description"] = "更新された説明"
+    new["last_updated"] = "2099-01-01T00:00:00"
+    return old, new, removed
+
+
+def test_summarizes_field_level_changes_without_llm():
+    old, new, removed = _changed_data()
+    first, second, third = new["models"][:3]
+
+    summary = summarize_changes(old, new)
+
+    assert summary["models_added"] == ["GPT-6"]
+    assert summary["models_removed"] == [removed["name"]]
+    assert summary["models_updated"] == [first["name"], second["name"], third["name"]]
+    fields = summary["field_changes"][second["id"]]["fields"]
+    assert fields == {"performance.coding": {
+        "old": second["performance"]["coding"] + 1.0, "new": second["performance"]["coding"]
+    }}
+    assert summary["field_changes"][first["id"]]["fields"]["cost_tier"]["new"] == "medium"
+    # 追加・削除 → 乗数 → コスト区分 → スコアの順に並ぶ
+    assert summary["key_changes"][:3] == [
+        "GPT-6 を追加", f"{removed['name']} を削除", f"{first['name']}: 乗数 0/1 → 1/Not applicable"
+    ]
+    assert len(summary["key_changes"]) == MAX_KEY_CHANGES
+    assert "1 モデルを追加" in summary["overall_summary"]
+    # 同じ入力からは同じサマリになる
+    assert summarize_changes(old, new) == summary
+
+
+def test_unchanged_data_is_summarized_as_no_change():
+    data = get_catalog().models
+    summary = summarize_changes(data, copy.deepcopy(data))
+    assert summary["models_updated"] == [] and summary["field_changes"] == {}
+    assert "変更はありませんでした" in summary["overall_summary"]
+
+
+def test_generate_update_summary_skips_llm_unless_polish_enabled(monkeypatch):
+    old, new, _ = _changed_data()
+    calls = []
+
+    async def fake_generate(model, prompt, **kwargs):
+        calls.append(prompt)
+        return type("Response", (), {"text": "整えた説明"})()
+
+    monkeypatch.setattr(llm_analyzer, "generate_content", fake_generate)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(llm_analyzer.settings, "llm_polish_summary", False)
+    summary = asyncio.run(llm_analyzer.generate_update_summary(old, new, "gemini-test", "key"))
+    assert calls == []
+    assert summary == summarize_changes(old, new)
+
+    monkeypatch.setattr(llm_analyzer.settings, "llm_polish_summary", True)
+    polished = asyncio.run(llm_analyzer.generate_update_summary(old, new, "gemini-test", "key"))
+    assert len(calls) == 1
+    assert polished["overall_summary"] == "整えた説明"
+    assert polished["key_changes"] == summary["key_changes"]
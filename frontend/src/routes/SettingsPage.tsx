@@ -102,7 +102,7 @@ function RateLimitBar({
 function RefreshProgress({
   onDone,
 }: {
-  onDone: () => void;
+  onDone: (status: string) => void;
 }) {
   const [progress, setProgress] = useState(0);
   const [message, setMessage] = useState("開始中...");
@@ -113,9 +113,13 @@ function RefreshProgress({
         const status = await getRefreshStatus();
         setProgress(status.progress ?? 0);
         setMessage(status.message ?? "");
-        if (status.status === "completed" || status.status === "failed") {
+        if (
+          status.status === "completed" ||
+          status.status === "failed" ||
+          status.status === "cancelled"
+        ) {
           clearInterval(interval);
-          onDone();
+          onDone(status.status);
         }
       } catch {
         // ignore
@@ -173,6 +177,7 @@ export default function SettingsPage() {
   const [showKey, setShowKey] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
   const [refreshDone, setRefreshDone] = useState(false);
+  const [refreshStatus, setRefreshStatus] = useState("completed");
   const qc = useQueryClient();
 
   // バックエンド設定から llm_model を読み込む（.env で設定）
@@ -533,7 +538,8 @@ export default function SettingsPage() {
               exit={{ opacity: 0 }}
             >
               <RefreshProgress
-                onDone={() => {
+                onDone={(status) => {
+                  setRefreshStatus(status);
                   setRefreshDone(true);
                   setRefreshing(false);
                   qc.invalidateQueries({ queryKey: ["models"] });
@@ -543,7 +549,25 @@ export default function SettingsPage() {
           )}
         </AnimatePresence>
 
-        {refreshDone && (
+        {refreshDone && refreshStatus === "cancelled" && (
+          <motion.div
+            initial={{ opacity: 0, y: 4 }}
+            animate={{ opacity: 1, y: 0 }}
+            style={{
+              marginTop: "1rem",
+              background: "rgba(148,163,184,0.08)",
+              border: "1px solid rgba(148,163,184,0.2)",
+              borderRadius: "0.75rem",
+              padding: "1rem 1.25rem",
+              color: "#cbd5e1",
+              fontSize: "0.875rem",
+            }}
+          >
+            ⏹ データ更新がキャンセルされました。
+          </motion.div>
+        )}
+
+        {refreshDone && refreshStatus !== "cancelled" && (
           <motion.div
             initial={{ opacity: 0, y: 4 }}
             animate={{ opacity: 1, y: 0 }}